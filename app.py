@@ -1,11 +1,30 @@
 import streamlit as st
 import pandas as pd
-import chromadb
-from sentence_transformers import SentenceTransformer
 import time
-from datetime import datetime
-import feedparser  # 必须安装这个库: pip install feedparser
-import hashlib
+from datetime import datetime, timedelta
+from vector_store import get_collection, VECTOR_DB_MODE
+from dedup_index import DedupIndex
+from keyword_engine import get_engine, sentiment_label
+from embedding_cache import EmbeddingCache
+from embedding_backends import EMBED_BACKEND
+from embedding_service import get_encoder
+from query_cache import QueryCache
+from lexical_index import LexicalIndex
+from news_ingest import build_where
+from ingest_worker import IngestWorker, rss_source, store_source
+from metrics import start_exporters
+
+LABEL_COLORS = {"POSITIVE": "green", "NEGATIVE": "red", "NEUTRAL": "grey"}
+# 与 feeder 产业链图谱的一级大类一致
+SECTOR_OPTIONS = ["人工智能", "半导体", "新能源", "汽车产业链", "医药医疗", "数字经济", "金融/地产", "全局"]
+TIME_RANGES = {"不限": None, "最近 24 小时": 24, "最近 72 小时": 72, "最近 7 天": 24 * 7}
+SENTIMENT_OPTIONS = {"不限": None, "利好": "positive", "利空": "negative"}
+# 下拉框标签 -> embedding_backends 里的后端名 (同一个 ./local_model，不同推理方式)
+EMBEDDING_BACKENDS = {
+    "all-MiniLM-L6-v2 (PyTorch FP32)": "torch",
+    "all-MiniLM-L6-v2 (PyTorch INT8)": "torch-int8",
+    "all-MiniLM-L6-v2 (ONNX Runtime INT8)": "onnx-int8",
+}
 
 # === 1. 页面基础配置 (必须放在第一行) ===
 st.set_page_config(
@@ -21,105 +40,82 @@ with st.sidebar:
     st.markdown("### 🤖 模型设置")
     model_type = st.selectbox(
         "Embedding Backend",
-        ["all-MiniLM-L6-v2 (Local)", "OpenAI-Ada-002 (Cloud)", "BGE-Large-Zh"]
+        list(EMBEDDING_BACKENDS)
     )
+    backend_name = EMBEDDING_BACKENDS[model_type]
     
     st.markdown("### 🛡️ 风控参数")
     risk_level = st.slider("最大回撤阈值 (Max DD)", 5, 25, 12)
     st.progress(risk_level / 30)
     st.caption(f"当前熔断线: -{risk_level}%")
     
+    st.markdown("### 🧭 检索过滤")
+    filter_sectors = st.multiselect("板块", SECTOR_OPTIONS)
+    filter_hours = TIME_RANGES[st.selectbox("时间范围", list(TIME_RANGES))]
+    filter_min_score = st.slider("最低评分", 0, 10, 0)
+    filter_sentiment = SENTIMENT_OPTIONS[st.selectbox("情绪", list(SENTIMENT_OPTIONS))]
+
     st.divider()
     
     # 状态指示灯
     st.success("🟢 Docker Container: Active")
-    st.info("🔵 Vector DB: Connected")
+    st.info(f"🔵 Vector DB: Connected ({VECTOR_DB_MODE})")
     
-    # 刷新按钮
-    if st.button("🔄 强制刷新数据源"):
-        st.cache_data.clear()
-        st.rerun()
+    # 刷新按钮 (通知后台 worker 立即开始下一轮)
+    refresh_clicked = st.button("🔄 强制刷新数据源")
 
 # === 3. 核心功能函数 ===
 
 @st.cache_resource
-def load_model():
-    # 强制只看本地，禁止联网检查！
-    return SentenceTransformer('./local_model', local_files_only=True)
+def load_model(backend_name):
+    # 强制只看本地，禁止联网检查！每个后端各加载一次 (批大小/线程数/最大长度见 EMBED_* 环境变量)；
+    # 设置 EMBED_SERVICE_URL 时改连共享 embedding 服务，本进程不再加载模型
+    # 外面包一层 embedding 缓存 (内存 LRU + 磁盘)，rerun 时同样的文本不会再编码
+    encoder, model_id = get_encoder(backend_name)
+    return EmbeddingCache(encoder, model_id=model_id)
 
 @st.cache_resource
 def init_db():
-    # 初始化向量数据库 (内存模式，重启后清空，适合开发调试)
-    client = chromadb.Client()
-    # 尝试获取集合，如果已存在则获取，否则创建
-    try:
-        collection = client.get_collection("financial_news")
-    except:
-        collection = client.create_collection("financial_news")
-    return collection
-@st.cache_data(ttl=300)
-def fetch_news_feed():
-    # 方案 A: 36氪 (科技/金融/创投) - 极大概率能连通
-    rss_url = "https://36kr.com/feed"
-    
-    # 方案 B: 环球网财经 (如果36氪不行，试这个)
-    # rss_url = "https://finance.huanqiu.com/rss.xml"
-    
-    try:
-        # 依然带上伪装，国内网站防爬也很严
-        feed = feedparser.parse(
-            rss_url,
-            agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        )
-        
-        # 检查是否为空
-        if not feed.entries:
-            raise Exception("国内源返回为空 (可能是格式解析问题或反爬)")
-            
-        news_items = []
-        for entry in feed.entries[:10]:
-            # 尝试获取时间
-            dt = entry.get('published_parsed')
-            if dt:
-                pub_date = f"{dt.tm_year}-{dt.tm_mon:02d}-{dt.tm_mday:02d}"
-            else:
-                pub_date = datetime.now().strftime('%Y-%m-%d')
-
-            # 36氪的 RSS 有时候 summary 是空的，所以做一个容错
-            content_text = entry.summary if 'summary' in entry else entry.title
-            
-            news_items.append({
-                "date": pub_date,
-                "content": f"【36Kr】{entry.title} - {content_text[:60]}...",
-                "link": entry.link
-            })
-        
-        return news_items, True
-        
-    except Exception as e:
-        print(f"RSS Error: {e}")
-        # 如果连国内都挂了，那就彻底没办法了，只能用 Mock
-        mock_data = [
-            {"date": "2026-01-14", "content": "【Mock】A股全线飘红，沪指收复3000点。"},
-            {"date": "2026-01-14", "content": "【Mock】茅台发布财报，净利润同比增长 15%。"},
-            {"date": "2026-01-14", "content": "【Mock】宁德时代发布凝聚态电池，续航突破1000公里。"},
-            {"date": "2026-01-13", "content": "【Mock】央行宣布降准0.5个百分点，释放长期资金1万亿。"},
-            {"date": "2026-01-13", "content": "【Mock】腾讯发布大模型混元 5.0，接入微信生态。"}
-        ]
-        return mock_data, False
-        
-    except Exception as e:
-        print(f"RSS Error: {e}")
-        # ❌ 失败：返回高质量的仿真数据 (看起来像真的)
-        # 如果真的抓不到，就用下面这组数据，至少截图好看
-        mock_data = [
-            {"date": "2026-01-14", "content": "OpenAI 发布 GPT-5 预览版，推理能力提升 200%。"},
-            {"date": "2026-01-14", "content": "英伟达 CEO 黄仁勋宣布新一代 Blackwell Ultra 芯片量产。"},
-            {"date": "2026-01-14", "content": "美联储会议纪要显示：通胀得到控制，降息预期升温。"},
-            {"date": "2026-01-13", "content": "苹果 Vision Pro 2 销量超预期，AR/VR 板块集体走强。"},
-            {"date": "2026-01-13", "content": "比特币突破 12 万美元大关，加密货币市场情绪高涨。"}
-        ]
-        return mock_data, False
+    # 初始化向量数据库 (默认持久化到 VECTOR_DB_PATH，重启后直接加载已有索引；
+    # 设置 VECTOR_DB_MODE=memory 可回到内存模式，适合开发调试)
+    return get_collection()
+
+@st.cache_resource
+def init_dedup_index(_collection):
+    # 启动时从向量库重建一次 (只拉 ID)，之后随入库增量维护
+    return DedupIndex.from_collection(_collection)
+
+@st.cache_resource
+def init_lexical_index(_collection):
+    # 中文 n-gram 倒排索引 (BM25)，与向量库同目录落盘；索引文件缺失或落后时从集合补齐
+    lexical = LexicalIndex.open()
+    lexical.sync(_collection)
+    return lexical
+
+@st.cache_resource
+def init_query_cache(_model, backend_name):
+    # 查询向量 + Top-K 结果缓存，所有会话共享 (每个后端一份)；有新文档入库时结果自动失效
+    return QueryCache(_model)
+
+@st.cache_resource
+def init_metrics():
+    # 按 METRICS_PORT / METRICS_JSONL_PATH 启动指标导出，整个进程只启动一次
+    return start_exporters()
+
+@st.cache_resource
+def init_ingest_worker():
+    # 进程内唯一的后台入库线程: 抓取 / 去重 / 编码 / 写库都不在页面渲染路径上，
+    # 多个浏览器会话共用同一个 worker，不会重复入库。入库固定用默认 embedding 后端。
+    collection = init_db()
+    worker = IngestWorker(
+        collection, load_model(EMBED_BACKEND),
+        # RSS 资讯 + feeder 结构化情报 (score / sector / sentiment 等作为 metadata)
+        sources={"rss": rss_source(), "store": store_source()},
+        dedup_index=init_dedup_index(collection),
+        lexical=init_lexical_index(collection),
+    )
+    worker.start()
+    return worker
 
 # === 4. 主界面逻辑 ===
 
@@ -140,48 +136,40 @@ st.divider()
 col_status, col_metric = st.columns([2, 1])
 
 with st.spinner('正在初始化神经网络与连接数据源...'):
-    model = load_model()
+    model = load_model(backend_name)
     collection = init_db()
-    
-    news_data, is_live = fetch_news_feed()
-    
+    # 页面只读后台 worker 的状态，不做任何抓取/编码
+    init_metrics()
+    ingest_worker = init_ingest_worker()
+    if refresh_clicked:
+        ingest_worker.trigger()
+    ingest_status = ingest_worker.status()
+    rss_status = ingest_status["sources"].get("rss")
+
     # 状态栏显示
     with col_status:
-        if is_live:
-            st.success(f"📡 已连接实时 RSS 数据源，获取 {len(news_data)} 条最新资讯")
+        if rss_status is None:
+            st.info("⏳ 后台正在首次同步数据源...")
+        elif rss_status["status"] == "not_modified":
+            st.success("📡 已连接实时 RSS 数据源，暂无新资讯")
+        elif rss_status["live"]:
+            st.success(f"📡 已连接实时 RSS 数据源，获取 {rss_status['fetched']} 条最新资讯")
         else:
-            st.warning(f"⚠️ 网络受限，已切换至高性能仿真 (Mock) 数据流，加载 {len(news_data)} 条数据")
-
-    # 存入向量库
-    if news_data:
-        ids = []
-        documents = []
-        metadatas = []
-        embeddings = []
-        
-        for item in news_data:
-            # 生成唯一ID (防止重复存)
-            doc_id = hashlib.md5(item["content"].encode()).hexdigest()
-            
-            # 简单的查重逻辑 (生产环境应用更高效的 bloom filter)
-            try:
-                # 尝试获取该ID，如果报错说明不存在
-                collection.get(ids=[doc_id])
-                # 如果没报错，说明已存在，跳过
-                continue 
-            except:
-                pass # 不存在，继续添加
-            
-            ids.append(doc_id)
-            documents.append(item["content"])
-            metadatas.append({"date": item["date"], "link": item["link"]})
-        
-        # 批量编码与写入 (如果有新数据)
-        if documents:
-            embeddings = model.encode(documents).tolist()
-            collection.add(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
-            with col_metric:
-                st.metric("今日新增入库", f"+{len(documents)}", delta_color="normal")
+            st.warning(f"⚠️ 网络受限，已切换至高性能仿真 (Mock) 数据流，加载 {rss_status['fetched']} 条数据")
+        if ingest_status["error"]:
+            st.caption(f"⚠️ 上一轮入库异常: {ingest_status['error']}")
+
+    if ingest_status["total_added"]:
+        with col_metric:
+            st.metric("今日新增入库", f"+{ingest_status['total_added']}",
+                      delta=f"+{ingest_status['last_added']} 本轮", delta_color="normal")
+
+    cache_stats = model.stats
+    st.sidebar.caption(f"🧊 Embedding 缓存命中率: {cache_stats['hit_rate']:.0%} "
+                       f"(命中 {cache_stats['memory_hits'] + cache_stats['disk_hits']} / 未命中 {cache_stats['misses']})")
+    if ingest_status["last_run"]:
+        st.sidebar.caption(f"🛠️ 后台入库: 第 {ingest_status['runs']} 轮 · "
+                           f"{ingest_status['last_run']:%H:%M:%S} · 耗时 {ingest_status['last_duration_ms']:.0f}ms")
 
 # --- 搜索交互区 ---
 st.markdown("### 🔍 语义情报检索")
@@ -201,40 +189,48 @@ if search_triggered or query:
     else:
         start_time = time.time()
         
-        # 1. 向量化查询
-        query_vec = model.encode([query]).tolist()
-        
-        # 2. 数据库检索 (Top 3)
-        results = collection.query(query_embeddings=query_vec, n_results=3)
+        # 1+2. 向量 + BM25 混合检索 (Top 3)，股票简称/代码这类实体查询直接由倒排索引返回；
+        # 侧边栏过滤条件在检索前下推到 metadata 索引 (时间按分钟取整，便于命中结果缓存)；
+        # 重复查询直接命中缓存
+        since = (datetime.now() - timedelta(hours=filter_hours)).replace(second=0, microsecond=0) \
+            if filter_hours else None
+        where = build_where(sectors=filter_sectors, since=since,
+                            min_score=filter_min_score or None, sentiment=filter_sentiment)
+        query_cache = init_query_cache(model, backend_name)
+        results, cache_hit = query_cache.search(collection, query, n_results=3,
+                                                lexical=init_lexical_index(collection), where=where)
         
         end_time = time.time()
         latency = (end_time - start_time) * 1000
         
-        st.markdown(f"**分析完成** (耗时: `{latency:.2f}ms`)")
+        cache_tag = " · 缓存命中" if cache_hit else ""
+        st.markdown(f"**分析完成** (耗时: `{latency:.2f}ms`{cache_tag})")
         
         # 3. 渲染结果卡片
-        if results['documents']:
+        if results['documents'] and results['documents'][0]:
             for i in range(len(results['documents'][0])):
                 doc_content = results['documents'][0][i]
                 meta_data = results['metadatas'][0][i]
                 distance = results['distances'][0][i]
-                similarity = 1 / (1 + distance) # 距离转相似度
+                source = results['sources'][0][i]
+                # 只由倒排索引命中的文档没有向量距离，显示融合分
+                if distance is None:
+                    match_text = f"关键词匹配 ({source}): {results['fusion_scores'][0][i]:.4f}"
+                else:
+                    match_text = f"语义匹配度 ({source}): {1 / (1 + distance):.4f}"  # 距离转相似度
                 
-                # 动态判断情绪颜色 (简单的规则，后续接 LLM)
-                card_color = "grey"
-                label = "NEUTRAL"
-                if any(x in doc_content for x in ["涨", "利好", "突破", "新高"]):
-                    card_color = "green"
-                    label = "POSITIVE"
-                elif any(x in doc_content for x in ["跌", "不及预期", "风险", "警告"]):
-                    card_color = "red"
-                    label = "NEGATIVE"
+                # 动态判断情绪颜色 (keywords.json 正/负面词表一遍扫描，后续接 LLM)
+                label = sentiment_label(get_engine().scan(doc_content))
+                card_color = LABEL_COLORS[label]
+                # feeder 结构化情报额外显示板块与评分
+                tag = (f" · {meta_data['sector']}-{meta_data.get('sub_sector', '通用')} · {meta_data.get('score', '-')}分"
+                       if 'sector' in meta_data else "")
                 
                 with st.container():
                     st.markdown(f"""
                     <div style="padding: 15px; border-radius: 10px; border: 1px solid #ddd; margin-bottom: 10px;">
                         <div style="display:flex; justify-content:space-between; align-items:center;">
-                            <span style="font-size:0.8em; color:gray;">📅 {meta_data['date']}</span>
+                            <span style="font-size:0.8em; color:gray;">📅 {meta_data['date']}{tag}</span>
                             <span style="background-color:{'#e6fffa' if label=='POSITIVE' else '#fff5f5'}; 
                                          color:{'#047857' if label=='POSITIVE' else '#c53030'}; 
                                          padding: 2px 8px; border-radius: 4px; font-size:0.8em; font-weight:bold;">
@@ -246,7 +242,7 @@ if search_triggered or query:
                         </div>
                         <div style="margin-top: 8px; font-size: 0.8em;">
                             <a href="{meta_data['link']}" target="_blank">查看原文 🔗</a> 
-                            &nbsp; | &nbsp; 语义匹配度: {similarity:.4f}
+                            &nbsp; | &nbsp; {match_text}
                         </div>
                     </div>
                     """, unsafe_allow_html=True)
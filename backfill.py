@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from dedup_index import content_hash
+from embedding_backends import EMBED_BACKEND, EMBED_BATCH_SIZE, EMBED_MAX_SEQ_LENGTH, load_backend
+from news_ingest import item_timestamp, to_metadata
+from news_store import NewsStore, NEWS_STORE_PATH
+from vector_store import get_collection, add_documents, VECTOR_DB_PATH
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_pipline"))
+from batch_packer import estimate_tokens  # noqa: E402
+
+# ================= 🚚 历史情报批量回灌 =================
+# 把历史情报 (分区情报库或旧版 CSV) 批量编码写入向量库:
+# - 按块流式读取，内存只与块大小有关，与归档总量无关
+# - 块内按 token 长度排序后再切批，同一批长度接近，padding 最少
+# - 多进程编码 (每个进程一份模型)，主进程负责去重、写库与断点；下一块编码与上一块写库重叠
+# - 每写完一块记录已处理行数，中断后重跑从断点继续 (要求归档只追加、不改写历史)
+BACKFILL_CHUNK_ROWS = 4096
+BACKFILL_STATE_PATH = os.getenv("BACKFILL_STATE_PATH", os.path.join(VECTOR_DB_PATH, "backfill_state.json"))
+
+_WORKER_BACKEND = None
+
+
+# ---------- 编码进程 ----------
+def _init_worker(backend_name, config):
+    global _WORKER_BACKEND
+    _WORKER_BACKEND = load_backend(backend_name, **config)
+
+
+def _encode(texts):
+    return np.asarray(_WORKER_BACKEND.encode(texts), dtype=np.float32)
+
+
+# ---------- 数据源 ----------
+def _rechunk(records, chunk_rows):
+    for start in range(0, len(records), chunk_rows):
+        yield records[start: start + chunk_rows]
+
+
+def iter_csv(path, chunk_rows=BACKFILL_CHUNK_ROWS, skip=0):
+    """旧版 news_data.csv: 跳过前 skip 行 (不解析)，之后每次产出 chunk_rows 条记录"""
+    reader = pd.read_csv(path, encoding="utf-8-sig", dtype=str, chunksize=chunk_rows,
+                         skiprows=range(1, skip + 1) if skip else None)
+    for chunk in reader:
+        yield chunk.to_dict("records")
+
+
+def iter_store(store, chunk_rows=BACKFILL_CHUNK_ROWS, skip=0):
+    """分区情报库: 按日期顺序逐个分区读取；已处理完的分区只读 footer 计数，不读数据"""
+    for day, _ in store.partitions():
+        rows = store.count(day, day)
+        if skip >= rows:
+            skip -= rows
+            continue
+        df = store.read(start=day, end=pd.Timestamp(day) + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1))
+        df = df.iloc[skip:]
+        skip = 0
+        for col in df.select_dtypes("category").columns:
+            df[col] = df[col].astype(object)
+        yield from _rechunk(df.to_dict("records"), chunk_rows)
+
+
+# ---------- 断点 ----------
+def load_state(path, source, restart=False):
+    """断点文件与当前数据源不一致 (或 restart) 时从头开始"""
+    fresh = {"source": source, "rows": 0, "added": 0, "skipped": 0}
+    if restart or not os.path.exists(path):
+        return fresh
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    return state if state.get("source") == source else fresh
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ---------- 主流程 ----------
+def _prepare(collection, records, in_flight, batch_size):
+    """块内去重 + 回库确认已入库的 ID，按 token 长度降序排序后切成编码批；日期无效的行跳过并计数"""
+    items, skipped = {}, 0
+    for item in records:
+        content = item.get("content")
+        if isinstance(content, str) and content:
+            if item_timestamp(item) is None:
+                skipped += 1
+                continue
+            doc_id = content_hash(content)
+            if doc_id not in in_flight:
+                items.setdefault(doc_id, item)
+    if items:
+        existing = set(collection.get(ids=list(items), include=[])["ids"])
+        items = {doc_id: item for doc_id, item in items.items() if doc_id not in existing}
+
+    ids = sorted(items, key=lambda doc_id: -estimate_tokens(items[doc_id]["content"]))
+    documents = [items[doc_id]["content"] for doc_id in ids]
+    metadatas = [to_metadata(items[doc_id]) for doc_id in ids]
+    batches = [documents[i: i + batch_size] for i in range(0, len(documents), batch_size)]
+    return ids, documents, metadatas, batches, skipped
+
+
+def backfill(source, collection, chunks, backend=EMBED_BACKEND, workers=None, batch_size=EMBED_BATCH_SIZE,
+             max_seq_length=EMBED_MAX_SEQ_LENGTH, state=None, state_path=BACKFILL_STATE_PATH, log=print):
+    """
+    chunks: 从断点之后开始的记录块迭代器 (iter_csv / iter_store)
+    返回更新后的断点状态
+    """
+    state = state or {"source": source, "rows": 0, "added": 0, "skipped": 0}
+    workers = workers or os.cpu_count() or 1
+    # 每个进程一个线程，进程数即并行度，避免线程超订
+    config = {"batch_size": batch_size, "threads": 1 if workers > 1 else 0, "max_seq_length": max_seq_length}
+    started, start_rows = time.perf_counter(), state["rows"]
+
+    pool = None
+    if workers > 1:
+        pool = get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(backend, config))
+    else:
+        _init_worker(backend, config)
+
+    def submit(batches):
+        if pool is None:
+            return lambda: [_encode(b) for b in batches]
+        return pool.map_async(_encode, batches, chunksize=1).get
+
+    def commit(n_rows, n_skipped, ids, documents, metadatas, result):
+        if ids:
+            embeddings = np.vstack(result())
+            add_documents(collection, ids, documents, embeddings.tolist(), metadatas)
+        state["rows"] += n_rows
+        state["added"] += len(ids)
+        state["skipped"] = state.get("skipped", 0) + n_skipped  # 旧断点文件没有这个字段
+        save_state(state_path, state)
+        elapsed = time.perf_counter() - started
+        log(f"   📥 已处理 {state['rows']} 行 | 新增 {state['added']} 条 | 日期无效跳过 {state['skipped']} 行 | "
+            f"{(state['rows'] - start_rows) / max(elapsed, 1e-9):.0f} 行/秒")
+
+    try:
+        pending, in_flight = None, set()
+        for records in chunks:
+            ids, documents, metadatas, batches, skipped = _prepare(collection, records, in_flight, batch_size)
+            job = submit(batches)
+            # 本块编码的同时写入上一块
+            if pending is not None:
+                commit(*pending)
+            pending, in_flight = (len(records), skipped, ids, documents, metadatas, job), set(ids)
+        if pending is not None:
+            commit(*pending)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="历史情报批量编码回灌向量库 (可断点续跑)")
+    parser.add_argument("--csv", help="旧版 news_data.csv 路径 (不传则读分区情报库)")
+    parser.add_argument("--store", default=NEWS_STORE_PATH, help="分区情报库目录")
+    parser.add_argument("--backend", default=EMBED_BACKEND)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="编码进程数")
+    parser.add_argument("--chunk-rows", type=int, default=BACKFILL_CHUNK_ROWS)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--max-seq-length", type=int, default=EMBED_MAX_SEQ_LENGTH)
+    parser.add_argument("--state", default=BACKFILL_STATE_PATH, help="断点文件")
+    parser.add_argument("--restart", action="store_true", help="忽略断点，从头开始")
+    args = parser.parse_args()
+
+    source = f"csv:{os.path.abspath(args.csv)}" if args.csv else f"store:{os.path.abspath(args.store)}"
+    state = load_state(args.state, source, restart=args.restart)
+    if state["rows"]:
+        print(f"⏩ 从断点继续: 已处理 {state['rows']} 行")
+    if args.csv:
+        chunks = iter_csv(args.csv, args.chunk_rows, skip=state["rows"])
+    else:
+        chunks = iter_store(NewsStore(args.store), args.chunk_rows, skip=state["rows"])
+
+    state = backfill(source, get_collection(), chunks, backend=args.backend, workers=args.workers,
+                     batch_size=args.batch_size, max_seq_length=args.max_seq_length,
+                     state=state, state_path=args.state)
+    print(f"✅ 回灌完成: 共处理 {state['rows']} 行，新增 {state['added']} 条，日期无效跳过 {state.get('skipped', 0)} 行")
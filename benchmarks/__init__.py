@@ -0,0 +1,3 @@
+"""
+DeepQuant 性能基准 (在仓库根目录执行: python -m benchmarks.<脚本名>)
+"""
@@ -0,0 +1,111 @@
+"""
+财联社抓取策略对比: 固定间隔拉最新 rn 条 vs 游标翻页 + 自适应间隔
+
+对接本地回放桩 (benchmarks.mock_cls)，用虚拟时钟回放合成的一整天电报 (含盘中和夜间突发)，
+统计请求数、下载条数、重复下载、漏抓条数与发现延迟。
+用法: python -m benchmarks.bench_cls_polling --fixed-interval 120 --date 2026-01-14
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.mock_cls import start_mock_cls, synthetic_timeline
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_pipline"))
+from cls_poller import ClsPoller, parse_telegraphs  # noqa: E402
+from poll_scheduler import AdaptiveScheduler  # noqa: E402
+from sector_strength import trading_session_mask  # noqa: E402
+
+
+class VirtualClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def summarize(strategy, timeline, first_seen, requests, downloaded, end):
+    due = [(ct, tg["id"]) for ct, tg in timeline if ct <= end]
+    delays = [first_seen[i] - ct for ct, i in due if i in first_seen]
+    seen_ctimes = [ct for ct, i in due if i in first_seen]
+    in_session = trading_session_mask([datetime.fromtimestamp(ct) for ct in seen_ctimes])
+    session_delays = np.asarray(delays)[in_session]
+    return {
+        "strategy": strategy,
+        "requests": requests,
+        "downloaded": downloaded,
+        "redundant": downloaded - len(first_seen),
+        "missed": len(due) - len(delays),
+        "delay_p50_s": round(float(np.percentile(delays, 50)), 1) if delays else None,
+        "delay_p95_s": round(float(np.percentile(delays, 95)), 1) if delays else None,
+        "session_delay_p95_s": round(float(np.percentile(session_delays, 95)), 1) if len(session_delays) else None,
+    }
+
+
+def run_fixed(base_url, clock, timeline, start, end, interval, rn):
+    import requests
+    session, first_seen, requests_made, downloaded = requests.Session(), {}, 0, 0
+    clock.now = start
+    while True:
+        page = parse_telegraphs(session.get(f"{base_url}/nodeapi/telegraphList", params={"rn": rn}).json()) or []
+        requests_made += 1
+        downloaded += len(page)
+        for tg in page:
+            first_seen.setdefault(tg["id"], clock.now)
+        if clock.now >= end:
+            break
+        clock.now = min(end, clock.now + interval)
+    return summarize(f"fixed_{interval}s_rn{rn}", timeline, first_seen, requests_made, downloaded, end)
+
+
+def run_adaptive(base_url, clock, timeline, start, end, rn):
+    poller = ClsPoller(url=f"{base_url}/nodeapi/telegraphList", page_size=rn, cursor_path=None)
+    scheduler = AdaptiveScheduler()
+    first_seen = {}
+    clock.now = start
+    poller.poll(backfill=rn)  # 开盘前先接上游标
+    poller.commit()
+    while True:
+        for item in poller.poll():
+            first_seen.setdefault(int(item["id"]), clock.now)
+        poller.commit()
+        scheduler.observe(poller.last_ctimes, now=clock.now)
+        if clock.now >= end:
+            break
+        clock.now = min(end, clock.now + scheduler.next_interval(now=clock.now))
+    s = poller.stats
+    result = summarize("cursor_adaptive", timeline, first_seen, s["requests"], s["downloaded"], end)
+    result["missed"] -= sum(1 for ct, _ in timeline if ct <= start)  # 起点之前的电报不在比较范围内
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", default="2026-01-14", help="回放日期 (工作日才有交易时段)")
+    parser.add_argument("--fixed-interval", type=int, default=120, help="固定策略的轮询间隔 (秒)")
+    parser.add_argument("--rn", type=int, default=20)
+    args = parser.parse_args()
+
+    midnight = time.mktime(time.strptime(args.date, "%Y-%m-%d"))
+    timeline = synthetic_timeline(midnight)
+    start, end = midnight + 60, midnight + 24 * 3600 - 60
+    clock = VirtualClock(start)
+    server, base_url = start_mock_cls(timeline, clock=clock)
+    try:
+        fixed = run_fixed(base_url, clock, timeline, start, end, args.fixed_interval, args.rn)
+        fixed["missed"] -= sum(1 for ct, _ in timeline if ct <= start)
+        print(json.dumps(fixed))
+        print(json.dumps(run_adaptive(base_url, clock, timeline, start, end, args.rn)))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Embedding 后端基准: 吞吐 (docs/sec)、单条查询延迟、与 FP32 的向量一致性
+
+每个后端直接调用 encode，不经过 EmbeddingCache。
+一致性 = 同一批文本在该后端与 torch (FP32) 上向量的余弦相似度 (均值 / 最小值)。
+
+用法: python -m benchmarks.bench_embedding --docs 512 --queries 50 --backends torch torch-int8 onnx-int8
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from embedding_backends import BACKENDS, EMBED_BATCH_SIZE, EMBED_MAX_SEQ_LENGTH, EMBED_THREADS, load_backend
+
+_CJK_START = 0x4E00
+
+
+def make_texts(rng, n, min_len=20, max_len=200):
+    # 中文正文里混入代码和英文，长度不一，贴近电报/资讯
+    alphabet = [chr(c) for c in range(_CJK_START, _CJK_START + 3000)]
+    texts = []
+    for i in range(n):
+        body = "".join(rng.choices(alphabet, k=rng.randint(min_len, max_len)))
+        texts.append(f"{body} ({rng.randrange(600000, 700000)}) GPU order {i}")
+    return texts
+
+
+def cosine_rows(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.einsum("ij,ij->i", a, b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=EMBED_THREADS)
+    parser.add_argument("--max-seq-length", type=int, default=EMBED_MAX_SEQ_LENGTH)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = make_texts(rng, args.docs)
+    queries = make_texts(rng, args.queries, min_len=4, max_len=20)
+    config = {"batch_size": args.batch_size, "threads": args.threads, "max_seq_length": args.max_seq_length}
+
+    reference = None
+    for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        t0 = time.perf_counter()
+        backend = load_backend(name, **config)
+        load_s = time.perf_counter() - t0
+        backend.encode(docs[:8])  # 预热
+
+        t0 = time.perf_counter()
+        vectors = np.asarray(backend.encode(docs), dtype=np.float32)
+        docs_per_s = len(docs) / (time.perf_counter() - t0)
+
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            backend.encode([q])
+            latencies.append((time.perf_counter() - t0) * 1e3)
+
+        if reference is None:
+            reference = vectors
+        parity = cosine_rows(vectors, reference)
+        if name not in args.backends:
+            continue  # 只作为一致性基准，不输出
+        print(json.dumps({
+            "backend": name,
+            "load_s": round(load_s, 2),
+            "docs_per_s": round(docs_per_s, 1),
+            "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "cos_vs_fp32_mean": round(float(parity.mean()), 4),
+            "cos_vs_fp32_min": round(float(parity.min()), 4),
+        }))
+
+
+if __name__ == "__main__":
+    main()
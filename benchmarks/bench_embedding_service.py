@@ -0,0 +1,100 @@
+"""
+共享 embedding 服务压测: 动态微批 vs 逐请求编码
+
+N 个并发客户端 (模拟多个看板用户) 各自连续发送单条查询，统计吞吐与延迟分位。
+默认用模拟编码器 (每批固定开销 + 每条边际开销，贴近 CPU 上 Transformer 前向的形状)，
+加 --backend 则加载真实模型。
+
+用法: python -m benchmarks.bench_embedding_service --clients 1 8 32 --requests 50
+      python -m benchmarks.bench_embedding_service --backend torch
+"""
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+from embedding_service import MAX_BATCH, MAX_WAIT_MS, EmbeddingClient, EmbeddingService, start_service
+
+
+class SimulatedEncoder:
+    """每次 encode 耗时 = batch_overhead_ms + per_item_ms * 条数 (sleep 释放 GIL，和真实推理一样可与 IO 重叠)"""
+
+    def __init__(self, batch_overhead_ms=8.0, per_item_ms=0.5, dim=384):
+        self.batch_overhead = batch_overhead_ms / 1000
+        self.per_item = per_item_ms / 1000
+        self.dim = dim
+        self._lock = threading.Lock()  # 单个模型副本同一时间只跑一个前向
+
+    def encode(self, texts, **kwargs):
+        with self._lock:
+            time.sleep(self.batch_overhead + self.per_item * len(texts))
+        return np.ones((len(texts), self.dim), dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+
+def run_load(base_url, backend, clients, requests_per_client):
+    latencies = []
+    lock = threading.Lock()
+
+    def user(uid):
+        client = EmbeddingClient(base_url, backend)
+        own = []
+        for i in range(requests_per_client):
+            t0 = time.perf_counter()
+            client.encode([f"用户{uid} 查询{i} 新能源利好"])
+            own.append((time.perf_counter() - t0) * 1e3)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=user, args=(u,)) for u in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=50, help="每个客户端的请求数")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--backend", help="加载真实后端 (torch / torch-int8 / onnx-int8)，不传则用模拟编码器")
+    args = parser.parse_args()
+
+    backend = args.backend or "simulated"
+    if args.backend:
+        from embedding_backends import load_backend
+        encoder = load_backend(args.backend)
+    else:
+        encoder = SimulatedEncoder()
+
+    modes = {"no_batching": (1, 0.0), "micro_batching": (args.max_batch, args.max_wait_ms)}
+    for clients in args.clients:
+        for mode, (max_batch, max_wait_ms) in modes.items():
+            service = EmbeddingService(loader=lambda _: encoder, max_batch=max_batch, max_wait_ms=max_wait_ms)
+            server, base_url = start_service(port=0, service=service)
+            try:
+                rps, p50, p95 = run_load(base_url, backend, clients, args.requests)
+            finally:
+                server.shutdown()
+                server.server_close()
+            print(json.dumps({
+                "clients": clients,
+                "mode": mode,
+                "req_per_s": round(rps, 1),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "avg_batch": round(service.batcher(backend).stats["avg_batch"], 1),
+            }))
+
+
+if __name__ == "__main__":
+    main()
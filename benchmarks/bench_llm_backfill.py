@@ -0,0 +1,60 @@
+"""
+冷启动回溯 (backfill) 吞吐基准: 不同并发度下 analyze_chunks 的处理速度
+
+对接本地 LLM 桩 (benchmarks.mock_llm)，不消耗真实 API 额度。
+用法: python -m benchmarks.bench_llm_backfill --items 100 --latency 0.5 --concurrency 1 2 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from benchmarks.mock_llm import start_mock_llm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_pipline"))
+import feeder  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+
+
+def make_items(n):
+    return [{"id": str(3_000_000 + i), "date": "2026-01-17 13:12", "content": f"合成电报 {i}: 某公司签订重大合同"}
+            for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--chunk-size", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5, help="桩服务每次请求的模拟延迟 (秒)")
+    parser.add_argument("--qps", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server, base_url = start_mock_llm(latency=args.latency)
+    feeder.BASE_URL = base_url
+    feeder.DEEPSEEK_API_KEY = "sk-mock"
+    feeder._LLM_CLIENT = None
+
+    items = make_items(args.items)
+    chunks = [items[i: i + args.chunk_size] for i in range(0, len(items), args.chunk_size)]
+    try:
+        for workers in args.concurrency:
+            feeder.LLM_LIMITER = RateLimiter(qps=args.qps, tokens_per_minute=10_000_000)
+            t0 = time.perf_counter()
+            results = feeder.analyze_chunks(chunks, max_workers=workers)
+            elapsed = time.perf_counter() - t0
+            analyzed = sum(len(r) for r in results)
+            print(json.dumps({
+                "concurrency": workers,
+                "items": args.items,
+                "analyzed": analyzed,
+                "seconds": round(elapsed, 3),
+                "items_per_s": round(analyzed / elapsed, 2),
+            }))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+内参板块强度计算基准: 旧实现 (逐行 apply + 按板块循环过滤) vs 向量化引擎
+
+用法: python -m benchmarks.bench_sector_strength --days 30 --per-day 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_pipline"))
+from sector_strength import SectorStrengthEngine, apply_decay, sector_strength  # noqa: E402
+
+SECTORS = {
+    "人工智能": ["AI硬件", "AI应用", "AI模型/数据", "通用"],
+    "半导体": ["半导体设备", "半导体材料", "芯片设计", "封测/制造"],
+    "新能源": ["锂电/固态电池", "光伏", "风电", "储能"],
+    "汽车产业链": ["整车", "汽配/自动驾驶", "飞行汽车(低空)"],
+    "医药医疗": ["创新药/CXO", "中药", "医疗器械"],
+    "数字经济": ["数据要素", "信创/国产软件", "算力租赁"],
+    "金融/地产": ["券商", "银行", "房地产", "保险"],
+    "全局": ["通用"],
+}
+
+
+def make_rows(days, per_day, now, seed=0):
+    rng = np.random.default_rng(seed)
+    n = days * per_day
+    sectors = rng.choice(list(SECTORS), n)
+    return pd.DataFrame({
+        "date": now - pd.to_timedelta(rng.uniform(0, days * 24, n), unit="h"),
+        "score": rng.integers(5, 11, n),
+        "sentiment": rng.uniform(-1, 1, n).round(2),
+        "summary": [f"摘要{i}" for i in range(n)],
+        "sector": sectors,
+        "sub_sector": [rng.choice(SECTORS[s]) for s in sectors],
+        "logic": "合成点评",
+        "related_stocks": "[]",
+    }).sort_values("date", ignore_index=True)
+
+
+def legacy_brief_stats(df, now, lookback_hours):
+    """generate_daily_brief 原有的第 3/4 步 (逐行 apply + 逐板块过滤)"""
+    def get_dynamic_half_life(dt):
+        is_workday = dt.weekday() < 5
+        hour_float = dt.hour + dt.minute / 60.0
+        is_trading_time = is_workday and ((9.5 <= hour_float <= 11.5) or (13.0 <= hour_float <= 15.0))
+        return 4.0 if is_trading_time else 24.0
+
+    recent_df = df[df['date'] >= (now - timedelta(hours=lookback_hours))].copy()
+    recent_df['half_life'] = recent_df['date'].apply(get_dynamic_half_life)
+    recent_df['hours_diff'] = (now - recent_df['date']).dt.total_seconds() / 3600.0
+    recent_df['decayed_score'] = recent_df['score'] * (0.5 ** (recent_df['hours_diff'] / recent_df['half_life']))
+    recent_df['freshness'] = recent_df['decayed_score'] / (recent_df['score'] + 0.01)
+
+    level1_stats = []
+    for sector in recent_df['sector'].unique():
+        if sector in ["其他", "全局", "nan"] or not isinstance(sector, str): continue
+        sec_df = recent_df[recent_df['sector'] == sector]
+        l1_strength = sec_df['decayed_score'].sort_values(ascending=False).head(3).mean()
+        if l1_strength < 4.0: continue
+        sub_stats = []
+        for sub in sec_df['sub_sector'].unique():
+            if not isinstance(sub, str) or sub == "通用": continue
+            sub_df = sec_df[sec_df['sub_sector'] == sub]
+            sub_stats.append(f"{sub}(强:{sub_df['decayed_score'].mean():.1f}/情绪:{sub_df['sentiment'].mean():.1f})")
+        level1_stats.append({
+            'sector': sector, 'strength': round(l1_strength, 2), 'count': len(sec_df),
+            'sub_details': " | ".join(sub_stats) if sub_stats else "全板块普涨",
+            'top_news': sec_df.sort_values('decayed_score', ascending=False).iloc[0]['summary'],
+        })
+    return pd.DataFrame(level1_stats).sort_values('strength', ascending=False)
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--per-day", type=int, default=2000)
+    parser.add_argument("--lookback", type=int, nargs="+", default=[24, 72, 24 * 30])
+    args = parser.parse_args()
+
+    now = datetime(2026, 1, 19, 8, 30)
+    df = make_rows(args.days, args.per_day, now)
+
+    for lookback in args.lookback:
+        engine = SectorStrengthEngine(max_lookback_hours=lookback)
+        _, prime_ms = timed(lambda: engine.update(df), repeat=1)
+        legacy, legacy_ms = timed(lambda: legacy_brief_stats(df, now, lookback))
+        (vectorized, _), engine_ms = timed(lambda: engine.snapshot(now, lookback))
+
+        def cold():
+            recent = df[df['date'] >= now - timedelta(hours=lookback)].copy()
+            return sector_strength(apply_decay(recent, now))
+        _, cold_ms = timed(cold)
+
+        same = legacy.reset_index(drop=True).equals(vectorized.reset_index(drop=True).astype(legacy.dtypes.to_dict()))
+        print(json.dumps({
+            "rows_total": len(df),
+            "lookback_h": lookback,
+            "legacy_ms": round(legacy_ms, 2),
+            "vectorized_cold_ms": round(cold_ms, 2),
+            "engine_snapshot_ms": round(engine_ms, 2),
+            "engine_prime_ms": round(prime_ms, 2),
+            "identical_output": bool(same),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+多数据源抓取基准: 逐个串行 (每次新建连接、无条件请求) vs SourceFetcher (并发 + 连接池 + 条件请求 + 熔断)
+
+对接本地桩: 财联社回放桩 (benchmarks.mock_cls) + 若干不同延迟的 RSS 桩 (benchmarks.mock_feeds)，
+其中一个 RSS 桩持续返回 500，观察熔断后它不再拖慢每一轮。
+用法: python -m benchmarks.bench_sources --latency 0.1 0.3 0.6 --rounds 6
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import feedparser
+import requests
+
+from benchmarks.mock_cls import start_mock_cls, synthetic_timeline
+from benchmarks.mock_feeds import start_mock_feed
+from news_sources import CircuitBreaker, HttpClient, RssAdapter, SourceFetcher
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_pipline"))
+from cls_poller import ClsAdapter, ClsPoller  # noqa: E402
+
+
+def serial_round(cls_url, feed_urls):
+    """旧做法: 每个源一个 requests.get (新连接)，依次执行，RSS 每次全量下载解析"""
+    items = 0
+    try:
+        items += len(requests.get(cls_url, params={"rn": 20}, timeout=10).json()["data"]["roll_data"])
+    except Exception:
+        pass
+    for url in feed_urls:
+        try:
+            resp = requests.get(url, timeout=10)
+            resp.raise_for_status()
+            items += len(feedparser.parse(resp.content).entries)
+        except Exception:
+            pass
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.1, 0.3, 0.6], help="各 RSS 桩的响应延迟 (秒)")
+    parser.add_argument("--broken-latency", type=float, default=0.5, help="故障源 (500) 的响应延迟")
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--update-every", type=int, default=3, help="RSS 源每隔几轮更新一次内容")
+    args = parser.parse_args()
+
+    now = [time.time()]
+    timeline = synthetic_timeline(now[0] - 3600, hours=1)
+    cls_server, cls_base = start_mock_cls(timeline, clock=lambda: now[0])
+    cls_url = f"{cls_base}/nodeapi/telegraphList"
+    feeds = [start_mock_feed(f"rss{i}", latency=lat) for i, lat in enumerate(args.latency)]
+    broken = start_mock_feed("broken", latency=args.broken_latency, fail=True)
+    servers = [cls_server, broken[0]] + [s for s, _ in feeds]
+    feed_urls = [f"{url}/feed" for _, url in feeds] + [f"{broken[1]}/feed"]
+
+    try:
+        for mode in ("serial", "fetcher"):
+            for server, _ in feeds + [broken]:
+                server.handler.version, server.handler.requests_served = 1, 0
+                server.handler.not_modified, server.handler.connections = 0, 0
+            client = HttpClient()
+            adapters = {"cls": ClsAdapter(ClsPoller(url=cls_url, cursor_path=None))}
+            adapters.update({f"rss{i}": RssAdapter(url) for i, url in enumerate(feed_urls)})
+            fetcher = SourceFetcher(adapters, client=client,
+                                    breakers={name: CircuitBreaker(failures=2) for name in adapters})
+            timings, statuses = [], []
+            for r in range(args.rounds):
+                if r and r % args.update_every == 0:
+                    for server, _ in feeds:
+                        server.handler.version += 1
+                now[0] += 60
+                t0 = time.perf_counter()
+                if mode == "serial":
+                    serial_round(cls_url, feed_urls)
+                else:
+                    results = fetcher.fetch_all()
+                    adapters["cls"].poller.commit()
+                    statuses.append({name: res["status"] for name, res in results.items()})
+                timings.append((time.perf_counter() - t0) * 1000)
+            fetcher.close()
+            print(json.dumps({
+                "mode": mode,
+                "round_ms": [round(t) for t in timings],
+                "total_ms": round(sum(timings)),
+                "rss_requests": sum(s.handler.requests_served for s, _ in feeds + [broken]),
+                "rss_304": sum(s.handler.not_modified for s, _ in feeds),
+                "rss_connections": sum(s.handler.connections for s, _ in feeds),
+                "last_status": statuses[-1] if statuses else None,
+            }, ensure_ascii=False))
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+向量库冷/热启动基准
+
+冷启动: 内存模式，重启后需要把全部历史重新写入 (不含编码耗时，仅写入+建索引)
+热启动: 持久化模式，新进程打开已有目录 + 首次查询 (time-to-first-query)
+
+用法: python -m benchmarks.bench_startup --sizes 10000 100000
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from vector_store import get_collection, add_documents
+
+DIM = 384
+
+
+def make_corpus(n, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, DIM)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    ids = [f"doc-{i}" for i in range(n)]
+    docs = [f"合成新闻 {i}" for i in range(n)]
+    metas = [{"date": "2026-01-14", "link": ""} for _ in range(n)]
+    return ids, docs, vecs, metas
+
+
+def cold_start(n):
+    ids, docs, vecs, metas = make_corpus(n)
+    t0 = time.perf_counter()
+    collection = get_collection(name=f"bench_cold_{n}", mode="memory")
+    add_documents(collection, ids, docs, vecs, metas)
+    collection.query(query_embeddings=vecs[:1], n_results=3)
+    return time.perf_counter() - t0
+
+
+def build_persistent(n, path):
+    ids, docs, vecs, metas = make_corpus(n)
+    collection = get_collection(mode="persistent", path=path)
+    add_documents(collection, ids, docs, vecs, metas)
+
+
+def warm_start(path):
+    # 必须在新进程里测，避免复用本进程已加载的段
+    code = (
+        "import time, json, numpy as np\n"
+        "t0 = time.perf_counter()\n"
+        "from vector_store import get_collection\n"
+        f"c = get_collection(mode='persistent', path={path!r})\n"
+        "t1 = time.perf_counter()\n"
+        f"q = np.random.default_rng(1).standard_normal((1, {DIM})).astype(np.float32)\n"
+        "c.query(query_embeddings=q, n_results=3)\n"
+        "t2 = time.perf_counter()\n"
+        "print(json.dumps({'open_s': t1 - t0, 'first_query_s': t2 - t0}))\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        path = tempfile.mkdtemp(prefix="bench_chroma_")
+        try:
+            cold = cold_start(n)
+            build_persistent(n, path)
+            warm = warm_start(path)
+            print(json.dumps({
+                "docs": n,
+                "cold_start_s": round(cold, 3),
+                "warm_open_s": round(warm["open_s"], 3),
+                "warm_first_query_s": round(warm["first_query_s"], 3),
+            }))
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+本地财联社电报接口回放桩 (/nodeapi/telegraphList)
+
+按时间线回放电报: 只返回 ctime <= 当前回放时刻的条目，新 -> 旧，rn 条一页；
+带 lastTime 时只返回 ctime < lastTime 的条目 (向前翻页)。
+回放时刻由 clock() 决定: 压测里直接拨动虚拟时钟，命令行模式按 --speed 倍速走真实时间。
+
+用法:
+    server, base_url = start_mock_cls(timeline, clock=lambda: virtual_now)
+    poller = ClsPoller(url=f"{base_url}/nodeapi/telegraphList", cursor_path=None)
+    ...
+    server.shutdown()
+"""
+import bisect
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SAMPLE_TOPICS = ["央行", "新能源", "半导体", "券商", "光伏", "AI算力", "创新药", "低空经济"]
+
+
+def synthetic_timeline(start, hours=24, base_per_hour=20, bursts=((9.6, 0.05, 1200), (21.0, 0.1, 600)), seed=7):
+    """
+    生成一天的电报时间线 [(ctime, 电报)]，按 ctime 递增。
+    bursts: (距 start 的小时数, 持续小时数, 每小时条数)，模拟突发行情
+    """
+    rng = random.Random(seed)
+    ctimes = []
+    t = start
+    while t < start + hours * 3600:
+        t += rng.expovariate(base_per_hour / 3600)
+        ctimes.append(int(t))
+    for offset, duration, per_hour in bursts:
+        b0 = start + offset * 3600
+        ctimes.extend(int(b0 + rng.uniform(0, duration * 3600)) for _ in range(int(duration * per_hour)))
+    ctimes.sort()
+    return [(ct, {"id": 100000 + i, "ctime": ct, "title": f"【{rng.choice(SAMPLE_TOPICS)}】快讯{i}",
+                  "content": f"模拟电报正文 {i}"}) for i, ct in enumerate(ctimes)]
+
+
+class MockClsHandler(BaseHTTPRequestHandler):
+    timeline = []   # [(ctime, 电报)]，按 ctime 递增
+    ctimes = []
+    clock = staticmethod(time.time)
+    latency = 0.0
+    requests_served = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/nodeapi/telegraphList":
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        rn = int(query.get("rn", ["20"])[0])
+        # 回放时刻之后的电报还没"发生"；lastTime 翻页时只看更早的
+        end = bisect.bisect_right(self.ctimes, int(self.clock()))
+        if "lastTime" in query:
+            end = min(end, bisect.bisect_left(self.ctimes, int(query["lastTime"][0])))
+        page = [tg for _, tg in reversed(self.timeline[max(0, end - rn): end])]
+
+        if self.latency:
+            time.sleep(self.latency)
+        type(self).requests_served += 1
+        body = json.dumps({"error": 0, "data": {"roll_data": page}}, ensure_ascii=False).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_mock_cls(timeline, clock=time.time, host="127.0.0.1", port=0, latency=0.0):
+    """在后台线程启动回放桩，返回 (server, base_url)；server.handler.requests_served 为已服务请求数"""
+    handler = type("ConfiguredMockClsHandler", (MockClsHandler,), {
+        "timeline": timeline, "ctimes": [ct for ct, _ in timeline], "clock": staticmethod(clock),
+        "latency": latency, "requests_served": 0,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.handler = handler
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地财联社电报接口回放桩")
+    parser.add_argument("--port", type=int, default=8809)
+    parser.add_argument("--speed", type=float, default=60.0, help="回放倍速 (虚拟秒 / 真实秒)")
+    parser.add_argument("--start-hour", type=float, default=9.0, help="回放从当天几点开始")
+    args = parser.parse_args()
+
+    midnight = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+    replay_start = midnight + args.start_hour * 3600
+    real_start = time.time()
+    timeline = synthetic_timeline(midnight)
+    server, url = start_mock_cls(timeline, clock=lambda: replay_start + (time.time() - real_start) * args.speed,
+                                 port=args.port)
+    print(f"Mock CLS listening on {url} (CLS_TELEGRAPH_URL={url}/nodeapi/telegraphList, {len(timeline)} 条)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,87 @@
+"""
+本地 RSS 源桩: 固定延迟 + ETag / Last-Modified 条件请求 + 可切换的故障模式
+
+每个桩服务一份 RSS (items 条)，内容版本号 version 变化时 ETag 随之变化；
+请求带上匹配的 If-None-Match / If-Modified-Since 时返回 304 空包体。
+fail=True 时返回 500，用来触发熔断。
+
+用法:
+    server, base_url = start_mock_feed(latency=0.3)
+    adapter = RssAdapter(f"{base_url}/feed")
+    server.handler.version += 1   # 模拟源更新
+    server.shutdown()
+"""
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def render_rss(name, version, items):
+    entries = "".join(
+        f"<item><title>{name} 快讯 v{version}-{i}</title><link>http://example.com/{name}/{version}/{i}</link>"
+        f"<description>{name} 第 {version} 版第 {i} 条摘要</description>"
+        f"<pubDate>{formatdate(1768348800 + version * 60 + i, usegmt=True)}</pubDate></item>"
+        for i in range(items))
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>{name}</title>'
+            f"{entries}</channel></rss>").encode()
+
+
+class MockFeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持 keep-alive，连接池才有意义
+    name = "feed"
+    items = 10
+    latency = 0.0
+    version = 1
+    fail = False
+    requests_served = 0
+    not_modified = 0
+    connections = 0
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests_served += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{self.name}-v{self.version}"'
+        last_modified = formatdate(1768348800 + self.version * 60, usegmt=True)
+        if self.headers.get("If-None-Match") == etag or (
+                "If-None-Match" not in self.headers and self.headers.get("If-Modified-Since") == last_modified):
+            cls.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        body = render_rss(self.name, self.version, self.items)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_mock_feed(name="feed", host="127.0.0.1", port=0, latency=0.0, items=10, fail=False):
+    """在后台线程启动 RSS 桩，返回 (server, base_url)；server.handler 上可改 version / fail 并读计数"""
+    handler = type("ConfiguredMockFeedHandler", (MockFeedHandler,), {
+        "name": name, "latency": latency, "items": items, "fail": fail,
+        "version": 1, "requests_served": 0, "not_modified": 0, "connections": 0,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.handler = handler
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,170 @@
+"""
+本地 OpenAI 兼容 (DeepSeek) chat 接口桩
+
+从 prompt 的【输入新闻】里解析出 id，按 feeder 要求的字段返回 JSON 列表。
+支持普通响应与 stream=True 的 SSE 流式响应。
+可配置: 固定延迟、随机失败率 (返回 429)、前 N 次必定失败 (测重试)、输出截断比例 (模拟 max_tokens 截断)、
+前后夹带废话 (模拟不守规矩的模型)。
+
+用法:
+    server, base_url = start_mock_llm(latency=0.5)
+    feeder.BASE_URL = base_url
+    ...
+    server.shutdown()
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ID_PATTERN = re.compile(r'"id":\s*"([^"]+)"')
+
+SECTORS = [
+    ("人工智能", "AI硬件"), ("人工智能", "AI应用"), ("半导体", "半导体设备"),
+    ("新能源", "锂电/固态电池"), ("新能源", "光伏"), ("医药医疗", "创新药/CXO"),
+    ("数字经济", "数据要素"), ("金融/地产", "券商"),
+]
+
+
+def fake_analysis(news_id):
+    """根据 id 生成确定性的分析结果 (同一 id 每次返回相同内容)"""
+    rng = random.Random(news_id)
+    sector, sub_sector = rng.choice(SECTORS)
+    return {
+        "id": news_id,
+        "score": rng.randint(0, 10),
+        "sentiment": round(rng.uniform(-1, 1), 2),
+        "summary": f"模拟摘要{news_id[-4:]}",
+        "sector": sector,
+        "sub_sector": sub_sector,
+        "type": rng.choice(["Policy", "Micro", "Industry", "Noise"]),
+        "impact_horizon": rng.choice(["Immediate", "Short", "Medium"]),
+        "key_trigger": rng.choice(["政策", "业绩", "合同", "其他"]),
+        "related_stocks": [],
+        "logic": "模拟点评",
+    }
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+    fail_first = 0         # 前 N 次请求固定返回 429
+    requests_served = 0
+    lock = threading.Lock()
+    truncate_ratio = None  # 如 0.6: 只返回前 60% 的内容，finish_reason=length
+    chatty = False
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+
+        if self.latency:
+            time.sleep(self.latency)
+        cls = type(self)
+        with cls.lock:
+            cls.requests_served += 1
+            served = cls.requests_served
+        if served <= self.fail_first or (self.fail_rate and random.random() < self.fail_rate):
+            self._send(429, {"error": {"message": "rate limited (mock)", "type": "rate_limit"}})
+            return
+
+        ids = _ID_PATTERN.findall(prompt.split("【输入新闻】", 1)[-1])
+        content = "```json\n" + json.dumps([fake_analysis(i) for i in ids], ensure_ascii=False) + "\n```"
+        if self.chatty:
+            content = "好的，以下是分析结果：\n" + content + "\n如需进一步解读请告诉我。"
+        finish_reason = "stop"
+        if self.truncate_ratio is not None:
+            content = content[:int(len(content) * self.truncate_ratio)]
+            finish_reason = "length"
+
+        prompt_tokens = len(prompt)
+        completion_tokens = len(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if request.get("stream"):
+            self._stream(request, content, finish_reason, usage)
+            return
+
+        self._send(200, {
+            "id": "mock-completion",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "deepseek-chat"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, request, content, finish_reason, usage, piece=24):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def event(payload):
+            self.wfile.write(b"data: " + json.dumps(payload, ensure_ascii=False).encode() + b"\n\n")
+
+        base = {"id": "mock-completion", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": request.get("model", "deepseek-chat")}
+        for i in range(0, len(content), piece):
+            event({**base, "choices": [{"index": 0, "delta": {"content": content[i: i + piece]},
+                                        "finish_reason": None}]})
+        event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+        if (request.get("stream_options") or {}).get("include_usage"):
+            event({**base, "choices": [], "usage": usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def start_mock_llm(host="127.0.0.1", port=0, latency=0.0, fail_rate=0.0, truncate_ratio=None, chatty=False,
+                   fail_first=0):
+    """在后台线程启动桩服务，返回 (server, base_url)；server.handler.requests_served 为已服务请求数"""
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {
+        "latency": latency, "fail_rate": fail_rate, "truncate_ratio": truncate_ratio, "chatty": chatty,
+        "fail_first": fail_first, "requests_served": 0, "lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.handler = handler
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地 DeepSeek/OpenAI chat 接口桩")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-ratio", type=float, default=None)
+    parser.add_argument("--chatty", action="store_true")
+    args = parser.parse_args()
+
+    server, url = start_mock_llm(port=args.port, latency=args.latency, fail_rate=args.fail_rate,
+                                 truncate_ratio=args.truncate_ratio, chatty=args.chatty)
+    print(f"Mock LLM listening on {url} (DEEPSEEK_BASE_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,351 @@
+"""
+合成语料基准套件: 一次跑完主要环节，结果写成 JSON，可与基线对比找回退
+
+- ingest:    news_ingest.ingest 写入内存向量库 + 倒排索引的吞吐 (条/秒)
+- embedding: 编码速度 (条/秒)；默认用确定性的 HashEncoder，--backend torch/onnx/... 测真实模型
+- query:     QueryCache.search 纯向量 / 混合检索的 p50 / p99 (毫秒，不含结果缓存命中)
+- brief:     generate_daily_brief 冷启动 (从分区库预热) 与热调用耗时，LLM 指向本地桩
+- resonance: 共振雷达按事件时间逐批 observe 的单条成本 (微秒/条)，内存版与落盘版 (persisted) 各一份
+- pipeline:  run_pipeline 单轮耗时，财联社与 LLM 都走本地桩 (benchmarks.mock_cls / mock_llm)
+
+feeder 的落盘状态 (游标、去重快照、分析缓存、分区库 ...) 全部重定向到临时目录，不碰真实数据。
+
+用法:
+    python -m benchmarks.run_suite --scale 100000 --out bench_results/baseline.json
+    python -m benchmarks.run_suite --scale 100000 --compare bench_results/baseline.json
+    python -m benchmarks.run_suite --only query brief --scale 1000000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import COMPANIES, THEMES, HashEncoder, cls_timeline, make_analyzed, make_telegrams
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = ("embedding", "ingest", "query", "brief", "resonance", "pipeline")
+REGRESSION_THRESHOLD = 0.15  # 比基线差 15% 以上算回退
+
+
+def _quantiles_ms(samples):
+    p50, p99 = np.percentile(np.asarray(samples) * 1000, [50, 99])
+    return {"p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3)}
+
+
+def _stage_totals(registry, name):
+    """从指标快照里取某个直方图各 stage 的累计秒数"""
+    return {h["labels"].get("stage", "total"): round(h["sum"], 4)
+            for h in registry.snapshot()["histograms"] if h["name"] == name}
+
+
+def _queries(n, seed):
+    rng = np.random.default_rng(seed)
+    themes = [t for group in THEMES.values() for t in group]
+    # 一半主题词、一半公司名 + 主题，覆盖混合检索的实体直达与向量兜底两条路径
+    return [f"{themes[rng.integers(len(themes))]}订单" if i % 2 else
+            f"{COMPANIES[rng.integers(len(COMPANIES))]} {themes[rng.integers(len(themes))]}" for i in range(n)]
+
+
+def load_encoder(backend):
+    if backend == "hash":
+        return HashEncoder()
+    from embedding_backends import load_backend
+    return load_backend(backend)
+
+
+# ---------- 各项基准 ----------
+def bench_embedding(args, frame, encoder):
+    docs = frame["content"].head(args.embed_docs).tolist()
+    encoder.encode(docs[:8])  # 预热 (模型懒加载、线程池启动)
+    started = time.perf_counter()
+    encoder.encode(docs)
+    elapsed = time.perf_counter() - started
+    return {"backend": args.backend, "docs": len(docs), "seconds": round(elapsed, 3),
+            "docs_per_s": round(len(docs) / elapsed, 1)}
+
+
+def bench_ingest(args, frame, encoder, state):
+    from lexical_index import LexicalIndex
+    from metrics import REGISTRY
+    from news_ingest import ingest
+    from vector_store import get_collection
+
+    REGISTRY.reset()
+    collection = get_collection(name=f"bench_{int(time.time())}", mode="memory")
+    lexical = LexicalIndex()
+    records = frame.head(args.ingest_rows or len(frame)).to_dict("records")
+    started = time.perf_counter()
+    added = sum(ingest(collection, encoder, records[i: i + args.ingest_batch], lexical=lexical)
+                for i in range(0, len(records), args.ingest_batch))
+    elapsed = time.perf_counter() - started
+    state.update(collection=collection, lexical=lexical)
+    return {"items": added, "batch": args.ingest_batch, "seconds": round(elapsed, 3),
+            "items_per_s": round(added / elapsed, 1), "stages_s": _stage_totals(REGISTRY, "ingest_stage_seconds")}
+
+
+def bench_query(args, frame, encoder, state):
+    from query_cache import QueryCache
+
+    if "collection" not in state:
+        bench_ingest(args, frame, encoder, state)
+    queries = _queries(args.queries, args.seed)
+    results = {}
+    for mode, lexical in (("vector", None), ("hybrid", state["lexical"])):
+        cache = QueryCache(encoder)
+        samples = []
+        for q in queries:
+            started = time.perf_counter()
+            cache.search(state["collection"], q, n_results=5, lexical=lexical)
+            samples.append(time.perf_counter() - started)
+        results[mode] = {"queries": len(queries), **_quantiles_ms(samples)}
+    return {"corpus": state["collection"].count(), **results}
+
+
+def bench_brief(args, frame, feeder):
+    from metrics import REGISTRY
+    from sector_strength import SectorStrengthEngine
+
+    started = time.perf_counter()
+    feeder.NEWS_STORE.append(frame)
+    append_s = time.perf_counter() - started
+
+    samples = {}
+    feeder.SECTOR_ENGINE = SectorStrengthEngine(max_lookback_hours=72)
+    for label in ("cold", "warm"):
+        REGISTRY.reset()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            feeder.generate_daily_brief()
+            samples[label] = time.perf_counter() - started
+        if label == "cold":
+            stages = _stage_totals(REGISTRY, "brief_stage_seconds")
+    return {"rows": len(frame), "store_append_s": round(append_s, 3), "cold_s": round(samples["cold"], 4),
+            "warm_s": round(samples["warm"], 4), "cold_stages_s": stages,
+            "engine_rows": len(feeder.SECTOR_ENGINE)}
+
+
+def _replay_resonance(detector, records, ctimes, batch):
+    # 按事件时间回放: 每批的 now 取批内最后一条的发布时间，窗口过期与线上一致
+    alerts = 0
+    started = time.perf_counter()
+    for i in range(0, len(records), batch):
+        alerts += len(detector.observe(records[i: i + batch], now=float(ctimes[min(i + batch, len(records)) - 1])))
+    return alerts, time.perf_counter() - started
+
+
+def bench_resonance(args, frame, tmp):
+    from resonance import ResonanceDetector
+
+    tz = datetime.now().astimezone().tzinfo
+    ctimes = pd.DatetimeIndex(pd.to_datetime(frame["date"])).as_unit("ns").tz_localize(tz).asi8 // 10 ** 9
+    records = frame[["sector", "sub_sector", "score", "summary"]].to_dict("records")
+    alerts, elapsed = _replay_resonance(ResonanceDetector(state_path=None), records, ctimes, args.resonance_batch)
+    # 与线上一样开着落盘再跑一遍 (追加写 + 定期压缩)
+    state_path = os.path.join(tmp, "bench_resonance_state.jsonl")
+    _, persisted = _replay_resonance(ResonanceDetector(state_path=state_path), records, ctimes, args.resonance_batch)
+    with open(state_path, encoding="utf-8") as f:
+        state_lines = sum(1 for _ in f)
+    return {"items": len(records), "batch": args.resonance_batch, "alerts": alerts,
+            "seconds": round(elapsed, 3), "us_per_item": round(elapsed / len(records) * 1e6, 2),
+            "persisted": {"seconds": round(persisted, 3), "us_per_item": round(persisted / len(records) * 1e6, 2),
+                          "state_lines": state_lines}}
+
+
+def bench_pipeline(args, feeder, llm_url):
+    from benchmarks.mock_cls import start_mock_cls
+    from metrics import REGISTRY
+    from rate_limiter import RateLimiter
+
+    end = datetime.now()
+    start = end - timedelta(hours=args.pipeline_hours)
+    telegrams = make_telegrams(args.pipeline_items, start, end, seed=args.seed + 7)
+    step = args.pipeline_hours * 3600 / args.cycles
+    clock = [start.timestamp()]
+    server, base_url = start_mock_cls(cls_timeline(telegrams), clock=lambda: clock[0])
+
+    feeder.CLS_POLLER.url = f"{base_url}/nodeapi/telegraphList"
+    feeder.LLM_LIMITER = RateLimiter(qps=args.llm_qps, tokens_per_minute=10_000_000)
+    REGISTRY.reset()
+    samples = []
+    try:
+        for cycle in range(args.cycles):
+            clock[0] += step
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                feeder.run_pipeline(is_first_run=cycle == 0)
+                samples.append(time.perf_counter() - started)
+    finally:
+        server.shutdown()
+
+    counters = {c["labels"]["stage"]: c["value"] for c in REGISTRY.snapshot()["counters"]
+                if c["name"] == "pipeline_items_total"}
+    return {"cycles": len(samples), "telegrams": len(telegrams), "llm_latency_s": args.llm_latency,
+            "truncate_ratio": args.truncate_ratio, "requests_to_cls": server.handler.requests_served,
+            "cycle_total_s": round(sum(samples), 3), **_quantiles_ms(samples),
+            "stages_s": _stage_totals(REGISTRY, "pipeline_stage_seconds"), "items": counters}
+
+
+# ---------- 运行 / 对比 ----------
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _prepare_env(tmp):
+    """在 import feeder 之前把它的落盘路径全部指到临时目录"""
+    os.environ.update({
+        "NEWS_STORE_PATH": os.path.join(tmp, "news_store"),
+        "CLS_CURSOR_PATH": os.path.join(tmp, "cls_cursor.json"),
+        "ANALYSIS_CACHE_PATH": os.path.join(tmp, "analysis_cache.sqlite"),
+        "RESONANCE_STATE_PATH": os.path.join(tmp, "resonance_state.jsonl"),
+        "SEEN_STORE_PATH": os.path.join(tmp, "seen_store.bin"),
+        "VECTOR_DB_MODE": "memory",
+        "METRICS_PORT": "0",
+        "METRICS_JSONL_PATH": "",
+    })
+    sys.path.insert(0, os.path.join(ROOT, "data_pipline"))
+
+
+def run(args):
+    selected = args.only or BENCHMARKS
+    frame = make_analyzed(args.scale, days=args.days, seed=args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="deepquant_bench_") as tmp:
+        _prepare_env(tmp)
+        from benchmarks.mock_llm import start_mock_llm
+        import feeder
+
+        server, llm_url = start_mock_llm(latency=args.llm_latency, truncate_ratio=args.truncate_ratio)
+        feeder.BASE_URL = llm_url
+        feeder.DEEPSEEK_API_KEY = "sk-mock"
+        feeder._LLM_CLIENT = None
+        feeder.RESONANCE.state_path = None
+        try:
+            state = {}
+            encoder = HashEncoder()
+            for name in BENCHMARKS:
+                if name not in selected:
+                    continue
+                print(f"▶ {name} ...", file=sys.stderr)
+                try:
+                    if name == "embedding":
+                        results[name] = bench_embedding(args, frame, load_encoder(args.backend))
+                    elif name == "ingest":
+                        results[name] = bench_ingest(args, frame, encoder, state)
+                    elif name == "query":
+                        results[name] = bench_query(args, frame, encoder, state)
+                    elif name == "brief":
+                        results[name] = bench_brief(args, frame, feeder)
+                    elif name == "resonance":
+                        results[name] = bench_resonance(args, frame, tmp)
+                    else:
+                        results[name] = bench_pipeline(args, feeder, llm_url)
+                except Exception as e:
+                    results[name] = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            server.shutdown()
+            feeder.SOURCE_FETCHER.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+
+def _flatten(results, prefix=""):
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{path}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def _direction(path):
+    """1 = 越大越好，-1 = 越小越好，0 = 不参与对比 (条数、配置项)"""
+    if path.endswith("_per_s"):
+        return 1
+    if path.endswith(("_ms", "_s", "us_per_item")) and "latency" not in path:
+        return -1
+    return 0
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """返回 [(指标, 基线, 当前, 变化比例)]，只列出变差超过 threshold 的项"""
+    base = dict(_flatten(baseline["results"]))
+    regressions = []
+    for path, value in _flatten(current["results"]):
+        direction = _direction(path)
+        old = base.get(path)
+        if not direction or not old:
+            continue
+        change = (value - old) / abs(old)
+        if change * direction < -threshold:
+            regressions.append((path, old, value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=20_000, help="已分析情报行数 (brief / resonance / ingest 语料)")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS)
+    parser.add_argument("--backend", default="hash", help="embedding 基准用的编码器: hash 或 embedding_backends 里的名称")
+    parser.add_argument("--embed-docs", type=int, default=2000)
+    parser.add_argument("--ingest-rows", type=int, default=None, help="默认等于 --scale")
+    parser.add_argument("--ingest-batch", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--resonance-batch", type=int, default=20)
+    parser.add_argument("--pipeline-items", type=int, default=600, help="回放给 run_pipeline 的电报条数")
+    parser.add_argument("--pipeline-hours", type=float, default=6.0)
+    parser.add_argument("--cycles", type=int, default=30)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="LLM 桩每次请求的延迟 (秒)")
+    parser.add_argument("--truncate-ratio", type=float, default=None, help="LLM 桩按比例截断输出 (模拟 max_tokens)")
+    parser.add_argument("--llm-qps", type=float, default=20.0)
+    parser.add_argument("--out", default=None, help="结果 JSON 路径 (默认只打印)")
+    parser.add_argument("--compare", default=None, help="基线 JSON；有指标变差超过 --threshold 时返回非零")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for path, old, new, change in regressions:
+            print(f"⚠️ 回退 {path}: {old} -> {new} ({change:+.1%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"✅ 与基线 {baseline['meta'].get('git_commit')} 相比无明显回退", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
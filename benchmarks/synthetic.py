@@ -0,0 +1,170 @@
+"""
+合成语料: 财联社风格电报 + 与 news_data.csv 同 schema 的已分析情报
+
+- make_telegrams: 带板块主题词、公司名、金额比例的电报正文，约 5% 命中噪音词表；时间偏向交易时段
+- make_analyzed:  在电报基础上补齐 LLM 打标字段 (score / sentiment / sector / sub_sector ...)，返回 DataFrame
+- HashEncoder:    字符 bigram 哈希投影的确定性编码器，接口与 SentenceTransformer 一致，
+                  用来在不加载真实模型时单独测量存储 / 检索开销
+
+用法: python -m benchmarks.synthetic --rows 100000 --out synthetic_news.csv
+"""
+import argparse
+import json
+import random
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+SECTORS = {
+    "人工智能": ["AI硬件", "AI应用", "AI模型/数据", "通用"],
+    "半导体": ["半导体设备", "半导体材料", "芯片设计", "封测/制造"],
+    "新能源": ["锂电/固态电池", "光伏", "风电", "储能"],
+    "汽车产业链": ["整车", "汽配/自动驾驶", "飞行汽车(低空)"],
+    "医药医疗": ["创新药/CXO", "中药", "医疗器械"],
+    "数字经济": ["数据要素", "信创/国产软件", "算力租赁"],
+    "金融/地产": ["券商", "银行", "房地产", "保险"],
+    "全局": ["通用"],
+}
+THEMES = {
+    "人工智能": ("光模块", "算力服务器", "大模型", "AI眼镜"),
+    "半导体": ("光刻机", "刻蚀设备", "先进封装", "碳化硅衬底"),
+    "新能源": ("固态电池", "钙钛矿组件", "海上风电", "储能电站"),
+    "汽车产业链": ("智能驾驶", "一体化压铸", "eVTOL", "线控底盘"),
+    "医药医疗": ("ADC新药", "GLP-1", "中药配方颗粒", "手术机器人"),
+    "数字经济": ("数据资产入表", "国产操作系统", "智算中心", "政务云"),
+    "金融/地产": ("并购重组", "降准", "保交楼", "险资入市"),
+    "全局": ("稳增长", "印花税", "注册制", "中长期资金入市"),
+}
+COMPANIES = ["中际旭创", "寒武纪", "北方华创", "中微公司", "宁德时代", "隆基绿能", "比亚迪", "赛力斯",
+             "恒瑞医药", "药明康德", "浪潮信息", "中科曙光", "中信证券", "招商银行", "万科A", "中国平安",
+             "科大讯飞", "立讯精密", "阳光电源", "亿纬锂能"]
+EVENTS = (
+    ("合同", "Micro", "{c}：签订{a}亿元{t}采购合同，约占公司上年营收{p}%"),
+    ("业绩", "Micro", "{c}：前三季度净利润同比增长{p}%，{t}业务收入大幅提升"),
+    ("政策", "Policy", "工信部：加快推进{t}产业高质量发展，支持规模化应用"),
+    ("映射", "Industry", "英伟达上调{t}相关资本开支指引，产业链订单可见度提升"),
+    ("减持", "Micro", "{c}：持股5%以上股东拟减持不超过{p2}%股份"),
+    ("回购", "Micro", "{c}：拟以{a}亿元回购股份并注销，用于{t}业务发展"),
+    ("其他", "Industry", "{t}板块午后走强，{c}盘中涨超{p2}%"),
+)
+NOISE_TEMPLATES = ("{t}产业峰会报名通道开启，点击查看详情", "特约｜{t}投资论坛嘉宾观点汇总")
+CSV_COLUMNS = ["id", "date", "content", "score", "sentiment", "summary", "sector", "sub_sector", "type",
+               "impact_horizon", "key_trigger", "related_stocks", "logic"]
+
+
+def _event_times(n, start, end, rng, session_share=0.6):
+    """本地时间: 一部分落在工作日交易时段，其余均匀分布；返回按时间排序的 (DatetimeIndex, ctime 数组)"""
+    span = (end - start).total_seconds()
+    local = pd.DatetimeIndex(start + pd.to_timedelta(rng.uniform(0, span, n), unit="s"))
+    days = local.normalize()
+    session_hours = np.where(rng.random(n) < 0.5, rng.uniform(9.5, 11.5, n), rng.uniform(13.0, 15.0, n))
+    shifted = days + pd.to_timedelta(session_hours, unit="h")
+    use = (rng.random(n) < session_share) & (days.weekday < 5) & (shifted >= start) & (shifted <= end)
+    local = pd.DatetimeIndex(np.sort(np.where(use, shifted, local)))
+    tz = datetime.now().astimezone().tzinfo
+    ctimes = local.tz_localize(tz).asi8 // 10 ** 9
+    return local, ctimes
+
+
+def make_telegrams(n, start=None, end=None, seed=0, noise_ratio=0.05, first_id=3_000_000):
+    """
+    返回 [{id, ctime, date, title, content, sector, sub_sector, key_trigger, type, company}]，按时间递增。
+    date 为本地时间 "%Y-%m-%d %H:%M"，与 feeder 写入的格式一致。
+    """
+    end = end or datetime.now()
+    start = start or end - timedelta(days=30)
+    rng = np.random.default_rng(seed)
+    pick = random.Random(seed)
+    local, ctimes = _event_times(n, pd.Timestamp(start), pd.Timestamp(end), rng)
+    sector_names = list(SECTORS)
+    telegrams = []
+    for i, (dt, ct) in enumerate(zip(local.to_pydatetime(), ctimes.tolist())):
+        sector = sector_names[pick.randrange(len(sector_names))]
+        sub = pick.choice(SECTORS[sector])
+        theme = pick.choice(THEMES[sector])
+        company = pick.choice(COMPANIES)
+        if pick.random() < noise_ratio:
+            trigger, kind, title = "其他", "Noise", pick.choice(NOISE_TEMPLATES).format(t=theme)
+        else:
+            trigger, kind, template = pick.choice(EVENTS)
+            title = template.format(c=company, t=theme, a=pick.randint(1, 80), p=pick.randint(3, 120),
+                                    p2=pick.randint(1, 9))
+        body = (f"财联社{dt.month}月{dt.day}日电，{title}。据悉，{company}在{theme}领域持续投入，"
+                f"相关产品已进入{pick.choice(['验证', '小批量供货', '量产', '送样'])}阶段。")
+        telegrams.append({
+            "id": str(first_id + i), "ctime": ct, "date": dt.strftime("%Y-%m-%d %H:%M"),
+            "title": title, "content": f"{title} 【{title}】{body}",
+            "sector": sector, "sub_sector": sub, "key_trigger": trigger, "type": kind, "company": company,
+        })
+    return telegrams
+
+
+def make_analyzed(n, days=30, now=None, seed=0, min_score=5):
+    """与 news_data.csv 同列的已分析情报 (feeder 只落库 score > 4 的条目)"""
+    now = now or datetime.now()
+    telegrams = make_telegrams(n, now - timedelta(days=days), now, seed=seed, noise_ratio=0.0)
+    rng = np.random.default_rng(seed + 1)
+    scores = rng.integers(min_score, 11, n)
+    sentiment = rng.uniform(-1, 1, n).round(2)
+    horizon = rng.choice(["Immediate", "Short", "Medium"], n)
+    df = pd.DataFrame(telegrams)
+    return pd.DataFrame({
+        "id": df["id"],
+        "date": df["date"],
+        "content": df["content"],
+        "score": scores,
+        "sentiment": sentiment,
+        "summary": df["title"].str.slice(0, 8),
+        "sector": df["sector"],
+        "sub_sector": df["sub_sector"],
+        "type": df["type"],
+        "impact_horizon": horizon,
+        "key_trigger": df["key_trigger"],
+        "related_stocks": [json.dumps([c], ensure_ascii=False) for c in df["company"]],
+        "logic": "合成点评: " + df["key_trigger"] + "驱动，关注" + df["sub_sector"],
+    }, columns=CSV_COLUMNS)
+
+
+def cls_timeline(telegrams):
+    """电报 -> benchmarks.mock_cls 回放桩的时间线"""
+    return [(tg["ctime"], {"id": int(tg["id"]), "ctime": tg["ctime"], "title": tg["title"],
+                           "content": tg["content"][len(tg["title"]) + 1:]}) for tg in telegrams]
+
+
+class HashEncoder:
+    """字符 bigram 哈希到 dim 维 (带符号) 后归一化；同一文本永远得到同一向量"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _vector(self, text):
+        grams = [text[i: i + 2] for i in range(max(1, len(text) - 1))]
+        hashes = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint32, count=len(grams))
+        signs = np.where(hashes & 1, 1.0, -1.0)
+        vec = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.asarray([self._vector(t) for t in texts], dtype=np.float32).reshape(len(texts), self.dim)
+        return vectors[0] if single else vectors
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成与 news_data.csv 同 schema 的合成情报")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic_news.csv")
+    args = parser.parse_args()
+
+    frame = make_analyzed(args.rows, days=args.days, seed=args.seed)
+    frame.iloc[::-1].to_csv(args.out, index=False, encoding="utf-8-sig")  # 与 news_data.csv 一样新的在前
+    print(f"写入 {len(frame)} 行 -> {args.out}")
@@ -0,0 +1,66 @@
+import json
+import sqlite3
+import threading
+import time
+
+# ================= 💾 LLM 分析结果缓存 =================
+# key = (内容哈希, prompt 版本, 模型名)
+# 命中直接复用解析好的 score/sector/sub_sector/logic 等字段，完全不走 API；
+# 改了 prompt 模板 -> 版本号变化 -> 旧结果自动失效
+_IN_CHUNK = 500  # SQLite 单条语句的参数个数有上限，IN 查询分段执行
+
+
+class AnalysisCache:
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis (
+                content_hash   TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model          TEXT NOT NULL,
+                result         TEXT NOT NULL,
+                created_at     REAL NOT NULL,
+                PRIMARY KEY (content_hash, prompt_version, model)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, hashes, prompt_version, model):
+        """批量查询，返回 {content_hash: result_dict} (只含命中的)"""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), _IN_CHUNK):
+                part = hashes[i: i + _IN_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT content_hash, result FROM analysis "
+                    f"WHERE prompt_version = ? AND model = ? AND content_hash IN ({','.join('?' * len(part))})",
+                    [prompt_version, model, *part]
+                ).fetchall()
+                found.update((h, json.loads(r)) for h, r in rows)
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, entries, prompt_version, model):
+        """entries: [(content_hash, result_dict), ...]；结果里的 id 与具体电报绑定，不入缓存"""
+        now = time.time()
+        rows = [
+            (h, prompt_version, model, json.dumps({k: v for k, v in res.items() if k != 'id'}, ensure_ascii=False), now)
+            for h, res in entries
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO analysis VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,90 @@
+import json
+import re
+
+# ================= 📦 Token 预算装箱 =================
+# 按 token 预算 (而不是固定条数) 给 analyze_batch 装批:
+# 短电报一批多装，长电报少装，保证输出 JSON 不超过 max_tokens 被截断
+OUTPUT_TOKENS_PER_ITEM = 180   # 每条分析结果 (11 个字段 + 一句点评) 的输出 token 估计
+ITEM_OVERHEAD_TOKENS = 12      # {"id": "...", "content": "..."} 的结构开销
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text):
+    """粗估 token 数: 中文字符约 1 token/字，其余约 4 字符/token (宁高勿低)"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def pack_by_budget(items, input_budget, output_budget, max_items=50):
+    """
+    按输入顺序贪心装批，每批同时满足:
+      输入 token <= input_budget，预计输出 token <= output_budget，条数 <= max_items
+    单条超预算时自己成一批 (总比丢掉强)
+    """
+    batches, current = [], []
+    input_used = 0
+    for item in items:
+        cost = estimate_tokens(item['content']) + ITEM_OVERHEAD_TOKENS
+        fits = (input_used + cost <= input_budget
+                and (len(current) + 1) * OUTPUT_TOKENS_PER_ITEM <= output_budget
+                and len(current) < max_items)
+        if current and not fits:
+            batches.append(current)
+            current, input_used = [], 0
+        current.append(item)
+        input_used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+# ================= 🧩 流式容错 JSON 解析 =================
+class JsonObjectStream:
+    """
+    增量解析 LLM 输出里的 JSON 对象流。
+    不要求完整的 JSON 数组: 前后的废话、```json 代码块、被 max_tokens 截断的尾巴都能容忍，
+    每个闭合的顶层 {...} 立即解析吐出，只有最后半个对象会被丢弃。
+    """
+
+    def __init__(self):
+        self._buf = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        objects = []
+        for ch in text:
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._buf = [ch]
+                continue
+
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        objects.append(json.loads("".join(self._buf)))
+                    except json.JSONDecodeError:
+                        pass  # 残缺对象直接跳过，不影响后面的
+                    self._buf = []
+        return objects
+
+
+def parse_json_objects(text):
+    """一次性解析 (非流式场景)"""
+    return JsonObjectStream().feed(text)
@@ -0,0 +1,194 @@
+import json
+import os
+import time
+from datetime import datetime
+
+# 共享模块放在仓库根目录 (feeder 已把根目录加入 sys.path)
+from dedup_index import content_hash
+from news_sources import HttpClient, SourceAdapter, register_adapter
+
+# ================= 📡 财联社电报增量抓取 (游标翻页) =================
+# 不再每轮重拉最新 rn 条再靠去重丢弃:
+# - 游标记录已入库的最新 ctime，以及该秒内已见过的 id (同一秒可能有多条)
+# - 每轮从最新一页开始，用 lastTime=本页最老 ctime 向前翻页，碰到游标即停
+#   突发行情一轮超过 rn 条也不会漏；首页大小跟随上一轮新增条数，游标之前的电报只多下载几条
+# - 游标只在 feeder 处理完本批之后 commit()，中途崩溃下次会重新抓这一段 (去重库兜底)
+CLS_TELEGRAPH_URL = os.getenv("CLS_TELEGRAPH_URL", "https://www.cls.cn/nodeapi/telegraphList")
+CLS_HEADERS = {
+    "Referer": "https://www.cls.cn/telegraph",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
+}
+CLS_PAGE_SIZE = 20
+CLS_MIN_FIRST_PAGE = 5  # 首页按上一轮新增条数缩小，平时只下载几条；首页全是新的再按整页往前翻
+CLS_MAX_PAGES = 10  # 单轮最多翻页数 (停机太久时只补最近这些，更早的交给回溯)
+CLS_TIMEOUT = 15
+CLS_CURSOR_PATH = os.getenv(
+    "CLS_CURSOR_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cls_cursor.json"))
+
+
+def parse_telegraphs(data):
+    """兼容两种返回结构 (roll_data / telegraph)，结构不对时返回 None"""
+    payload = data.get('data') or {}
+    items = payload.get('roll_data', payload.get('telegraph'))
+    return items if isinstance(items, list) else None
+
+
+def to_item(telegraph):
+    """财联社电报 -> feeder 的新闻条目 {id, date, content}；没有正文时返回 None"""
+    full_text = f"{telegraph.get('title', '')} {telegraph.get('content', '')}".strip()
+    if not full_text:
+        return None
+    ctime = telegraph.get('ctime') or int(time.time())
+    return {
+        "id": str(telegraph.get('id') or content_hash(full_text)),  # 内置 hash() 每次启动都变，不能当去重键
+        "date": datetime.fromtimestamp(ctime).strftime('%Y-%m-%d %H:%M'),
+        "content": full_text
+    }
+
+
+class ClsCursor:
+    """已处理到的位置: 最新 ctime + 该秒内已见过的 id"""
+
+    def __init__(self, path=CLS_CURSOR_PATH, ctime=0, ids=()):
+        self.path = path
+        self.ctime = int(ctime)
+        self.ids = set(ids)
+
+    def seen(self, ctime, item_id):
+        return ctime < self.ctime or (ctime == self.ctime and item_id in self.ids)
+
+    def advanced(self, telegraphs):
+        """吸收一批电报后的新游标 (不修改自身)"""
+        ctime, ids = self.ctime, set(self.ids)
+        for tg in telegraphs:
+            t = int(tg.get('ctime') or 0)
+            if t > ctime:
+                ctime, ids = t, set()
+            if t == ctime:
+                ids.add(str(tg.get('id')))
+        return ClsCursor(self.path, ctime, ids)
+
+    def load(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    state = json.load(f)
+                self.ctime, self.ids = int(state["ctime"]), set(state["ids"])
+            except (ValueError, KeyError, TypeError):
+                print(f"⚠️ 财联社游标文件损坏，忽略: {self.path}")
+        return self
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ctime": self.ctime, "ids": sorted(self.ids)}, f)
+        os.replace(tmp, self.path)
+
+
+class ClsPoller:
+    """
+    poll(): 从最新一页向前翻到游标为止，返回游标之后的新电报 (新 -> 旧，与接口顺序一致)
+    commit(): 本批处理完后推进游标并落盘
+    没有游标 (首次启动) 时回溯最近 backfill 条。
+    """
+
+    def __init__(self, url=CLS_TELEGRAPH_URL, page_size=CLS_PAGE_SIZE, max_pages=CLS_MAX_PAGES,
+                 cursor_path=CLS_CURSOR_PATH, timeout=CLS_TIMEOUT, client=None, min_first_page=CLS_MIN_FIRST_PAGE):
+        self.url = url
+        self.page_size = page_size
+        self.min_first_page = min(min_first_page, page_size)
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.client = client or HttpClient()
+        self.cursor = ClsCursor(cursor_path).load()
+        self._pending = None
+        self.last_ctimes = []  # 最近一轮新电报的 ctime，给自适应调度估算资讯速度
+        self.last_error = None
+        self.stats = {"polls": 0, "requests": 0, "downloaded": 0, "new": 0, "gaps": 0}
+
+    def _page(self, rn, last_time=None):
+        params = {"rn": rn, "_": int(time.time())}
+        if last_time is not None:
+            params["lastTime"] = last_time
+        self.stats["requests"] += 1
+        # 非 200 (被拒绝 / 限流) 直接抛出，由 poll 统一处理
+        data = self.client.get(self.url, params=params, headers=CLS_HEADERS, timeout=self.timeout).json()
+        telegraphs = parse_telegraphs(data)
+        if telegraphs is None:
+            raise ValueError(f"接口通了但没数据。返回结构可能是变了: {list(data.keys())}")
+        return telegraphs
+
+    def poll(self, backfill=CLS_PAGE_SIZE):
+        self.stats["polls"] += 1
+        fresh, seen_ids = [], set()
+        reached, last_time = False, None
+        self.last_error = None
+        rn = self.page_size
+        if self.cursor.ctime:
+            rn = max(self.min_first_page, min(self.page_size, 2 * len(self.last_ctimes)))
+        try:
+            for _ in range(self.max_pages):
+                page = self._page(rn, last_time)
+                if not page:
+                    reached = True
+                    break
+                self.stats["downloaded"] += len(page)
+                for tg in page:
+                    t, item_id = int(tg.get('ctime') or 0), str(tg.get('id'))
+                    if self.cursor.ctime and self.cursor.seen(t, item_id):
+                        reached = True
+                    elif item_id not in seen_ids:  # 翻页边界那一秒会重复，按 id 去掉
+                        seen_ids.add(item_id)
+                        fresh.append(tg)
+                if not self.cursor.ctime and len(fresh) >= backfill:
+                    fresh, reached = fresh[:backfill], True
+                if reached or len(page) < rn:
+                    reached = True
+                    break
+                # 同一秒可能有多条被页尾截断: 下一页多取一秒 (lastTime 取不到端点)，
+                # 一整页都是同一秒时才跳过这一秒，避免原地打转
+                oldest = min(int(tg.get('ctime') or 0) for tg in page)
+                last_time = oldest if last_time == oldest + 1 else oldest + 1
+                rn = self.page_size
+        except Exception as e:
+            print(f"❌ 网络/解析致命错误: {e}")
+            self.last_error = str(e)
+
+        if self.last_error:
+            # 没接上游标就不推进，已拿到的照常处理，下一轮重新翻这一段 (去重库兜底)
+            self._pending = None
+        else:
+            if not reached and self.cursor.ctime:
+                self.stats["gaps"] += 1
+                print(f"⚠️ 翻了 {self.max_pages} 页仍未接上游标，更早的电报需回溯补齐")
+            self._pending = self.cursor.advanced(fresh) if fresh else None
+        self.last_ctimes = [int(tg.get('ctime') or 0) for tg in fresh]
+        self.stats["new"] += len(fresh)
+        return [item for item in map(to_item, fresh) if item]
+
+    def commit(self):
+        if self._pending is not None:
+            self.cursor, self._pending = self._pending, None
+            self.cursor.save()
+
+
+@register_adapter("cls")
+class ClsAdapter(SourceAdapter):
+    """把 ClsPoller 接进 SourceFetcher；游标仍由调用方处理完本批后 poller.commit()"""
+
+    def __init__(self, poller, backfill=CLS_PAGE_SIZE):
+        self.poller = poller
+        self.backfill = backfill
+        # 每页都有 HTTP 超时，整轮上限取满页数: 不能让 SourceFetcher 先放弃，
+        # 否则后台线程晚到的游标可能被下一次 commit() 提交而漏掉这批电报
+        self.timeout = poller.timeout * poller.max_pages
+
+    def fetch(self, client):
+        self.poller.client = client  # 与其他源共用连接池
+        items = self.poller.poll(backfill=self.backfill)
+        if self.poller.last_error and not items:
+            raise RuntimeError(self.poller.last_error)
+        return items
@@ -1,26 +1,71 @@
-import requests
 import pandas as pd
 import schedule
 import time
 from datetime import datetime, timedelta
 import os
+import sys
+import hashlib
 import json
-import re
 import numpy as np
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
+from rate_limiter import RateLimiter, retry_with_backoff
+from batch_packer import estimate_tokens, pack_by_budget, JsonObjectStream, OUTPUT_TOKENS_PER_ITEM
+from analysis_cache import AnalysisCache
+from sector_strength import SectorStrengthEngine, BRIEF_COLUMNS, brief_context, half_life_hours
+from resonance import ResonanceDetector
+from seen_store import SeenNewsStore
+from poll_scheduler import AdaptiveScheduler
+
+# 共享模块 (内容指纹、情报存储) 放在仓库根目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dedup_index import content_hash
+from news_store import NewsStore, NEWS_STORE_PATH, migrate_csv
+from keyword_engine import get_engine
+from metrics import inc, observe, timer, timed, profiled, start_exporters
+from news_sources import HttpClient, RssAdapter, SourceFetcher
+from cls_poller import ClsAdapter, ClsPoller  # noqa: E402 (依赖根目录的 dedup_index / news_sources)
 
 # ================= ⚙️ 配置区 =================
-DATA_FILE_PATH = r"C:\Users\12398\Desktop\QAQ\8690project\trade_system_test1\rag_engine\news_data.csv"
-DEEPSEEK_API_KEY = ""  # 🔴 必填
-BASE_URL = "https://api.deepseek.com"
-POLLING_INTERVAL = 2
+DATA_FILE_PATH = r"C:\Users\12398\Desktop\QAQ\8690project\trade_system_test1\rag_engine\news_data.csv"  # 旧版 CSV，仅用于一次性迁移
+DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")  # 🔴 必填
+BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+LLM_MODEL = "deepseek-chat"
+POLLING_INTERVAL = 2  # 分钟，工作日非交易时段的基准间隔；实际间隔由 AdaptiveScheduler 按时段与资讯速度调整
 BACKFILL_COUNT = 60
+# 除财联社外额外并发抓取的 RSS 源 (逗号分隔，默认不开)，条目与电报一起进分析流程
+FEEDER_RSS_FEEDS = [u.strip() for u in os.getenv("FEEDER_RSS_FEEDS", "").split(",") if u.strip()]
+# 单轮剖析: cprofile / pyinstrument，启动后第一轮流水线跑在剖析器里 (指标导出见 metrics.py)
+FEEDER_PROFILE = os.getenv("FEEDER_PROFILE", "")
+# LLM 并发与限流 (替代批次间固定 sleep)
+LLM_CONCURRENCY = 4       # 同时在途的 analyze_batch 请求数
+LLM_QPS = 2.0             # 每秒最多发起的请求数
+LLM_TPM = 60000           # 每分钟 token 上限 (输入+输出)
+LLM_MAX_RETRIES = 3       # 失败后抖动退避重试次数
+# 按 token 预算装批 (替代固定 CHUNK_SIZE)
+LLM_MAX_OUTPUT_TOKENS = 4000
+LLM_INPUT_TOKEN_BUDGET = 6000   # 每批新闻正文的输入 token 上限 (不含 prompt 模板)
+LLM_OUTPUT_SAFETY = 0.8         # 只用 max_tokens 的 80% 装批，给估算误差留余量
+LLM_REQUEUE_ROUNDS = 2          # 分析遗漏的 id 最多重新排队几轮
+# LLM 分析结果缓存 (SQLite)，同一内容 + 同一 prompt 版本 + 同一模型只付费一次
+ANALYSIS_CACHE_PATH = os.getenv(
+    "ANALYSIS_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_cache.sqlite"))
 # ================= 🧠 全局状态 =================
-SEEN_NEWS_BUFFER = set()
+SEEN_NEWS = SeenNewsStore()  # 内容 / 财联社 id 摘要，定长内存 + 二进制快照
+NEWS_STORE = NewsStore(NEWS_STORE_PATH)  # 按日期分区的 Parquet 情报库
+SECTOR_ENGINE = SectorStrengthEngine(max_lookback_hours=72)  # 内参窗口 (周一回看 72h)
 MARKET_CONTEXT_BUFFER = []
 MARKET_CONTEXT_MANUAL = []
-SECTOR_HISTORY_BUFFER = []
+HTTP_CLIENT = HttpClient()  # 所有数据源共用的连接池 (keep-alive + 条件请求)
+CLS_POLLER = ClsPoller(client=HTTP_CLIENT)  # 财联社电报游标翻页，只下载游标之后的新电报
+SOURCE_FETCHER = SourceFetcher(
+    {"cls": ClsAdapter(CLS_POLLER), **{f"rss:{url}": RssAdapter(url) for url in FEEDER_RSS_FEEDS}},
+    client=HTTP_CLIENT)
+POLL_SCHEDULER = AdaptiveScheduler(off_session_interval=POLLING_INTERVAL * 60)
+RESONANCE = ResonanceDetector()  # 15分钟 / 1小时 / 4小时 多窗口共振雷达，窗口记录追加落盘
+LLM_LIMITER = RateLimiter(qps=LLM_QPS, tokens_per_minute=LLM_TPM)
+ANALYSIS_CACHE = AnalysisCache(ANALYSIS_CACHE_PATH)
+_LLM_CLIENT = None
 
 # ================= 🗺️ 产业链分级图谱 (Knowledge Graph) =================
 # 这是给 AI 看的“作战地图”，指导它如何精准打标
@@ -35,128 +80,136 @@ SECTOR_KNOWLEDGE = """
 7. 金融/地产 -> [券商, 银行, 房地产, 保险]
 """
 
-# ================= 🗑️ 噪音黑名单 =================
-NOISE_KEYWORDS = [
-    "特约", "广告", "报名", "峰会", "论坛", "免责声明",
-    "点击查看", "风险提示", "加入圈子", "开户", "上修",
-    "大宗交易", "融资融券", "龙虎榜", "汇率", "债市"
-]
+# ================= 📜 分析 Prompt 模板 =================
+# 模板或图谱有任何改动，PROMPT_VERSION 随之变化，分析缓存里的旧结果自动失效
+# (context_str 是随行情变化的运行时背景，不计入版本)
+ANALYSIS_PROMPT_TEMPLATE = """
+    【背景】市场状态：{context_str}
+    【产业链图谱】：{sector_knowledge}
+    【角色】A股策略分析师。你的任务是穿透噪音，识别【预期差】与【博弈价值】。
 
+    【核心铁律 (按类型匹配)】
+    1.  【政策类】：遵循"政策即命令"。
+        - **定性**：区分实招(改变资金/规则)与虚招(口号)。
+        - **博弈**：必须结合 **{context_str}** 判断。冰点出利好=雪中送炭；高位出利空=降温打击。
+    2.  【海外映射】：提及台积电/英伟达/特斯拉/OpenAI等国外巨头的重磅消息时，**必须**关联A股对应产业链及A股对应【二级细分】(如半导体设备/光模块/汽配)，视为高权重指引。
+    3.  【个股微观】：
+        - **业绩时机**：预告期内增长=明牌(低分)；非预告期突发=预期差(高分)。
+        - **合同/订单 (量化标尺)**：
+            *   **高能 (7-8分)**：占上年营收比重 **>30%**。
+            *   **中性 (5-6分)**：占上年营收比重 **5%-30%**。
+            *   **微弱 (0-4分)**：占上年营收比重 **<5%** 或未披露金额。
+        - **技术突破**：需明确“获权威认证”或“获量产订单”，否则视为“软信息”打折处理。
+        - **资金动作**：注销式回购 > 真金增持 > 承诺不减持 > 口头口号。
 
-# ================= 🛠️ 工具函数 =================
-def clean_json_string(text):
-    # 尝试1: 匹配 Markdown 代码块
-    match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
-    if match: return match.group(1)
+    【评分标准 (0-10) - 梯度优化】
+    - 9-10分【核弹/结构性颠覆】：极高意外性。如：印花税、限制量化、实控人被抓、非预告期业绩暴雷/暴增等。
+    - 7-8分 【高能/强驱动】：实质性利好。如：海外映射爆发、**营收占比>30%大订单**、行业垄断性技术突破等。
+    - 6分   【显著/超预期】：明确的利好，且略超市场预期。
+    - 4-5分 【关注/明牌】：信息真实但影响微弱/已兑现。如：**营收占比5-30%的中等合同**、预告期内达标预增。
+    - 0-3分 【噪音/垃圾】：**营收占比<5%小合同**、纯行情播报、无来源传闻、无关海外事件。
+
+    【输入新闻】
+    {news_json}
+
+    【输出JSON列表】
+    - `id`: 原样返回
+    - `score`: 整数(0-10)
+    - `sentiment`: -1.0(空) ~ 1.0(多)。
+    - `summary`: 8字内核心标签
+    - `sector`: **一级大类** (如: 人工智能, 半导体, 汽车产业链)。政策类无特定板块填"全局"。
+    - `sub_sector`: **二级细分** (如: AI硬件, 游戏传媒, 半导体设备)。若无细分填"通用"。
+    - `type`: Policy/Micro/Industry/Noise
+    - `impact_horizon`: Immediate/Short/Medium
+    - `key_trigger`: 政策/业绩/合同/减持/回购/映射/其他
+    - `related_stocks`: ["公司名"]
+    - `logic`: 【关键】一句犀利点评。
+       - **合同类**：必须注明"营收占比约xx%"，以此作为评分依据。
+       - **政策类**：点明具体受影响的细分领域 (如"数据要素入表，利好数字经济")。
+       - **噪音类**：(0-3分) 直接注明"无增量信息"。
+    """
+PROMPT_VERSION = hashlib.md5((ANALYSIS_PROMPT_TEMPLATE + SECTOR_KNOWLEDGE).encode()).hexdigest()[:12]
 
-    # 尝试2: 暴力查找第一个 '[' 和最后一个 ']'
-    # 这能解决 AI 废话多但包含 JSON 的情况
-    start = text.find('[')
-    end = text.rfind(']')
-    if start != -1 and end != -1:
-        return text[start:end + 1]
+# ================= 🗑️ 噪音黑名单 =================
+# 词表在仓库根目录 keywords.json 的 "noise" 类别里维护 (与 app.py 共用)，编译成自动机一遍扫描
+KEYWORDS = get_engine()
+NOISE_THRESHOLD = 1.0  # 命中噪音词的权重和达到阈值即丢弃
 
-    # 如果都找不到，原样返回，让 json.loads 去报错并打印原始内容
-    return text
+
+# ================= 🛠️ 工具函数 =================
+def get_llm_client():
+    """全局共享的 OpenAI 客户端 (线程安全，并发 worker 复用同一个连接池)"""
+    global _LLM_CLIENT
+    if _LLM_CLIENT is None:
+        # 重试交给 retry_with_backoff 统一处理，关掉 SDK 自带的重试
+        _LLM_CLIENT = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=BASE_URL, max_retries=0)
+    return _LLM_CLIENT
 
 
 def get_dynamic_half_life(dt):
     """动态半衰期：交易时段加速衰减(4h)，休市时段发酵(24h)"""
-    is_workday = dt.weekday() < 5
-    hour_float = dt.hour + dt.minute / 60.0
-    is_trading_time = is_workday and ((9.5 <= hour_float <= 11.5) or (13.0 <= hour_float <= 15.0))
-    return 4.0 if is_trading_time else 24.0
+    return float(half_life_hours([dt])[0])
 
 
 def init_memory():
-    global SEEN_NEWS_BUFFER, MARKET_CONTEXT_BUFFER
-    if os.path.exists(DATA_FILE_PATH):
+    global MARKET_CONTEXT_BUFFER
+    # 首次启动: 自动把旧版 CSV 迁移进分区存储
+    if NEWS_STORE.is_empty() and os.path.exists(DATA_FILE_PATH):
         try:
-            df = pd.read_csv(DATA_FILE_PATH, encoding='utf-8-sig')
-            SEEN_NEWS_BUFFER = set(df['content'].tolist())
-            print(f"📚 记忆恢复: {len(SEEN_NEWS_BUFFER)} 条")
-        except:
-            print("⚠️ 历史文件为空，将创建新文件。")
+            print(f"📦 迁移旧版 CSV -> {NEWS_STORE_PATH}: {migrate_csv(DATA_FILE_PATH, NEWS_STORE)} 条")
+        except Exception as e:
+            print(f"⚠️ CSV 迁移失败: {e}")
+
+    try:
+        restored = SEEN_NEWS.load()
+        if not restored and not NEWS_STORE.is_empty():
+            # 首次使用去重库: 从情报库最近几天的分区补一次，之后只读快照
+            start = datetime.now() - timedelta(seconds=SEEN_NEWS.max_age)
+            df = NEWS_STORE.read(start=start, columns=['id', 'date', 'content']).dropna(subset=['content'])
+            for ts, part in df.groupby(df['date'].dt.floor('h'), sort=True):
+                SEEN_NEWS.add(part[['id', 'content']].to_dict('records'), now=ts.to_pydatetime().timestamp())
+            SEEN_NEWS.save()
+        print(f"📚 记忆恢复: {len(SEEN_NEWS)} 个指纹")
+    except Exception as e:
+        print(f"⚠️ 历史记忆恢复失败: {e}")
+
+    restored = RESONANCE.load()
+    if restored:
+        print(f"🚨 共振窗口恢复: {restored} 条")
 
 
 # ================= 📝 战略内参生成器 (V14.0 结构化版) =================
-def generate_daily_brief():
+@timed("brief_seconds")
+def generate_daily_brief(now=None):
+    """now 默认取当前时间；传入历史时刻可复现当时的内参 (离线回放见 replay.py)"""
     print("\n☀️ 正在生成【DeepQuant 结构化内参 (V14.0)】...")
 
-    if not os.path.exists(DATA_FILE_PATH):
+    if NEWS_STORE.is_empty():
         print("❌ 无数据。")
         return
 
     try:
-        df = pd.read_csv(DATA_FILE_PATH, encoding='utf-8-sig')
+        # 1. 周末自适应窗口 (周一回看 72h，见 brief_lookback_hours)
+        now = now or datetime.now()
 
-        # 1. 基础清洗
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df['impact_score'] = pd.to_numeric(df['impact_score'], errors='coerce').fillna(0)
-        df['sentiment'] = pd.to_numeric(df['sentiment'], errors='coerce').fillna(0)
-        df = df.dropna(subset=['date', 'content'])
+        # 首次调用时从存储预热 (只读窗口覆盖的分区和用到的列)，之后由 run_pipeline 增量追加
+        if not SECTOR_ENGINE.primed:
+            with timer("brief_stage_seconds", stage="prime"):
+                SECTOR_ENGINE.update(NEWS_STORE.read(start=now - SECTOR_ENGINE.max_lookback, columns=BRIEF_COLUMNS))
+            SECTOR_ENGINE.primed = True
 
-        # 2. 周末自适应窗口
-        now = datetime.now()
-        is_monday = now.weekday() == 0
-        lookback_hours = 72 if is_monday else 24
-        recent_df = df[df['date'] >= (now - timedelta(hours=lookback_hours))].copy()
+        # 2+3+4. 衰减分 + 双层聚合统计 (向量化引擎，一次聚合出一级强度与二级细分)
+        # 取前 5 个一级板块与衰减分最高的 12 条情报作为 Context
+        with timer("brief_stage_seconds", stage="snapshot"):
+            stat_df, detail_news = brief_context(SECTOR_ENGINE, now)
 
-        if recent_df.empty:
+        if detail_news.empty:
             print(f"💤 窗口内无数据。")
             return
 
-        # 3. 计算衰减分
-        recent_df['half_life'] = recent_df['date'].apply(get_dynamic_half_life)
-        recent_df['hours_diff'] = (now - recent_df['date']).dt.total_seconds() / 3600.0
-        recent_df['decayed_score'] = recent_df['impact_score'] * (
-                    0.5 ** (recent_df['hours_diff'] / recent_df['half_life']))
-        recent_df['freshness'] = recent_df['decayed_score'] / (recent_df['impact_score'] + 0.01)
-
-        # 4. 双层聚合统计 (Tiered Aggregation)
-        # 先按一级板块分组
-        level1_stats = []
-        unique_sectors = recent_df['sector'].unique()
-
-        for sector in unique_sectors:
-            if sector in ["其他", "全局", "nan"] or not isinstance(sector, str): continue
-
-            sec_df = recent_df[recent_df['sector'] == sector]
-
-            # 一级板块强度 (Top 3 均值)
-            l1_strength = sec_df['decayed_score'].sort_values(ascending=False).head(3).mean()
-            if l1_strength < 4.0: continue  # 过滤弱板块
-
-            # === 二级细分挖掘 (Drill Down) ===
-            sub_stats = []
-            unique_subs = sec_df['sub_sector'].unique()
-            for sub in unique_subs:
-                if not isinstance(sub, str) or sub == "通用": continue
-                sub_df = sec_df[sec_df['sub_sector'] == sub]
-                # 二级强度
-                l2_strength = sub_df['decayed_score'].mean()
-                l2_sentiment = sub_df['sentiment'].mean()
-                sub_stats.append(f"{sub}(强:{l2_strength:.1f}/情绪:{l2_sentiment:.1f})")
-
-            # 如果没有细分，就空着
-            sub_str = " | ".join(sub_stats) if sub_stats else "全板块普涨"
-
-            level1_stats.append({
-                'sector': sector,
-                'strength': round(l1_strength, 2),
-                'count': len(sec_df),
-                'sub_details': sub_str,
-                'top_news': sec_df.sort_values('decayed_score', ascending=False).iloc[0]['summary']
-            })
-
-        if not level1_stats: return
-
-        # 排序并生成 Context
-        stat_df = pd.DataFrame(level1_stats).sort_values('strength', ascending=False).head(5)
-        sector_context = stat_df.to_string(index=False, columns=['sector', 'strength', 'sub_details'])
+        if stat_df.empty: return
 
-        # 提取高分新闻详情
-        detail_news = recent_df.sort_values('decayed_score', ascending=False).head(12)
+        sector_context = stat_df.to_string(index=False, columns=['sector', 'strength', 'sub_details'])
         news_text = "\n".join([
                                   f"- [{row['decayed_score']:.1f}分 | {row['sector']}-{row['sub_sector']}] {row['summary']} | 逻辑:{row['logic']}"
                                   for _, row in detail_news.iterrows()])
@@ -182,9 +235,12 @@ def generate_daily_brief():
         格式：Markdown，分点陈述，拒绝废话。
         """
 
-        response = client.chat.completions.create(
-            model="deepseek-chat", messages=[{"role": "user", "content": prompt}], temperature=0.3
-        )
+        with timer("brief_stage_seconds", stage="llm"):
+            response = client.chat.completions.create(
+                model="deepseek-chat", messages=[{"role": "user", "content": prompt}], temperature=0.3
+            )
+        if getattr(response, 'usage', None):
+            inc("llm_tokens_total", response.usage.total_tokens, kind="brief")
         print("\n" + "=" * 40 + f"\n📊 DeepQuant 结构化内参\n" + "-" * 40)
         print(response.choices[0].message.content)
         print("=" * 40 + "\n")
@@ -194,65 +250,26 @@ def generate_daily_brief():
 
 
 # ================= 📡 抓取模块 =================
-def fetch_cls_news(limit=20):
-    timestamp = int(time.time())
-    # rn = row number (抓取数量)
-    url = f"https://www.cls.cn/nodeapi/telegraphList?rn={limit}&_={timestamp}"
-
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Referer": "https://www.cls.cn/telegraph",
-        "Host": "www.cls.cn",
-        "Accept": "application/json, text/plain, */*",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8"
-    }
-
-    try:
-        # 增加 timeout 到 15秒，防止网络慢
-        resp = requests.get(url, headers=headers, timeout=15)
-
-        # 🚨 调试核心：如果状态码不是 200，打印出来看看
-        if resp.status_code != 200:
-            print(f"❌ 请求被拒绝! 状态码: {resp.status_code}")
-            # print(f"   返回内容: {resp.text[:100]}") # 调试时可解开
-            return []
-
-        data = resp.json()
-
-        # 兼容两种返回结构
-        items = data.get('data', {}).get('roll_data') or data.get('data', {}).get('telegraph')
-
-        if not items:
-            print(f"⚠️ 接口通了但没数据。返回结构可能是变了: {list(data.keys())}")
-            return []
-
-        raw_news = []
-        for item in items:
-            full_text = f"{item.get('title', '')} {item.get('content', '')}".strip()
-            if not full_text: continue
-
-            # 财联社时间戳处理
-            ctime = item.get('ctime', int(time.time()))
-            dt_str = datetime.fromtimestamp(ctime).strftime('%Y-%m-%d %H:%M')
-
-            raw_news.append({
-                "id": str(item.get('id', hash(full_text))),
-                "date": dt_str,
-                "content": full_text
-            })
-
-        return raw_news
-
-    except Exception as e:
-        print(f"❌ 网络/解析致命错误: {e}")
-        return []
+def fetch_news(limit=20):
+    """
+    并发抓取所有数据源: 财联社游标之后的新电报 (首次启动没有游标时回溯最近 limit 条) + 配置的 RSS。
+    处理完后需 CLS_POLLER.commit()
+    """
+    SOURCE_FETCHER.adapters["cls"].backfill = limit
+    results = SOURCE_FETCHER.fetch_all()
+    raw_news = []
+    for name, result in results.items():
+        if result["error"]:
+            print(f"❌ 数据源 {name} 抓取失败 ({result['status']}): {result['error']}")
+        raw_news.extend(result["items"])
+    if results["cls"]["status"] == "ok":
+        POLL_SCHEDULER.observe(CLS_POLLER.last_ctimes)
+    return raw_news
 
  # ================= 🧠 核心分析 (V14.1 最终定稿版) =================
 def analyze_batch(news_list):
     if not news_list: return []
 
-    client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=BASE_URL)
-
     # [Context 策略]
     if 'MARKET_CONTEXT_MANUAL' in globals() and MARKET_CONTEXT_MANUAL:
         context_str = MARKET_CONTEXT_MANUAL
@@ -263,224 +280,218 @@ def analyze_batch(news_list):
 
     batch_input = [{"id": item['id'], "content": item['content']} for item in news_list]
 
-    prompt = f"""
-    【背景】市场状态：{context_str}
-    【产业链图谱】：{SECTOR_KNOWLEDGE}
-    【角色】A股策略分析师。你的任务是穿透噪音，识别【预期差】与【博弈价值】。
-
-    【核心铁律 (按类型匹配)】
-    1.  【政策类】：遵循"政策即命令"。
-        - **定性**：区分实招(改变资金/规则)与虚招(口号)。
-        - **博弈**：必须结合 **{context_str}** 判断。冰点出利好=雪中送炭；高位出利空=降温打击。
-    2.  【海外映射】：提及台积电/英伟达/特斯拉/OpenAI等国外巨头的重磅消息时，**必须**关联A股对应产业链及A股对应【二级细分】(如半导体设备/光模块/汽配)，视为高权重指引。
-    3.  【个股微观】：
-        - **业绩时机**：预告期内增长=明牌(低分)；非预告期突发=预期差(高分)。
-        - **合同/订单 (量化标尺)**：
-            *   **高能 (7-8分)**：占上年营收比重 **>30%**。
-            *   **中性 (5-6分)**：占上年营收比重 **5%-30%**。
-            *   **微弱 (0-4分)**：占上年营收比重 **<5%** 或未披露金额。
-        - **技术突破**：需明确“获权威认证”或“获量产订单”，否则视为“软信息”打折处理。
-        - **资金动作**：注销式回购 > 真金增持 > 承诺不减持 > 口头口号。
-
-    【评分标准 (0-10) - 梯度优化】
-    - 9-10分【核弹/结构性颠覆】：极高意外性。如：印花税、限制量化、实控人被抓、非预告期业绩暴雷/暴增等。
-    - 7-8分 【高能/强驱动】：实质性利好。如：海外映射爆发、**营收占比>30%大订单**、行业垄断性技术突破等。
-    - 6分   【显著/超预期】：明确的利好，且略超市场预期。
-    - 4-5分 【关注/明牌】：信息真实但影响微弱/已兑现。如：**营收占比5-30%的中等合同**、预告期内达标预增。
-    - 0-3分 【噪音/垃圾】：**营收占比<5%小合同**、纯行情播报、无来源传闻、无关海外事件。
-
-    【输入新闻】
-    {json.dumps(batch_input, ensure_ascii=False)}
-
-    【输出JSON列表】
-    - `id`: 原样返回
-    - `score`: 整数(0-10)
-    - `sentiment`: -1.0(空) ~ 1.0(多)。
-    - `summary`: 8字内核心标签
-    - `sector`: **一级大类** (如: 人工智能, 半导体, 汽车产业链)。政策类无特定板块填"全局"。
-    - `sub_sector`: **二级细分** (如: AI硬件, 游戏传媒, 半导体设备)。若无细分填"通用"。
-    - `type`: Policy/Micro/Industry/Noise
-    - `impact_horizon`: Immediate/Short/Medium
-    - `key_trigger`: 政策/业绩/合同/减持/回购/映射/其他
-    - `related_stocks`: ["公司名"]
-    - `logic`: 【关键】一句犀利点评。
-       - **合同类**：必须注明"营收占比约xx%"，以此作为评分依据。
-       - **政策类**：点明具体受影响的细分领域 (如"数据要素入表，利好数字经济")。
-       - **噪音类**：(0-3分) 直接注明"无增量信息"。
-    """
+    prompt = ANALYSIS_PROMPT_TEMPLATE.format(
+        context_str=context_str,
+        sector_knowledge=SECTOR_KNOWLEDGE,
+        news_json=json.dumps(batch_input, ensure_ascii=False)
+    )
     raw_content = "（未获取到内容）"
-
-    try:
-        response = client.chat.completions.create(
-            model="deepseek-chat",
+    # 预估 token (输入 + 预计输出)，请求结束后按 usage 修正
+    estimated_tokens = estimate_tokens(prompt) + len(news_list) * OUTPUT_TOKENS_PER_ITEM
+
+    def _call():
+        with timer("llm_stage_seconds", stage="rate_limit_wait"):
+            LLM_LIMITER.acquire(estimated_tokens)
+        started = time.perf_counter()
+        stream = get_llm_client().chat.completions.create(
+            model=LLM_MODEL,
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.1, max_tokens=4000
+            temperature=0.1, max_tokens=LLM_MAX_OUTPUT_TOKENS,
+            stream=True, stream_options={"include_usage": True}
         )
-        raw_content = response.choices[0].message.content
-
-        # 清洗
-        cleaned_content = clean_json_string(raw_content)
-
-        # 解析
-        parsed_data = json.loads(cleaned_content)
+        # 流式解析: 每个闭合的 {...} 立即落袋，截断/废话都不会连累整批
+        parser = JsonObjectStream()
+        parsed, raw_parts, used_tokens = [], [], 0
+        try:
+            for event in stream:
+                if getattr(event, 'usage', None):
+                    used_tokens = event.usage.total_tokens
+                if event.choices and event.choices[0].delta.content:
+                    delta = event.choices[0].delta.content
+                    raw_parts.append(delta)
+                    parsed.extend(parser.feed(delta))
+        except Exception as e:
+            # 流中途断开: 已完整解析的对象照样保留，缺的交给 run_pipeline 重新排队
+            if not parsed: raise
+            inc("llm_stream_interrupts_total")
+            print(f"      ⚠️ 流式响应中断 ({e})，保留已解析的 {len(parsed)} 条")
+        observe("llm_request_seconds", time.perf_counter() - started)
+        LLM_LIMITER.settle(estimated_tokens, used_tokens)
+        inc("llm_tokens_total", estimated_tokens, kind="estimated")
+        inc("llm_tokens_total", used_tokens, kind="used")
+        return parsed, "".join(raw_parts)
+
+    def _on_retry(n, delay, e):
+        inc("llm_retries_total")
+        print(f"      🔁 AI 调用失败，{delay:.1f}s 后第 {n} 次重试: {e}")
 
-        if isinstance(parsed_data, dict):
-            parsed_data = [parsed_data]
+    try:
+        parsed_data, raw_content = retry_with_backoff(_call, retries=LLM_MAX_RETRIES, on_retry=_on_retry)
+        inc("llm_items_total", len(news_list), result="requested")
+        inc("llm_items_total", len(parsed_data), result="parsed")
+
+        if not parsed_data:
+            inc("llm_parse_failures_total")
+            print("\n❌ JSON 解析失败！DeepSeek 返回了非 JSON 内容。")
+            print("🔍 案发现场 (Raw Content):")
+            print("-" * 20)
+            print(raw_content)  # <--- 这行会告诉你真相
+            print("-" * 20)
 
         return parsed_data
 
-
-    except json.JSONDecodeError:
-
-        print("\n❌ JSON 解析失败！DeepSeek 返回了非 JSON 内容。")
-
-        print("🔍 案发现场 (Raw Content):")
-
-        print("-" * 20)
-
-        print(raw_content)  # <--- 这行会告诉你真相
-
-        print("-" * 20)
+    except Exception as e:
+        inc("llm_errors_total")
+        print(f"⚠️ AI 调用其他报错: {e}")
 
         return []
 
-    except Exception as e:
 
-        print(f"⚠️ AI 调用其他报错: {e}")
+def analyze_chunks(chunks, max_workers=None):
+    """
+    并发分析多个 chunk (线程池 + 令牌桶限流)
+    返回值与 chunks 一一对应，保持输入顺序
+    """
+    max_workers = max_workers or LLM_CONCURRENCY
+    if max_workers <= 1 or len(chunks) <= 1:
+        return [analyze_batch(chunk) for chunk in chunks]
 
-        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        return list(pool.map(analyze_batch, chunks))
 
 
 # ================= 🚨 板块共振雷达 (核心升级) =================
-def check_sector_resonance(new_items):
+def check_sector_resonance(new_items, now=None):
     """
-    维护 1 小时的滑动窗口，检测【二级细分】的资金共振
+    多窗口滑动计数，检测【二级细分】的资金共振，返回本批触发的警报
+    (细分领域新闻少，阈值比一级板块要低一点，灵敏度要高)
     """
-    global SECTOR_HISTORY_BUFFER
-    now = time.time()
-
-    # 1. 将新数据加入历史缓存 (只存有效数据)
-    for item in new_items:
-        if item.get('sub_sector') and item['sub_sector'] != '通用':
-            SECTOR_HISTORY_BUFFER.append({
-                'time': now,
-                'sector': item['sector'],
-                'sub_sector': item['sub_sector'],
-                'score': item.get('score', 0),
-                'summary': item['summary']
-            })
-
-    # 2. 清理超过 1 小时的数据 (滑动窗口)
-    SECTOR_HISTORY_BUFFER = [x for x in SECTOR_HISTORY_BUFFER if now - x['time'] < 3600]
-
-    # 3. 统计数据 (按 二级细分 聚合)
-    # 结构: {'光模块': {'total': 3, 'high': 2, 'parent': 'AI'}}
-    stats = defaultdict(lambda: {'total': 0, 'high_score': 0, 'parent': '', 'titles': []})
-
-    for x in SECTOR_HISTORY_BUFFER:
-        sub = x['sub_sector']
-        stats[sub]['total'] += 1
-        stats[sub]['parent'] = x['sector']
-        if x['score'] >= 7:
-            stats[sub]['high_score'] += 1
-        stats[sub]['titles'].append(x['summary'])
-
-    # 4. 触发警报
-    # 规则: 1小时内，该细分领域新闻数 >=2 且 至少有1条是高能新闻
-    # (细分领域新闻少，阈值比一级板块要低一点，灵敏度要高)
-    for sub, data in stats.items():
-        if data['total'] >= 2 and data['high_score'] >= 1:
-            print(f"\n🚨🚨 【资金共振警报】 >>> {data['parent']} - {sub} <<<")
-            print(f"   🔥 1小时内爆发 {data['total']} 条消息 (高能: {data['high_score']})")
-            print(f"   📝 线索: {' | '.join(list(set(data['titles'])))}")
-            print("-" * 30)
+    alerts = RESONANCE.observe(new_items, now=now)
+    for alert in alerts:
+        print(f"\n🚨🚨 【资金共振警报】 >>> {alert['sector']} - {alert['sub_sector']} <<<")
+        for window, total, high in alert['windows']:
+            print(f"   🔥 {window}内爆发 {total} 条消息 (高能: {high})")
+        print(f"   📝 线索: {' | '.join(alert['titles'])}")
+        print("-" * 30)
+    return alerts
 
 
 # ================= 🚀 主流程 (修复静默假死版) =================
+@timed("pipeline_cycle_seconds")
 def run_pipeline(is_first_run=False):
-    global SEEN_NEWS_BUFFER
 
     # 1. 抓取
     fetch_limit = 100 if is_first_run else 20
     if is_first_run: print(f"🚀 系统冷启动：回溯历史数据 (Top {fetch_limit})...")
 
-    raw = fetch_cls_news(limit=fetch_limit)
+    with timer("pipeline_stage_seconds", stage="fetch"):
+        raw = fetch_news(limit=fetch_limit)
+    inc("pipeline_items_total", len(raw), stage="fetched")
     if not raw:
-        if not is_first_run: print(f"[{datetime.now().strftime('%H:%M')}] ⚠️ 源头无数据")
         return
 
-    # 2. 增量筛选
-    batch = []
-    skipped_count = 0
-    for item in raw:
-        if item['content'] in SEEN_NEWS_BUFFER:
-            skipped_count += 1
-            continue
-        if any(n in item['content'] for n in NOISE_KEYWORDS): continue
-        if len(item['content']) < 8: continue
-        batch.append(item)
+    # 2. 增量筛选 (整批只做一次去重判断)
+    with timer("pipeline_stage_seconds", stage="filter"):
+        fresh = SEEN_NEWS.filter_new(raw)  # 内容或 id 任一见过即跳过，同批重复只留第一条
+        skipped_count = len(raw) - len(fresh)
+        batch = []
+        for item in fresh:
+            if KEYWORDS.scan(item['content'])['noise']['score'] >= NOISE_THRESHOLD: continue
+            if len(item['content']) < 8: continue
+            batch.append(item)
+    inc("pipeline_items_total", skipped_count, stage="seen")
+    inc("pipeline_items_total", len(fresh) - len(batch), stage="noise")
 
     # 状态打印
     timestamp = datetime.now().strftime('%H:%M')
     if is_first_run:
         print(f"[{timestamp}] 回溯结束 | 抓取:{len(raw)} | 已存旧闻:{skipped_count} | 新增待分析:{len(batch)}")
     elif not batch:
+        CLS_POLLER.commit()
         return
     else:
         print(f"[{timestamp}] 🔍 发现 {len(batch)} 条新线索，准备分批分析...")
 
-    # 3. 分批 AI 分析 (Chunking) - 核心修复点
-    # 每次只喂 5 条，防止 Token 爆炸导致 JSON 截断
-    CHUNK_SIZE = 5
+    # 3. 分批 AI 分析 - 按 token 预算装批，防止输出超过 max_tokens 导致 JSON 截断
+    # 截断/漏掉的条目只把缺失的 id 重新排队，不重跑整批
     final_data = []
-
-    for i in range(0, len(batch), CHUNK_SIZE):
-        chunk = batch[i: i + CHUNK_SIZE]
-        print(f"   ☕ 正在分析第 {i + 1}-{min(i + CHUNK_SIZE, len(batch))} 条...")
-
-        # 调用 AI
-        results = analyze_batch(chunk)
-
-        # 建立映射
-        result_map = {str(res['id']): res for res in results}
-
-        for item in chunk:
-            SEEN_NEWS_BUFFER.add(item['content'])
-            res = result_map.get(item['id'])
-
-            if res:
-                score = res.get('score', 0)
-                # 过滤噪音 (0-4分)
-                if score > 4:
-                    item.update(res)
-                    final_data.append(item)
-                    print(
-                        f"      ✅ [{score}分 | {res.get('sector', '?')}-{res.get('sub_sector', '?')}] {res.get('summary', '')}")
-                else:
-                    print(f"      🗑️ [噪音] {res.get('summary', '无价值')}")
+    result_map = {}
+
+    # 先查本地分析缓存，命中的直接复用，不走 API
+    hashes = {item['id']: content_hash(item['content']) for item in batch}
+    with timer("pipeline_stage_seconds", stage="cache_lookup"):
+        cached = ANALYSIS_CACHE.get_many(hashes.values(), PROMPT_VERSION, LLM_MODEL)
+    for item in batch:
+        if hashes[item['id']] in cached:
+            result_map[item['id']] = dict(cached[hashes[item['id']]], id=item['id'])
+    pending = [item for item in batch if item['id'] not in result_map]
+    inc("pipeline_items_total", len(batch) - len(pending), stage="cache_hit")
+    if cached:
+        print(f"   💾 分析缓存命中 {len(batch) - len(pending)} 条，跳过 API")
+
+    for round_no in range(LLM_REQUEUE_ROUNDS + 1):
+        if not pending:
+            break
+        chunks = pack_by_budget(pending, LLM_INPUT_TOKEN_BUDGET, LLM_MAX_OUTPUT_TOKENS * LLM_OUTPUT_SAFETY)
+        if round_no == 0:
+            print(f"   ☕ 正在并发分析 {len(pending)} 条 ({len(chunks)} 批 | 并发 {LLM_CONCURRENCY})...")
+        else:
+            print(f"   🔁 {len(pending)} 条分析遗漏，重新排队 (第 {round_no} 轮)...")
+
+        # 调用 AI (并发执行，结果按输入顺序合并)
+        with timer("pipeline_stage_seconds", stage="llm"):
+            chunk_results = analyze_chunks(chunks)
+        for results in chunk_results:
+            for res in results:
+                if isinstance(res, dict) and 'id' in res:
+                    result_map[str(res['id'])] = res
+
+        # 新结果写回缓存
+        ANALYSIS_CACHE.put_many(
+            [(hashes[item['id']], result_map[item['id']]) for item in pending if item['id'] in result_map],
+            PROMPT_VERSION, LLM_MODEL
+        )
+        pending = [item for item in pending if item['id'] not in result_map]
+
+    inc("pipeline_items_total", len(pending), stage="missed")
+    SEEN_NEWS.add(batch)
+    SEEN_NEWS.save()
+    CLS_POLLER.commit()
+    for item in batch:
+        res = result_map.get(item['id'])
+
+        if res:
+            score = res.get('score', 0)
+            # 过滤噪音 (0-4分)
+            if score > 4:
+                item.update(res)
+                final_data.append(item)
+                print(
+                    f"      ✅ [{score}分 | {res.get('sector', '?')}-{res.get('sub_sector', '?')}] {res.get('summary', '')}")
             else:
-                # 如果 AI 返回的列表里没这个 ID，说明分析漏了或者出错
-                print(f"      ⚠️ 分析遗漏: {item['content'][:10]}...")
+                print(f"      🗑️ [噪音] {res.get('summary', '无价值')}")
+        else:
+            # 重新排队后 AI 仍没返回这个 ID，说明分析漏了或者出错
+            print(f"      ⚠️ 分析遗漏: {item['content'][:10]}...")
 
-        # 批次间稍微歇一下，防止 API QPS 限制
-        time.sleep(1)
-
-    # 4. 内存维护
-    if len(SEEN_NEWS_BUFFER) > 2000:
-        SEEN_NEWS_BUFFER = set(list(SEEN_NEWS_BUFFER)[-2000:])
-
-    # 5. 后处理与存储
+    # 4. 后处理与存储
     if final_data:
-        check_sector_resonance(final_data)
+        with timer("pipeline_stage_seconds", stage="resonance"):
+            check_sector_resonance(final_data)
 
         df_new = pd.DataFrame(final_data)
-        file_exists = os.path.exists(DATA_FILE_PATH) and os.path.getsize(DATA_FILE_PATH) > 0
 
         try:
-            df_new.to_csv(DATA_FILE_PATH, mode='a', header=not file_exists, index=False, encoding='utf-8-sig')
+            with timer("pipeline_stage_seconds", stage="store"):
+                NEWS_STORE.append(df_new)
+            inc("pipeline_items_total", len(final_data), stage="stored")
             print(f"   💾 本轮入库 {len(final_data)} 条情报")
-        except:
-            print("   ❌ 写入失败，请关闭 Excel")
+            # 内参引擎已预热时增量追加；未预热的话首次生成内参时会从存储读到这些行
+            if SECTOR_ENGINE.primed:
+                SECTOR_ENGINE.update(df_new)
+        except Exception as e:
+            inc("pipeline_store_errors_total")
+            print(f"   ❌ 写入失败: {e}")
 
 
 
@@ -489,25 +500,35 @@ if __name__ == "__main__":
         print("❌ 错误：请先填入 DeepSeek API Key")
     else:
         print(f"\n📡 DeepQuant V14.1 (结构化资金流版) 启动...")
-        print(f"🎯 监控频率: {POLLING_INTERVAL} 分钟/轮")
+        print(f"🎯 监控频率: 交易时段 {POLL_SCHEDULER.session_interval}s / 盘外 {POLL_SCHEDULER.off_session_interval}s / "
+              f"夜间 {POLL_SCHEDULER.overnight_interval}s，资讯密集时自动加速")
 
         # 1. 恢复记忆
         init_memory()
+        for target in start_exporters():
+            print(f"📈 性能指标导出: {target}")
 
-        # 2. 立即跑一次
-        run_pipeline()
-
-        # 3. 设定定时任务
-        schedule.every(POLLING_INTERVAL).minutes.do(run_pipeline)
-
+        # 2. 设定定时任务 (抓取轮询由 POLL_SCHEDULER 自适应排期，见主循环)
         # 设定盘前/午间内参生成
         schedule.every().day.at("08:30").do(generate_daily_brief)
         schedule.every().day.at("12:00").do(generate_daily_brief)
+        # 凌晨合并历史分区的小文件
+        schedule.every().day.at("03:00").do(NEWS_STORE.compact)
 
-        # 4. 守护进程
+        # 3. 守护进程
+        next_poll = time.time()  # 启动后立即跑一次
         while True:
             try:
                 schedule.run_pending()
+                if time.time() >= next_poll:
+                    next_poll = time.time() + POLL_SCHEDULER.min_interval  # 本轮异常也不会连续重试
+                    if FEEDER_PROFILE:
+                        with profiled(FEEDER_PROFILE):
+                            run_pipeline()
+                        FEEDER_PROFILE = ""  # 只剖析一轮
+                    else:
+                        run_pipeline()
+                    next_poll = time.time() + POLL_SCHEDULER.next_interval()
                 time.sleep(1)
             except KeyboardInterrupt:
                 print("\n🛑以此停止服务")
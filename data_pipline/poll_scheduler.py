@@ -0,0 +1,65 @@
+import time
+from collections import deque
+from datetime import datetime
+
+from sector_strength import trading_session_mask
+
+# ================= ⏱️ 自适应轮询间隔 =================
+# 代替固定的 schedule.every(POLLING_INTERVAL):
+# - 基准间隔看时段: 交易时段 (与 get_dynamic_half_life 同一套窗口) 最快，
+#   工作日盘前 / 午休 / 盘后次之，夜间和周末退避
+# - 资讯速度 (最近 VELOCITY_WINDOW 秒内的新电报数) 高时按比例缩短，
+#   目标是每轮只带回 TARGET_ITEMS_PER_POLL 条左右，夜间突发消息也能跟上
+SESSION_INTERVAL = 30          # 秒，交易时段
+OFF_SESSION_INTERVAL = 120     # 秒，工作日非交易时段 (原 POLLING_INTERVAL)
+OVERNIGHT_INTERVAL = 600       # 秒，夜间与周末
+MIN_INTERVAL = 15
+DAYTIME_HOURS = (7.0, 22.0)    # 这段之外算夜间
+VELOCITY_WINDOW = 600
+TARGET_ITEMS_PER_POLL = 5
+
+
+class AdaptiveScheduler:
+    def __init__(self, session_interval=SESSION_INTERVAL, off_session_interval=OFF_SESSION_INTERVAL,
+                 overnight_interval=OVERNIGHT_INTERVAL, min_interval=MIN_INTERVAL,
+                 velocity_window=VELOCITY_WINDOW, target_items=TARGET_ITEMS_PER_POLL):
+        self.session_interval = session_interval
+        self.off_session_interval = off_session_interval
+        self.overnight_interval = overnight_interval
+        self.min_interval = min_interval
+        self.velocity_window = velocity_window
+        self.target_items = target_items
+        self._recent = deque()  # 窗口内新电报的发布时间 (秒)，递增
+
+    def observe(self, ctimes, now=None):
+        """记录一轮抓到的新电报发布时间"""
+        for t in sorted(ctimes):
+            self._recent.append(t)
+        self._evict(time.time() if now is None else now)
+
+    def _evict(self, now):
+        cutoff = now - self.velocity_window
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
+
+    def velocity(self, now=None):
+        """每秒新电报数"""
+        self._evict(time.time() if now is None else now)
+        return len(self._recent) / self.velocity_window
+
+    def base_interval(self, dt):
+        if trading_session_mask([dt])[0]:
+            return self.session_interval
+        hour = dt.hour + dt.minute / 60.0
+        if dt.weekday() < 5 and DAYTIME_HOURS[0] <= hour < DAYTIME_HOURS[1]:
+            return self.off_session_interval
+        return self.overnight_interval
+
+    def next_interval(self, now=None):
+        """下一轮距现在的秒数"""
+        now = time.time() if now is None else now
+        interval = self.base_interval(datetime.fromtimestamp(now))
+        rate = self.velocity(now)
+        if rate > 0:
+            interval = min(interval, self.target_items / rate)
+        return max(self.min_interval, interval)
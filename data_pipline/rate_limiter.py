@@ -0,0 +1,78 @@
+import random
+import threading
+import time
+
+
+# ================= 🚦 令牌桶限流 =================
+class TokenBucket:
+    """
+    经典令牌桶: 每秒补充 rate 个令牌，最多攒 capacity 个。
+    acquire 允许把余额扣成负数 (用于事后按真实用量补扣)，后续调用会等额外的时间还上。
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1.0):
+        # 单次请求超过桶容量时按容量算，避免永远等不到
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def debit(self, amount):
+        """不等待，直接扣减 (可为负)，用于按实际用量修正预估"""
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """QPS + TPM (每分钟 token) 双桶限流，替代固定的 time.sleep"""
+
+    def __init__(self, qps=2.0, tokens_per_minute=60_000):
+        self.requests = TokenBucket(qps, capacity=max(1.0, qps))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, capacity=tokens_per_minute)
+
+    def acquire(self, estimated_tokens):
+        self.requests.acquire(1)
+        self.tokens.acquire(estimated_tokens)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """请求结束后按 usage 补扣/返还差额"""
+        if actual_tokens:
+            self.tokens.debit(actual_tokens - estimated_tokens)
+
+
+# ================= 🔁 抖动退避重试 =================
+def retry_with_backoff(fn, retries=3, base_delay=1.0, max_delay=20.0, retry_on=(Exception,), on_retry=None):
+    """
+    失败后按 Full Jitter 指数退避重试: sleep(random(0, min(max_delay, base * 2^n)))
+    多个并发 worker 同时被限流时不会在同一时刻一起重试
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt >= retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            if on_retry:
+                on_retry(attempt + 1, delay, e)
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from resonance import RESONANCE_WINDOWS, HIGH_SCORE, ResonanceDetector
+from sector_strength import (BRIEF_COLUMNS, MIN_L1_STRENGTH, OFF_HOURS_HALF_LIFE, TOP_N, TRADING_HALF_LIFE,
+                             SectorStrengthEngine, brief_context, brief_lookback_hours)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from news_store import NewsStore, NEWS_STORE_PATH  # noqa: E402
+
+# ================= ⏪ 离线回放 (事件时间) =================
+# 把 news_data.csv 或分区情报库按发布时间重放一遍 LLM 之后的流程，调参不用等实盘新闻:
+# - 模拟时钟 SimClock 代替墙钟，共振雷达与衰减分都按"当时"计算
+# - 同一分钟 (REPLAY_BATCH_SECONDS) 内的情报作为一批喂给共振雷达，与线上每轮抓取一批的语义一致
+# - 内参只在排期时刻 (默认 08:30 / 12:00，与 feeder 一致) 或 --at 指定的时刻生成上下文，
+#   板块引擎对整段历史只解析一次，各时刻取截至当时的视图，衰减与聚合全部向量化
+# 输出 JSONL: 每行一条 alert / brief 记录，按时间排序、浮点取整，不同参数的输出可以直接 diff
+REPLAY_BATCH_SECONDS = 60
+BRIEF_TIMES = ("08:30", "12:00")
+MIN_STORE_SCORE = 5  # feeder 只落库 score > 4 的情报
+FLOAT_DIGITS = 3
+
+
+class SimClock:
+    """可注入的模拟时钟: time() 与 time.time 同语义，只能向前拨"""
+
+    def __init__(self, start=0.0):
+        self.t = float(start)
+
+    def time(self):
+        return self.t
+
+    def now(self):
+        return datetime.fromtimestamp(self.t)
+
+    def advance_to(self, t):
+        self.t = max(self.t, float(t))
+
+
+def load_archive(csv_path=None, store_root=NEWS_STORE_PATH, start=None, end=None):
+    """读旧版 CSV 或分区情报库，返回按 date 升序的 BRIEF_COLUMNS 表 (date 为本地时间)"""
+    if csv_path:
+        df = pd.read_csv(csv_path, encoding='utf-8-sig', dtype=str)
+    else:
+        df = NewsStore(store_root).read(start=start, end=end, columns=BRIEF_COLUMNS)
+    df = df.reindex(columns=BRIEF_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'], errors='coerce').astype('datetime64[ns]')
+    df['score'] = pd.to_numeric(df['score'], errors='coerce').fillna(0)
+    df['sentiment'] = pd.to_numeric(df['sentiment'], errors='coerce').fillna(0)
+    df = df.dropna(subset=['date'])
+    if start is not None:
+        df = df[df['date'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['date'] <= pd.Timestamp(end)]
+    for col in ('summary', 'sector', 'sub_sector', 'logic', 'related_stocks'):
+        df[col] = df[col].astype(object).where(df[col].notna(), '')
+    return df.sort_values('date', kind='stable', ignore_index=True)
+
+
+def epoch_seconds(dates):
+    """本地时间 -> 时间戳 (秒)，与 feeder 写入 date 时用的 datetime.now() 对应"""
+    tz = datetime.now().astimezone().tzinfo
+    dates = pd.DatetimeIndex(dates).as_unit('ns')
+    return dates.tz_localize(tz, ambiguous='NaT', nonexistent='shift_forward').asi8 / 1e9
+
+
+def brief_moments(start, end, times=BRIEF_TIMES):
+    """[start, end] 内每天的内参排期时刻"""
+    moments = []
+    day = pd.Timestamp(start).normalize()
+    while day <= pd.Timestamp(end):
+        for hhmm in times:
+            hour, minute = map(int, hhmm.split(":"))
+            moment = day + pd.Timedelta(hours=hour, minutes=minute)
+            if pd.Timestamp(start) <= moment <= pd.Timestamp(end):
+                moments.append(moment)
+        day += pd.Timedelta(days=1)
+    return moments
+
+
+def _round(value):
+    return round(float(value), FLOAT_DIGITS)
+
+
+def alert_record(alert, now):
+    return {
+        'kind': 'alert',
+        'at': datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S'),
+        'sector': alert['sector'],
+        'sub_sector': alert['sub_sector'],
+        'windows': [list(w) for w in alert['windows']],
+        'titles': alert['titles'],
+    }
+
+
+def brief_record(stat_df, detail_news, now, lookback_hours):
+    return {
+        'kind': 'brief',
+        'at': pd.Timestamp(now).strftime('%Y-%m-%d %H:%M:%S'),
+        'lookback_hours': lookback_hours,
+        'sectors': [
+            {'sector': row['sector'], 'strength': _round(row['strength']), 'count': int(row['count']),
+             'sub_details': row['sub_details'], 'top_news': row['top_news']}
+            for row in stat_df.to_dict('records')
+        ],
+        'news': [
+            {'date': row.date.strftime('%Y-%m-%d %H:%M'), 'score': _round(row.score),
+             'decayed_score': _round(row.decayed_score), 'sector': str(row.sector),
+             'sub_sector': str(row.sub_sector), 'summary': row.summary, 'related_stocks': row.related_stocks}
+            for row in detail_news.itertuples(index=False)
+        ],
+    }
+
+
+def replay(df, windows=RESONANCE_WINDOWS, high_score=HIGH_SCORE, min_score=MIN_STORE_SCORE,
+           trading_half_life=TRADING_HALF_LIFE, off_hours_half_life=OFF_HOURS_HALF_LIFE,
+           min_strength=MIN_L1_STRENGTH, top_n=TOP_N, brief_at=None, brief_times=BRIEF_TIMES,
+           batch_seconds=REPLAY_BATCH_SECONDS, clock=None):
+    """
+    按事件时间回放 (df 需按 date 升序，见 load_archive)，返回按时间排序的 alert / brief 记录。
+    brief_at 指定内参时刻列表；不传时按 brief_times 每天排期。
+    """
+    df = df[df['score'] >= min_score].reset_index(drop=True)
+    if df.empty:
+        return []
+    clock = clock or SimClock()
+    detector = ResonanceDetector(windows=windows, high_score=high_score, state_path=None, clock=clock.time)
+    engine = SectorStrengthEngine(max_lookback_hours=72, trading_half_life=trading_half_life,
+                                  off_hours_half_life=off_hours_half_life, min_strength=min_strength, top_n=top_n)
+
+    # 批边界: 同一 batch_seconds 桶内的情报一起到达，批的时刻取桶内最后一条
+    ctimes = epoch_seconds(df['date'])
+    buckets = np.floor(ctimes / batch_seconds)
+    ends = np.append(np.flatnonzero(np.diff(buckets)) + 1, len(df))
+    items = df[['sector', 'sub_sector', 'score', 'summary']].to_dict('records')
+
+    moments = sorted(pd.Timestamp(m) for m in brief_at) if brief_at else \
+        brief_moments(df['date'].iloc[0], df['date'].iloc[-1], brief_times)
+    brief_ctimes = epoch_seconds(moments) if moments else np.array([])
+
+    # 板块引擎一次性解析整段历史，各内参时刻只取截至当时的视图
+    engine.update(df)
+    records, begin, next_brief = [], 0, 0
+    for end in ends:
+        batch_time = ctimes[end - 1]
+        # 批到达之前排期的内参先生成 (只看得到之前的情报)
+        while next_brief < len(moments) and brief_ctimes[next_brief] < batch_time:
+            _emit_brief(records, engine, moments[next_brief], clock, brief_ctimes[next_brief])
+            next_brief += 1
+        clock.advance_to(batch_time)
+        records.extend(alert_record(a, clock.time()) for a in detector.observe(items[begin:end]))
+        begin = end
+    for moment, moment_ctime in zip(moments[next_brief:], brief_ctimes[next_brief:]):
+        _emit_brief(records, engine, moment, clock, moment_ctime)
+    return records
+
+
+def _emit_brief(records, engine, moment, clock, moment_ctime):
+    clock.advance_to(moment_ctime)
+    lookback_hours = brief_lookback_hours(moment)
+    stat_df, detail_news = brief_context(engine.as_of(moment), moment, lookback_hours)
+    if not detail_news.empty:
+        records.append(brief_record(stat_df, detail_news, moment, lookback_hours))
+
+
+def write_jsonl(records, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, sort_keys=True) + "\n")
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def diff_records(base, other):
+    """
+    两次回放的差异: 警报按 (时刻, 二级细分) 对齐，内参按时刻对齐比较一级板块排名。
+    返回 {'alerts_only_base', 'alerts_only_other', 'briefs_changed'}
+    """
+    def alerts(records):
+        return {(r['at'], r['sub_sector']): r for r in records if r['kind'] == 'alert'}
+
+    def rankings(records):
+        return {r['at']: [s['sector'] for s in r['sectors']] for r in records if r['kind'] == 'brief'}
+
+    a, b = alerts(base), alerts(other)
+    ra, rb = rankings(base), rankings(other)
+    return {
+        'alerts_only_base': [a[k] for k in sorted(a.keys() - b.keys())],
+        'alerts_only_other': [b[k] for k in sorted(b.keys() - a.keys())],
+        'briefs_changed': [{'at': at, 'base': ra.get(at), 'other': rb.get(at)}
+                           for at in sorted(ra.keys() | rb.keys()) if ra.get(at) != rb.get(at)],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按事件时间离线回放情报库: 共振警报 + 内参上下文")
+    parser.add_argument("--csv", help="旧版 news_data.csv 路径 (不传则读分区情报库)")
+    parser.add_argument("--store", default=NEWS_STORE_PATH, help="分区情报库目录")
+    parser.add_argument("--start", help="回放起点，如 2026-01-01")
+    parser.add_argument("--end", help="回放终点")
+    parser.add_argument("--at", nargs="+", help="只在这些时刻生成内参，如 '2026-01-17 12:00'")
+    parser.add_argument("--brief-times", nargs="+", default=list(BRIEF_TIMES), help="每天的内参排期")
+    parser.add_argument("--window", nargs=4, action="append", metavar=("NAME", "SECONDS", "MIN_TOTAL", "MIN_HIGH"),
+                        help="共振窗口，可重复；不传用 resonance.RESONANCE_WINDOWS")
+    parser.add_argument("--high-score", type=float, default=HIGH_SCORE)
+    parser.add_argument("--min-score", type=float, default=MIN_STORE_SCORE)
+    parser.add_argument("--trading-half-life", type=float, default=TRADING_HALF_LIFE)
+    parser.add_argument("--off-hours-half-life", type=float, default=OFF_HOURS_HALF_LIFE)
+    parser.add_argument("--min-strength", type=float, default=MIN_L1_STRENGTH)
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--batch-seconds", type=int, default=REPLAY_BATCH_SECONDS)
+    parser.add_argument("--out", default="replay.jsonl")
+    parser.add_argument("--diff", help="与另一次回放输出 (JSONL) 对比")
+    args = parser.parse_args()
+
+    windows = [(name, int(sec), int(total), int(high)) for name, sec, total, high in args.window] \
+        if args.window else RESONANCE_WINDOWS
+    started = time.perf_counter()
+    # 内参窗口最长回看 72h，起点之前的情报也要读进来才能算出起点时刻的衰减分
+    load_start = pd.Timestamp(args.start) - timedelta(hours=72) if args.start else None
+    archive = load_archive(args.csv, args.store, start=load_start, end=args.end)
+    loaded = time.perf_counter() - started
+    records = replay(archive, windows=windows, high_score=args.high_score, min_score=args.min_score,
+                     trading_half_life=args.trading_half_life, off_hours_half_life=args.off_hours_half_life,
+                     min_strength=args.min_strength, top_n=args.top_n, brief_at=args.at,
+                     brief_times=args.brief_times, batch_seconds=args.batch_seconds)
+    if args.start:
+        records = [r for r in records if r['at'] >= str(pd.Timestamp(args.start))]
+    elapsed = time.perf_counter() - started
+    write_jsonl(records, args.out)
+
+    alerts = sum(r['kind'] == 'alert' for r in records)
+    print(f"⏪ 回放 {len(archive)} 条情报 (读取 {loaded:.2f}s，共 {elapsed:.2f}s): "
+          f"{alerts} 条警报 / {len(records) - alerts} 份内参 -> {args.out}")
+
+    if args.diff:
+        result = diff_records(read_jsonl(args.diff), records)
+        print(f"🔀 对比 {args.diff}: 仅基线警报 {len(result['alerts_only_base'])} 条 | "
+              f"仅本次警报 {len(result['alerts_only_other'])} 条 | 内参排名变化 {len(result['briefs_changed'])} 处")
+        for change in result['briefs_changed'][:10]:
+            print(f"   {change['at']}: {change['base']} -> {change['other']}")
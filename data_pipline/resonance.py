@@ -0,0 +1,177 @@
+import json
+import os
+import time
+from collections import deque
+
+# ================= 🚨 多窗口板块共振检测 =================
+# 每个窗口维护: 一条按时间排序的全局队列 + 每个二级细分的 (总数, 高能数, 线索) 计数器
+# - 新情报: 各窗口 append 一次，计数 +1
+# - 过期: 只从队头弹出，计数 -1
+# 每条情报进出各一次，单条成本与盘面多热闹无关 (均摊 O(1))
+# (名称, 窗口秒数, 最少条数, 最少高能条数)
+RESONANCE_WINDOWS = (
+    ("15分钟", 15 * 60, 2, 2),   # 短时密集: 两条高能扎堆
+    ("1小时", 60 * 60, 2, 1),    # 原有规则: 1 小时内 >=2 条且至少 1 条高能
+    ("4小时", 4 * 60 * 60, 4, 2),  # 持续发酵
+)
+HIGH_SCORE = 7
+GENERIC_SUB_SECTOR = "通用"
+# 窗口记录按行追加 (JSON Lines)，每批只写新增的几行；
+# 文件行数超过 存活条数 x COMPACT_FACTOR + COMPACT_MIN 时整体重写一次，把过期行截掉 (均摊 O(1))
+RESONANCE_STATE_PATH = os.getenv(
+    "RESONANCE_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "resonance_state.jsonl"))
+RESONANCE_COMPACT_FACTOR = 2
+RESONANCE_COMPACT_MIN = 1000
+
+
+class SlidingWindow:
+    def __init__(self, name, seconds, min_total, min_high):
+        self.name = name
+        self.seconds = seconds
+        self.min_total = min_total
+        self.min_high = min_high
+        self.entries = deque()  # (时间, 二级细分, 是否高能)，按时间递增
+        self.stats = {}         # 二级细分 -> {'total', 'high', 'parent', 'titles'}
+
+    def push(self, t, sector, sub, high, summary):
+        self.entries.append((t, sub, high))
+        stat = self.stats.get(sub)
+        if stat is None:
+            stat = self.stats[sub] = {'total': 0, 'high': 0, 'parent': sector, 'titles': deque()}
+        stat['total'] += 1
+        stat['high'] += high
+        stat['parent'] = sector
+        stat['titles'].append(summary)
+
+    def expire(self, now):
+        cutoff = now - self.seconds
+        while self.entries and self.entries[0][0] <= cutoff:
+            _, sub, high = self.entries.popleft()
+            stat = self.stats[sub]
+            stat['total'] -= 1
+            stat['high'] -= high
+            stat['titles'].popleft()  # 同一细分的线索也按时间入队，队头就是过期的那条
+            if not stat['total']:
+                del self.stats[sub]
+
+    def triggered(self, sub):
+        stat = self.stats.get(sub)
+        return stat is not None and stat['total'] >= self.min_total and stat['high'] >= self.min_high
+
+
+class ResonanceDetector:
+    """
+    多窗口共振雷达 (替代 SECTOR_HISTORY_BUFFER 每轮重建 + 全量重数)。
+    observe() 返回本批新情报触发的警报；新记录追加落盘，重启后继续累计。
+    clock 默认是墙钟，离线回放时换成模拟时钟 (见 replay.py)。
+    """
+
+    def __init__(self, windows=RESONANCE_WINDOWS, high_score=HIGH_SCORE, state_path=RESONANCE_STATE_PATH,
+                 clock=time.time):
+        self.windows = [SlidingWindow(*w) for w in windows]
+        self.high_score = high_score
+        self.state_path = state_path
+        self.clock = clock
+        # 最长窗口内的原始记录，只用于落盘恢复
+        self.horizon = max(w.seconds for w in self.windows)
+        self.log = deque()
+        self._file_lines = 0  # 落盘文件当前行数 (含已过期的)
+
+    def _push(self, t, sector, sub, score, summary):
+        high = int(score >= self.high_score)
+        for window in self.windows:
+            window.push(t, sector, sub, high, summary)
+        self.log.append((t, sector, sub, score, summary))
+
+    def _expire(self, now):
+        for window in self.windows:
+            window.expire(now)
+        cutoff = now - self.horizon
+        while self.log and self.log[0][0] <= cutoff:
+            self.log.popleft()
+
+    def observe(self, items, now=None):
+        """
+        追加一批情报 (只统计有明确二级细分的)，返回警报列表:
+        [{'sector', 'sub_sector', 'windows': [(窗口名, 条数, 高能数)], 'titles'}]
+        """
+        now = self.clock() if now is None else now
+        self._expire(now)
+        touched = {}
+        fresh = []
+        for item in items:
+            sub = item.get('sub_sector')
+            if not sub or sub == GENERIC_SUB_SECTOR:
+                continue
+            try:
+                score = float(item.get('score', 0) or 0)
+            except (TypeError, ValueError):
+                score = 0.0
+            self._push(now, item.get('sector', ''), sub, score, item.get('summary', ''))
+            fresh.append(self.log[-1])
+            touched[sub] = None
+
+        # 只检查本批涉及的细分，没有新消息的细分不重复报警
+        alerts = []
+        for sub in touched:
+            hits = [(w.name, w.stats[sub]['total'], w.stats[sub]['high']) for w in self.windows if w.triggered(sub)]
+            if not hits:
+                continue
+            longest = max((w for w in self.windows if w.name in {h[0] for h in hits}), key=lambda w: w.seconds)
+            stat = longest.stats[sub]
+            alerts.append({
+                'sector': stat['parent'],
+                'sub_sector': sub,
+                'windows': hits,
+                'titles': list(dict.fromkeys(stat['titles'])),
+            })
+        if touched and self.state_path:
+            self._append(fresh)
+        return alerts
+
+    # ---------- 落盘 / 恢复 ----------
+    def _append(self, entries):
+        """只追加本批新记录；过期行攒够了再整体压缩"""
+        if self._file_lines > len(self.log) * RESONANCE_COMPACT_FACTOR + RESONANCE_COMPACT_MIN:
+            self.save()
+            return
+        lines = [json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries]
+        with open(self.state_path, 'a', encoding='utf-8') as f:
+            f.writelines(lines)
+        self._file_lines += len(lines)
+
+    def save(self):
+        """压缩: 只保留最长窗口内的记录，整体重写"""
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + '\n' for entry in self.log)
+        os.replace(tmp, self.state_path)
+        self._file_lines = len(self.log)
+
+    def load(self, now=None):
+        """逐行重放窗口 (已过期的直接丢弃；崩溃时写了半截的行跳过)，返回恢复的条数"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return 0
+        now = self.clock() if now is None else now
+        lines, broken = 0, 0
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        t, sector, sub, score, summary = json.loads(line)
+                    except (TypeError, ValueError):
+                        broken += 1
+                        continue
+                    if now - t < self.horizon:
+                        self._push(t, sector, sub, score, summary)
+        except OSError:
+            return 0
+        self._expire(now)
+        self._file_lines = lines
+        if broken:
+            self.save()  # 半截行后面不能再接着追加，先压缩成干净文件
+        return len(self.log)
+
+    def __len__(self):
+        return len(self.log)
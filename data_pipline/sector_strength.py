@@ -0,0 +1,186 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+# ================= 📈 板块强度引擎 (向量化) =================
+# 替代 generate_daily_brief 里逐行 .apply + 按板块循环过滤的写法:
+# 半衰期 / 衰减分 / 新鲜度全部整列计算，一级 Top3 强度、二级均值在板块编码上一次聚合完成
+TRADING_SESSIONS = ((9.5, 11.5), (13.0, 15.0))  # 与 get_dynamic_half_life 一致 (含端点)
+TRADING_HALF_LIFE = 4.0     # 交易时段加速衰减
+OFF_HOURS_HALF_LIFE = 24.0  # 休市时段发酵
+EXCLUDED_SECTORS = ["其他", "全局", "nan"]
+GENERIC_SUB_SECTOR = "通用"
+MIN_L1_STRENGTH = 4.0
+TOP_N = 3
+BRIEF_TOP_SECTORS = 5   # 内参 prompt 里的一级板块数
+BRIEF_TOP_NEWS = 12     # 内参 prompt 里的核心情报条数
+
+BRIEF_COLUMNS = ['date', 'score', 'sentiment', 'summary', 'sector', 'sub_sector', 'logic', 'related_stocks']
+
+
+def trading_session_mask(dates):
+    """整列判断是否处于 A 股交易时段 (工作日 9:30-11:30, 13:00-15:00)"""
+    dates = pd.DatetimeIndex(dates)
+    hour_float = dates.hour + dates.minute / 60.0
+    in_session = np.zeros(len(dates), dtype=bool)
+    for start, end in TRADING_SESSIONS:
+        in_session |= (hour_float >= start) & (hour_float <= end)
+    return in_session & (dates.weekday < 5)
+
+
+def half_life_hours(dates, trading=TRADING_HALF_LIFE, off_hours=OFF_HOURS_HALF_LIFE):
+    return np.where(trading_session_mask(dates), trading, off_hours)
+
+
+def apply_decay(df, now, half_life=None):
+    """原地追加 half_life / hours_diff / decayed_score / freshness 四列"""
+    df['half_life'] = half_life_hours(df['date']) if half_life is None else half_life
+    df['hours_diff'] = (pd.Timestamp(now).as_unit('ns') - df['date'].astype('datetime64[ns]')).dt.total_seconds() / 3600.0
+    df['decayed_score'] = df['score'] * np.exp2(-df['hours_diff'] / df['half_life'])
+    df['freshness'] = df['decayed_score'] / (df['score'] + 0.01)
+    return df
+
+
+def sector_strength(recent_df, min_strength=MIN_L1_STRENGTH, top_n=TOP_N):
+    """
+    双层聚合 (需已带 decayed_score 列)，返回按 strength 降序的一级板块表:
+    sector / strength / count / sub_details / top_news
+    全部在 factorize 后的整数编码上用 numpy 完成，Python 层只循环板块个数次
+    """
+    columns = ['sector', 'strength', 'count', 'sub_details', 'top_news']
+    sector = recent_df['sector']
+    valid = (sector.notna() & ~sector.isin(EXCLUDED_SECTORS)).to_numpy()
+    if not valid.any():
+        return pd.DataFrame(columns=columns)
+
+    rows = np.flatnonzero(valid)
+    sec_codes, sec_names = pd.factorize(sector.iloc[rows])  # 按首次出现顺序编码，与 unique() 一致
+    sec_names = np.asarray(sec_names, dtype=object)
+    decayed = recent_df['decayed_score'].to_numpy(dtype=float)[rows]
+    sentiment = recent_df['sentiment'].to_numpy(dtype=float)[rows]
+    sub = recent_df['sub_sector'].iloc[rows]
+    n_sec = len(sec_names)
+
+    # 一级: 按 (板块, 衰减分降序) 排序，组内名次 < N 的求均值；组内第一条即头条
+    order = np.lexsort((-decayed, sec_codes))
+    sorted_codes = sec_codes[order]
+    group_start = np.searchsorted(sorted_codes, np.arange(n_sec))
+    rank = np.arange(len(order)) - group_start[sorted_codes]
+    top = order[rank < top_n]
+    strength = np.bincount(sec_codes[top], weights=decayed[top], minlength=n_sec) / \
+        np.bincount(sec_codes[top], minlength=n_sec)
+    count = np.bincount(sec_codes, minlength=n_sec)
+    top_news = recent_df['summary'].iloc[rows[order[group_start]]].to_numpy(dtype=object)
+
+    # 二级: (板块, 细分) 组合编码后一次 bincount 求均值，保持组合首次出现顺序
+    sub_mask = (sub.notna() & (sub != GENERIC_SUB_SECTOR)).to_numpy()
+    sub_details = ["全板块普涨"] * n_sec
+    if sub_mask.any():
+        sub_codes, sub_names = pd.factorize(sub[sub_mask])
+        sub_names = np.asarray(sub_names, dtype=object)
+        pair = sec_codes[sub_mask] * len(sub_names) + sub_codes
+        pair_codes, pair_keys = pd.factorize(pair)
+        n_pair = len(pair_keys)
+        pair_count = np.bincount(pair_codes, minlength=n_pair)
+        pair_strength = np.bincount(pair_codes, weights=decayed[sub_mask], minlength=n_pair) / pair_count
+        pair_sentiment = np.bincount(pair_codes, weights=sentiment[sub_mask], minlength=n_pair) / pair_count
+        labels = [[] for _ in range(n_sec)]
+        for key, s, e in zip(pair_keys, pair_strength, pair_sentiment):
+            sec_code, sub_code = divmod(int(key), len(sub_names))
+            labels[sec_code].append(f"{sub_names[sub_code]}(强:{s:.1f}/情绪:{e:.1f})")
+        sub_details = [" | ".join(x) if x else "全板块普涨" for x in labels]
+
+    # 弱板块按未取整的强度过滤 (与旧实现一致，3.95~3.99 不会被取整抬进来)，取整只用于展示
+    keep = strength >= min_strength
+    l1 = pd.DataFrame({
+        'sector': sec_names[keep],
+        'strength': np.round(strength[keep], 2),
+        'count': count[keep],
+        'sub_details': [d for d, k in zip(sub_details, keep) if k],
+        'top_news': top_news[keep],
+    })
+    return l1.sort_values('strength', ascending=False, kind='stable')[columns]
+
+
+class SectorStrengthEngine:
+    """
+    增量维护内参窗口: 新情报到达时只对新行做一次解析 + 半衰期计算并追加，
+    过期行从头部批量淘汰；生成内参时只剩一遍向量化衰减 + groupby。
+    """
+
+    def __init__(self, max_lookback_hours=72, trading_half_life=TRADING_HALF_LIFE,
+                 off_hours_half_life=OFF_HOURS_HALF_LIFE, min_strength=MIN_L1_STRENGTH, top_n=TOP_N):
+        self.max_lookback = pd.Timedelta(hours=max_lookback_hours)
+        self.half_lives = (trading_half_life, off_hours_half_life)
+        self.min_strength = min_strength
+        self.top_n = top_n
+        self.frame = pd.DataFrame(columns=BRIEF_COLUMNS + ['half_life'])
+        self.primed = False
+
+    def update(self, df):
+        if df is None or df.empty:
+            return
+        new = df.reindex(columns=BRIEF_COLUMNS).copy()
+        # 统一成 ns 精度，和任意精度的 now 做减法/二分都不会触发单位转换错误
+        new['date'] = pd.to_datetime(new['date'], errors='coerce').astype('datetime64[ns]')
+        new['score'] = pd.to_numeric(new['score'], errors='coerce').fillna(0)
+        new['sentiment'] = pd.to_numeric(new['sentiment'], errors='coerce').fillna(0)
+        new = new.dropna(subset=['date'])
+        new['half_life'] = half_life_hours(new['date'], *self.half_lives)
+
+        frames = [f for f in (self.frame, new) if not f.empty]
+        self.frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else new.reset_index(drop=True)
+        if not self.frame['date'].is_monotonic_increasing:
+            self.frame = self.frame.sort_values('date', kind='stable', ignore_index=True)
+        # 板块列保持 category，聚合时直接复用整数编码
+        for col in ('sector', 'sub_sector'):
+            self.frame[col] = self.frame[col].astype('category')
+
+    def evict(self, now):
+        cutoff = pd.Timestamp(now) - self.max_lookback
+        start = self.frame['date'].searchsorted(cutoff)
+        if start:
+            self.frame = self.frame.iloc[start:].reset_index(drop=True)
+
+    def snapshot(self, now, lookback_hours):
+        """返回 (一级板块表, 窗口内带衰减分的明细)"""
+        self.evict(now)
+        start = self.frame['date'].searchsorted(pd.Timestamp(now) - pd.Timedelta(hours=lookback_hours))
+        recent_df = self.frame.iloc[start:].copy()
+        if recent_df.empty:
+            return sector_strength(recent_df.assign(decayed_score=[])), recent_df
+        apply_decay(recent_df, now, half_life=recent_df['half_life'])
+        return sector_strength(recent_df, self.min_strength, self.top_n), recent_df
+
+    def as_of(self, now):
+        """
+        截至 now 的只读视图 (now 之后的行还没"到达")，参数与本引擎一致。
+        离线回放时整段历史只 update 一次，各个时刻取视图即可，不必逐批拼接。
+        """
+        view = copy.copy(self)
+        dates = self.frame['date']
+        lo = dates.searchsorted(pd.Timestamp(now) - self.max_lookback)  # 与 evict 一致，边界行保留
+        hi = dates.searchsorted(pd.Timestamp(now), side='right')
+        view.frame = self.frame.iloc[lo:hi]
+        return view
+
+    def __len__(self):
+        return len(self.frame)
+
+
+def brief_lookback_hours(now):
+    """周末自适应窗口: 周一回看 72h 覆盖周末，其余 24h"""
+    return 72 if pd.Timestamp(now).weekday() == 0 else 24
+
+
+def brief_context(engine, now, lookback_hours=None):
+    """
+    内参 prompt 的输入，返回 (一级板块前 BRIEF_TOP_SECTORS 名, 衰减分最高的 BRIEF_TOP_NEWS 条明细)。
+    只依赖传入的 now，线上 (datetime.now()) 与离线回放 (模拟时钟) 走同一套计算。
+    """
+    lookback_hours = brief_lookback_hours(now) if lookback_hours is None else lookback_hours
+    stat_df, recent_df = engine.snapshot(now, lookback_hours)
+    if recent_df.empty:
+        return stat_df, recent_df
+    return stat_df.head(BRIEF_TOP_SECTORS), recent_df.nlargest(BRIEF_TOP_NEWS, 'decayed_score')
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import struct
+import time
+from collections import OrderedDict
+
+# ================= 👀 已读电报去重库 =================
+# 替代 SEEN_NEWS_BUFFER (整条电报文本的 set + 无序截断):
+# - 键: 内容 MD5 / 财联社 id 的 16 字节摘要，内存与电报长度无关
+# - 淘汰: OrderedDict 按首次出现顺序排列，超出容量或超过保留天数从队头淘汰
+# - 落盘: 每条 20 字节的定长二进制记录 (摘要 + 秒级时间戳)，启动时直接解包，不碰情报库
+SEEN_STORE_PATH = os.getenv(
+    "SEEN_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "seen_news.bin"))
+SEEN_CAPACITY = 100_000   # 最多记住的键数 (每条电报占 2 个: 内容 + id)
+SEEN_MAX_AGE_DAYS = 7     # 财联社接口回溯不到一周前的电报，再老的键没有意义
+
+_MAGIC = b"SEEN1\0"
+_RECORD = struct.Struct("<16sI")
+
+
+def _content_key(content):
+    return hashlib.md5(content.encode()).digest()
+
+
+def _id_key(news_id):
+    return hashlib.md5(f"cls:{news_id}".encode()).digest()
+
+
+class SeenNewsStore:
+    def __init__(self, path=SEEN_STORE_PATH, capacity=SEEN_CAPACITY, max_age_days=SEEN_MAX_AGE_DAYS):
+        self.path = path
+        self.capacity = capacity
+        self.max_age = int(max_age_days * 86400)
+        self._keys = OrderedDict()  # 16 字节摘要 -> 首次出现时间 (秒)
+        self._dirty = False
+
+    @staticmethod
+    def _item_keys(item):
+        keys = [_content_key(item['content'])]
+        if item.get('id'):
+            keys.append(_id_key(item['id']))
+        return keys
+
+    def filter_new(self, items):
+        """返回没见过的电报 (内容或 id 任一命中即视为已读)，保持顺序，同批重复只留第一条"""
+        fresh, batch_keys = [], set()
+        for item in items:
+            keys = self._item_keys(item)
+            if any(k in self._keys or k in batch_keys for k in keys):
+                continue
+            batch_keys.update(keys)
+            fresh.append(item)
+        return fresh
+
+    def add(self, items, now=None):
+        now = int(time.time() if now is None else now)
+        for item in items:
+            for key in self._item_keys(item):
+                if key not in self._keys:
+                    self._keys[key] = now
+                    self._dirty = True
+        self._evict(now)
+
+    def _evict(self, now):
+        cutoff = now - self.max_age
+        while self._keys:
+            key, ts = next(iter(self._keys.items()))
+            if len(self._keys) <= self.capacity and ts >= cutoff:
+                break
+            del self._keys[key]
+            self._dirty = True
+
+    def __contains__(self, item):
+        return any(k in self._keys for k in self._item_keys(item))
+
+    def __len__(self):
+        return len(self._keys)
+
+    # ---------- 落盘 / 恢复 ----------
+    def save(self):
+        if not self._dirty:
+            return
+        payload = b"".join(_RECORD.pack(k, ts) for k, ts in self._keys.items())
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC + payload)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def load(self, now=None):
+        """从二进制快照恢复，返回恢复的键数；文件不存在或损坏时返回 0"""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if not data.startswith(_MAGIC) or (len(data) - len(_MAGIC)) % _RECORD.size:
+            print(f"⚠️ 去重库文件损坏，忽略: {self.path}")
+            return 0
+        self._keys = OrderedDict(_RECORD.iter_unpack(memoryview(data)[len(_MAGIC):]))
+        self._evict(int(time.time() if now is None else now))
+        return len(self._keys)
@@ -0,0 +1,99 @@
+import hashlib
+import math
+
+# ================= 🧬 内容指纹去重索引 =================
+# app.py 入库与 feeder 抓取共用同一套 ID: 内容的 MD5 (doc_id)
+# 每批只做一次成员判断，重复内容不会再进入 embedding / LLM
+REBUILD_PAGE_SIZE = 5000
+
+
+def content_hash(text):
+    """新闻内容指纹 (与向量库 doc_id 一致)"""
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+class BloomFilter:
+    """
+    定长位图布隆过滤器，内存与文本长度无关。
+    只会误报"存在"，不会漏报，所以命中的 ID 需要回库确认一次。
+    """
+
+    def __init__(self, capacity=200_000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(self.size // 8 + 1)
+
+    def _positions(self, key):
+        # 双重哈希: 用一次 MD5 的前后两半模拟 k 个独立哈希
+        digest = hashlib.md5(key.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupIndex:
+    """
+    批量去重索引。
+    - 默认用内存 set 精确判断，完全不访问向量库；
+    - use_bloom=True 时改用布隆过滤器省内存，命中的候选再用一次批量 get 回库确认。
+    """
+
+    def __init__(self, collection=None, use_bloom=False, capacity=200_000):
+        self.collection = collection
+        self.use_bloom = use_bloom
+        self._keys = BloomFilter(capacity) if use_bloom else set()
+        self.count = 0
+
+    @classmethod
+    def from_collection(cls, collection, **kwargs):
+        """启动时从向量库重建索引 (只拉 ID，不拉文本和向量)"""
+        index = cls(collection=collection, **kwargs)
+        offset = 0
+        while True:
+            page = collection.get(include=[], limit=REBUILD_PAGE_SIZE, offset=offset)
+            ids = page["ids"]
+            if not ids:
+                break
+            index.add(ids)
+            offset += len(ids)
+        return index
+
+    def add(self, ids):
+        for doc_id in ids:
+            self._keys.add(doc_id)
+            self.count += 1
+
+    def filter_new(self, ids):
+        """
+        返回 ids 中尚未入库的部分 (保持原顺序，同批内的重复也会被剔除)。
+        整批只做一次判断: set 模式零 IO，布隆模式最多一次批量回库确认。
+        """
+        maybe_seen = [doc_id for doc_id in ids if doc_id in self._keys]
+
+        confirmed = set(maybe_seen)
+        if self.use_bloom and maybe_seen and self.collection is not None:
+            # 布隆过滤器可能误报，命中的候选统一回库确认一次
+            confirmed = set(self.collection.get(ids=list(set(maybe_seen)), include=[])["ids"])
+
+        fresh = []
+        batch_seen = set()
+        for doc_id in ids:
+            if doc_id in confirmed or doc_id in batch_seen:
+                continue
+            batch_seen.add(doc_id)
+            fresh.append(doc_id)
+        return fresh
+
+    def __contains__(self, doc_id):
+        return doc_id in self._keys
+
+    def __len__(self):
+        # 布隆模式下无法精确去重计数，返回累计写入次数
+        return self.count if self.use_bloom else len(self._keys)
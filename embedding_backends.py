@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+from functools import partial
+
+import numpy as np
+
+# ================= 🧠 Embedding 后端 =================
+# 同一个 ./local_model (MiniLM, 384 维, mean pooling + Normalize) 的三种 CPU 推理方式:
+#   torch       原始 PyTorch FP32
+#   torch-int8  PyTorch 动态量化 (Linear 层权重 int8)，无额外依赖
+#   onnx-int8   导出 ONNX 后做 int8 动态量化，ONNX Runtime 推理 (首次使用时导出并缓存到 local_model/onnx/)
+# 接口与 SentenceTransformer 对齐 (encode / get_sentence_embedding_dimension)，可直接套 EmbeddingCache
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "./local_model")
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))  # 0 = 框架默认线程数
+EMBED_MAX_SEQ_LENGTH = int(os.getenv("EMBED_MAX_SEQ_LENGTH", "256"))
+ONNX_OPSET = 14
+
+_EXPORT_LOCK = threading.Lock()
+
+
+def _has_normalize(path):
+    """local_model 的 modules.json 里带 Normalize 层时输出做 L2 归一化"""
+    try:
+        with open(os.path.join(path, "modules.json"), encoding="utf-8") as f:
+            return any(m.get("type", "").endswith("Normalize") for m in json.load(f))
+    except FileNotFoundError:
+        return False
+
+
+class TorchBackend:
+    """SentenceTransformer 原生推理；quantize=True 时对 Linear 层做 int8 动态量化"""
+
+    def __init__(self, path=LOCAL_MODEL_PATH, batch_size=EMBED_BATCH_SIZE, threads=EMBED_THREADS,
+                 max_seq_length=EMBED_MAX_SEQ_LENGTH, quantize=False):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(path, device="cpu", local_files_only=True)
+        model.max_seq_length = max_seq_length
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        self.model = model
+        self.name = "torch-int8" if quantize else "torch"
+        self.batch_size = batch_size
+
+    def encode(self, sentences, batch_size=None, **kwargs):
+        kwargs.setdefault("show_progress_bar", False)
+        return self.model.encode(sentences, batch_size=batch_size or self.batch_size, convert_to_numpy=True, **kwargs)
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+
+def export_onnx_int8(path=LOCAL_MODEL_PATH):
+    """把 local_model 的 Transformer 导出为 ONNX 并做 int8 动态量化，返回量化模型路径 (已存在则直接复用)"""
+    out_dir = os.path.join(path, "onnx")
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    int8_path = os.path.join(out_dir, "model_int8.onnx")
+    with _EXPORT_LOCK:
+        if os.path.exists(int8_path):
+            return int8_path
+
+        import torch
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        from transformers import AutoModel, AutoTokenizer
+
+        os.makedirs(out_dir, exist_ok=True)
+        model = AutoModel.from_pretrained(path, local_files_only=True).eval()
+        sample = AutoTokenizer.from_pretrained(path, local_files_only=True)(["导出样例 export"], return_tensors="pt")
+        names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+        axes = {n: {0: "batch", 1: "seq"} for n in names + ["last_hidden_state"]}
+
+        class _Encoder(torch.nn.Module):
+            """按名称传参: 不同 transformers 版本 forward 的位置参数顺序不一致"""
+
+            def __init__(self):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(names, inputs))).last_hidden_state
+
+        with torch.no_grad():
+            torch.onnx.export(_Encoder(), tuple(sample[n] for n in names), fp32_path, input_names=names,
+                              output_names=["last_hidden_state"], dynamic_axes=axes, opset_version=ONNX_OPSET,
+                              dynamo=False)  # 新版 torch 默认走 dynamo 导出 (依赖 onnxscript)，这里沿用 TorchScript 导出
+
+        # 先写临时文件再改名，导出中断不会留下半个模型
+        tmp = f"{int8_path}.tmp"
+        quantize_dynamic(fp32_path, tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, int8_path)
+        return int8_path
+
+
+class OnnxInt8Backend:
+    """ONNX Runtime int8 推理: tokenizers 分词 -> Transformer -> mean pooling -> Normalize (与 local_model 一致)"""
+
+    name = "onnx-int8"
+
+    def __init__(self, path=LOCAL_MODEL_PATH, batch_size=EMBED_BATCH_SIZE, threads=EMBED_THREADS,
+                 max_seq_length=EMBED_MAX_SEQ_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(export_onnx_int8(path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_seq_length)
+        pad_token = "[PAD]"
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+        self.normalize = _has_normalize(path)
+        self.batch_size = batch_size
+        self._dim = None
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {n: feeds[n] for n in self.input_names})[0]
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.normalize:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences, batch_size=None, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        batch_size = batch_size or self.batch_size
+
+        # 按长度排序后分批，减少 padding (与 SentenceTransformer.encode 的做法一致)
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        parts = [self._encode_batch([texts[i] for i in order[start: start + batch_size]])
+                 for start in range(0, len(texts), batch_size)]
+        out = np.empty((len(texts), parts[0].shape[1]), dtype=np.float32)
+        out[order] = np.vstack(parts)
+        return out[0] if single else out
+
+    def get_sentence_embedding_dimension(self):
+        if self._dim is None:
+            self._dim = self._encode_batch(["dim"]).shape[1]
+        return self._dim
+
+
+BACKENDS = {
+    "torch": TorchBackend,
+    "torch-int8": partial(TorchBackend, quantize=True),
+    "onnx-int8": OnnxInt8Backend,
+}
+
+
+def load_backend(name=EMBED_BACKEND, path=LOCAL_MODEL_PATH, **config):
+    """按名称加载后端；config 可覆盖 batch_size / threads / max_seq_length"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知的 embedding 后端: {name} (可选: {', '.join(BACKENDS)})")
+    return BACKENDS[name](path=path, **config)
+
+
+def cache_model_id(name, path=LOCAL_MODEL_PATH):
+    """EmbeddingCache 的 model_id: 量化后端的向量与 FP32 略有差异，分开缓存 (FP32 沿用原有 ID)"""
+    base = os.path.basename(os.path.normpath(path))
+    return base if name == "torch" else f"{base}@{name}"
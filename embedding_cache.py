@@ -0,0 +1,232 @@
+import atexit
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ================= 🧊 Embedding 缓存 =================
+# 两级缓存: 内存 LRU -> 磁盘 (memmap float32 向量矩阵 + key 索引)
+# key = (模型 ID, 归一化文本的哈希)，只有未命中的文本才会送进 SentenceTransformer
+# 同一个缓存目录同一时间只有一个进程能用磁盘层: 打开时对 writer.lock 加非阻塞排他文件锁，
+# 拿不到 (如 app 与 rag_engine 同时运行) 的进程只用内存层；进程退出时锁由系统自动释放。
+# 进程内多线程 (入库线程 + 各会话) 共用时由内部锁保护
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "./embedding_cache")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+EMBED_CACHE_MEMORY_ITEMS = 10_000
+
+_SPACES = re.compile(r"\s+")
+
+
+def _try_lock(f):
+    """对已打开的文件加非阻塞排他锁，成功返回 True"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def normalize_text(text):
+    """全半角统一 + 压缩空白，避免仅格式不同的文本重复编码"""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    包装任意带 encode() 的编码器 (如 SentenceTransformer)，接口保持一致:
+        model = EmbeddingCache(SentenceTransformer(...), model_id="local_model")
+        model.encode(docs).tolist()
+    """
+
+    def __init__(self, encoder, model_id, cache_dir=EMBED_CACHE_DIR,
+                 max_entries=EMBED_CACHE_MAX_ENTRIES, memory_items=EMBED_CACHE_MEMORY_ITEMS):
+        self.encoder = encoder
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.memory_items = memory_items
+        self.dir = os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", model_id).strip("_"))
+
+        self._memory = OrderedDict()
+        self._vectors = None  # (max_entries, dim) float32 memmap
+        self._keys = None     # (max_entries,) S32 memmap，空槽位为 b""
+        self._ticks = None    # (max_entries,) int64 memmap，最近访问序号 (LRU 淘汰依据)
+        self._slots = {}
+        self._free = []
+        self._tick = 0
+        # 查找 / 分配槽位 / 写入都在锁内，模型推理在锁外 (慢，且编码器自身可并发)
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.dir, exist_ok=True)
+        self._lock_file = open(self._path("writer.lock"), "a+")
+        self.disk_enabled = _try_lock(self._lock_file)
+        if not self.disk_enabled:
+            self._lock_file.close()
+            print(f"⚠️ Embedding 缓存目录 {self.dir} 正被其他进程使用，本进程只用内存缓存")
+        elif os.path.exists(self._path("vectors.npy")):
+            self._open_disk()
+        atexit.register(self.flush)
+
+    # ---------- 磁盘层 ----------
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def _open_disk(self, dim=None):
+        if dim is None:
+            self._vectors = np.load(self._path("vectors.npy"), mmap_mode="r+")
+            self._keys = np.load(self._path("keys.npy"), mmap_mode="r+")
+            self._ticks = np.load(self._path("ticks.npy"), mmap_mode="r+")
+            self.max_entries = len(self._keys)
+        else:
+            os.makedirs(self.dir, exist_ok=True)
+            fmt = np.lib.format
+            self._vectors = fmt.open_memmap(self._path("vectors.npy"), mode="w+", dtype=np.float32,
+                                            shape=(self.max_entries, dim))
+            self._keys = fmt.open_memmap(self._path("keys.npy"), mode="w+", dtype="S32",
+                                         shape=(self.max_entries,))
+            self._ticks = fmt.open_memmap(self._path("ticks.npy"), mode="w+", dtype=np.int64,
+                                          shape=(self.max_entries,))
+
+        occupied = np.flatnonzero(self._keys != b"")
+        self._slots = dict(zip(self._keys[occupied].tolist(), occupied.tolist()))
+        self._free = np.flatnonzero(self._keys == b"").tolist()[::-1]
+        self._tick = int(self._ticks.max()) + 1 if len(occupied) else 0
+
+    def _allocate(self, n):
+        """取 n 个空槽位，不够时按最近访问序号淘汰最旧的条目"""
+        slots = [self._free.pop() for _ in range(min(n, len(self._free)))]
+        need = n - len(slots)
+        if need > 0:
+            occupied = np.fromiter(self._slots.values(), dtype=np.int64)
+            victims = occupied[np.argpartition(self._ticks[occupied], need - 1)[:need]]
+            for slot in victims.tolist():
+                del self._slots[self._keys[slot]]
+                self._keys[slot] = b""
+                slots.append(slot)
+            self.evictions += need
+        return slots
+
+    def _store(self, keys, vectors):
+        if not self.disk_enabled:
+            return
+        if self._vectors is None:
+            self._open_disk(dim=vectors.shape[1])
+        # 单批超过容量时只保留最后 max_entries 条
+        keys, vectors = keys[-self.max_entries:], vectors[-self.max_entries:]
+        # 锁外编码期间别的线程可能已写入同一文本，跳过，避免一个 key 占两个槽位
+        fresh = [i for i, key in enumerate(keys) if key not in self._slots]
+        if not fresh:
+            return
+        keys, vectors = [keys[i] for i in fresh], vectors[fresh]
+        slots = self._allocate(len(keys))
+        idx = np.asarray(slots, dtype=np.int64)
+        self._vectors[idx] = vectors
+        self._keys[idx] = keys
+        self._ticks[idx] = self._tick
+        self._slots.update(zip(keys, slots))
+        # 访问序号与索引一起落盘，重启后 LRU 顺序不丢
+        for arr in (self._vectors, self._keys, self._ticks):
+            arr.flush()
+
+    # ---------- 内存层 ----------
+    def _remember(self, key, vec):
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _key(self, text):
+        return hashlib.md5(f"{self.model_id}\0{text}".encode()).hexdigest().encode()
+
+    # ---------- 对外接口 ----------
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [normalize_text(t) for t in ([sentences] if single else sentences)]
+        keys = [self._key(t) for t in texts]
+
+        out = [None] * len(texts)
+        pending = defaultdict(list)  # 未命中 key -> 在本批中的位置 (同批重复只编码一次)
+        with self._lock:
+            self._tick += 1
+            for i, key in enumerate(keys):
+                vec = self._memory.get(key)
+                slot = self._slots.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    if slot is not None:
+                        # 内存命中也要刷新磁盘层的访问序号，否则磁盘 LRU 会先淘汰最热的条目
+                        self._ticks[slot] = self._tick
+                    self.memory_hits += 1
+                    out[i] = vec
+                    continue
+
+                if slot is not None:
+                    vec = np.array(self._vectors[slot])
+                    self._ticks[slot] = self._tick
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+                    out[i] = vec
+                    continue
+
+                pending[key].append(i)
+
+        if pending:
+            miss_keys = list(pending)
+            miss_texts = [texts[pending[k][0]] for k in miss_keys]
+            vectors = np.asarray(self.encoder.encode(miss_texts, **kwargs), dtype=np.float32)
+            with self._lock:
+                self.misses += len(miss_keys)
+                self._store(miss_keys, vectors)
+                for key, vec in zip(miss_keys, vectors):
+                    self._remember(key, vec)
+            for key, vec in zip(miss_keys, vectors):
+                for i in pending[key]:
+                    out[i] = vec
+
+        if not out:
+            return np.empty((0, self._vectors.shape[1] if self._vectors is not None else 0), dtype=np.float32)
+        result = np.vstack(out)
+        return result[0] if single else result
+
+    def flush(self):
+        with self._lock:
+            for arr in (self._vectors, self._keys, self._ticks):
+                if arr is not None:
+                    arr.flush()
+
+    @property
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": hits / total if total else 0.0,
+            "disk_entries": len(self._slots),
+            "disk_enabled": self.disk_enabled,
+        }
+
+    def __getattr__(self, name):
+        # 其余属性 (如 get_sentence_embedding_dimension) 透传给底层编码器
+        if name == "encoder":
+            raise AttributeError(name)
+        return getattr(self.encoder, name)
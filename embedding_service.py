@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from embedding_backends import EMBED_BACKEND, cache_model_id, load_backend
+
+# ================= 🛰️ 本地共享 Embedding 服务 =================
+# app.py 各进程 / rag_engine / feeder 不再各自加载一份模型:
+#   服务端: 每个后端只加载一次，并发请求在 MAX_WAIT_MS 内攒成一个微批 (不超过 MAX_BATCH 条) 一起编码
+#   客户端: EmbeddingClient 与 SentenceTransformer 的 encode 接口一致，可直接套 EmbeddingCache
+# 向量以 float32 原始字节返回 (X-Shape 头给出形状)，不走 JSON 序列化
+# 设置 EMBED_SERVICE_URL (如 http://127.0.0.1:8765) 后，get_encoder() 返回客户端，否则本地加载
+EMBED_SERVICE_URL = os.getenv("EMBED_SERVICE_URL", "")
+EMBED_SERVICE_HOST = "127.0.0.1"
+EMBED_SERVICE_PORT = 8765
+MAX_BATCH = 64
+MAX_WAIT_MS = 1.0  # 编码期间排队的请求会自动并批，额外等待只需很短
+CLIENT_TIMEOUT = 60
+
+
+class MicroBatcher:
+    """
+    把并发的 encode 请求合并成微批: 已在排队的请求全部并入，第一个请求到达后最多再等 max_wait_ms，
+    攒够 max_batch 条就立即编码，结果按请求拆回各自的 Future。
+    """
+
+    def __init__(self, encoder, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.encoder = encoder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        self.items = 0
+        threading.Thread(target=self._loop, name="embed-batcher", daemon=True).start()
+
+    def submit(self, texts):
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts):
+        return self.submit(texts).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            # 上一批编码期间已排队的请求直接并入，不受等待时间限制
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            texts = [t for texts, _ in batch for t in texts]
+            try:
+                vectors = np.asarray(self.encoder.encode(texts), dtype=np.float32) if texts else None
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            self.items += len(texts)
+            offset = 0
+            for texts_, future in batch:
+                future.set_result(vectors[offset: offset + len(texts_)] if texts_ else
+                                  np.empty((0, 0), dtype=np.float32))
+                offset += len(texts_)
+
+    @property
+    def stats(self):
+        return {"batches": self.batches, "requests": self.requests, "items": self.items,
+                "avg_batch": self.items / self.batches if self.batches else 0.0}
+
+
+class EmbeddingService:
+    """按后端名懒加载模型，每个后端一个 MicroBatcher"""
+
+    def __init__(self, loader=load_backend, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.loader = loader
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def batcher(self, backend):
+        with self._lock:
+            if backend not in self._batchers:
+                self._batchers[backend] = MicroBatcher(self.loader(backend), self.max_batch, self.max_wait_ms)
+            return self._batchers[backend]
+
+    def info(self, backend):
+        encoder = self.batcher(backend).encoder
+        return {"backend": backend, "model_id": cache_model_id(backend),
+                "dim": encoder.get_sentence_embedding_dimension()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _backend(self):
+        return parse_qs(urlparse(self.path).query).get("backend", [EMBED_BACKEND])[0]
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        try:
+            if path == "/info":
+                self._send_json(200, self.service.info(self._backend()))
+            elif path == "/stats":
+                self._send_json(200, {name: b.stats for name, b in self.service._batchers.items()})
+            else:
+                self._send_json(404, {"error": "not found"})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/encode":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            vectors = self.service.batcher(self._backend()).encode(payload["texts"])
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        body = np.ascontiguousarray(vectors, dtype="<f4").tobytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("X-Shape", f"{vectors.shape[0]},{vectors.shape[1] if vectors.ndim == 2 else 0}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # 默认 backlog 只有 5，并发用户一多就会被 reset
+
+
+def start_service(host=EMBED_SERVICE_HOST, port=EMBED_SERVICE_PORT, service=None):
+    """后台线程启动服务，返回 (server, base_url)；port=0 时随机分配端口"""
+    handler = type("EmbeddingHandler", (_Handler,), {"service": service or EmbeddingService()})
+    server = _Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+class EmbeddingClient:
+    """embedding 服务客户端，接口与 SentenceTransformer 对齐 (encode / get_sentence_embedding_dimension)"""
+
+    def __init__(self, base_url=EMBED_SERVICE_URL, backend=EMBED_BACKEND, timeout=CLIENT_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.backend = backend
+        self.timeout = timeout
+        self._info = None
+
+    def _url(self, path):
+        return f"{self.base_url}{path}?backend={self.backend}"
+
+    @property
+    def info(self):
+        if self._info is None:
+            with urllib.request.urlopen(self._url("/info"), timeout=self.timeout) as resp:
+                self._info = json.loads(resp.read())
+        return self._info
+
+    @property
+    def model_id(self):
+        return self.info["model_id"]
+
+    def get_sentence_embedding_dimension(self):
+        return self.info["dim"]
+
+    def encode(self, sentences, **kwargs):
+        # batch_size / show_progress_bar 等参数由服务端统一决定，这里忽略
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        request = urllib.request.Request(
+            self._url("/encode"), data=json.dumps({"texts": texts}, ensure_ascii=False).encode(),
+            headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+            rows, dim = (int(x) for x in resp.headers["X-Shape"].split(","))
+            vectors = np.frombuffer(resp.read(), dtype="<f4").reshape(rows, dim)
+        return vectors[0] if single else vectors
+
+
+def get_encoder(backend=EMBED_BACKEND):
+    """配置了 EMBED_SERVICE_URL 时连共享服务，否则在本进程加载模型；返回 (encoder, model_id)"""
+    if EMBED_SERVICE_URL:
+        return EmbeddingClient(EMBED_SERVICE_URL, backend), cache_model_id(backend)
+    return load_backend(backend), cache_model_id(backend)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地共享 embedding 服务 (动态微批)")
+    parser.add_argument("--host", default=EMBED_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=EMBED_SERVICE_PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--preload", nargs="*", default=[EMBED_BACKEND], help="启动时预加载的后端")
+    args = parser.parse_args()
+
+    svc = EmbeddingService(max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    for name in args.preload:
+        svc.batcher(name)
+    httpd, url = start_service(args.host, args.port, svc)
+    print(f"🛰️ Embedding 服务已启动: {url} (后端: {', '.join(args.preload)}, "
+          f"微批 ≤{args.max_batch} 条 / ≤{args.max_wait_ms}ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        httpd.shutdown()
@@ -0,0 +1,157 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+
+from metrics import inc, observe
+from news_ingest import ingest, store_items
+from news_sources import CallableAdapter, RssAdapter, SourceFetcher
+from news_store import NewsStore, NEWS_STORE_PATH
+
+# ================= 🛠️ 后台入库线程 =================
+# 抓取 / 去重 / 编码 / 写库全部在后台线程里做，Streamlit 每次 rerun 只读状态和索引，
+# 页面耗时与网络、模型无关。整个进程只有一个 worker (cache_resource 单例)，多会话不会重复入库。
+INGEST_INTERVAL = 300  # 秒，与原来 fetch_news_feed 的缓存 TTL 一致
+# 倒排索引整体 pickle 是 O(语料) 的，不能每轮都写: 有新增时按间隔落盘，stop / 进程退出时再补一次。
+# 两次落盘之间崩溃丢掉的文档，下次启动 LexicalIndex.sync() 会从向量库补回
+LEXICAL_SAVE_INTERVAL = int(os.getenv("LEXICAL_SAVE_INTERVAL", "1800"))  # 秒
+
+RSS_URL = "https://36kr.com/feed"  # 备选: 环球网财经 https://finance.huanqiu.com/rss.xml
+MOCK_NEWS = [
+    {"date": "2026-01-14", "content": "【Mock】A股全线飘红，沪指收复3000点。"},
+    {"date": "2026-01-14", "content": "【Mock】茅台发布财报，净利润同比增长 15%。"},
+    {"date": "2026-01-14", "content": "【Mock】宁德时代发布凝聚态电池，续航突破1000公里。"},
+    {"date": "2026-01-13", "content": "【Mock】央行宣布降准0.5个百分点，释放长期资金1万亿。"},
+    {"date": "2026-01-13", "content": "【Mock】腾讯发布大模型混元 5.0，接入微信生态。"}
+]
+
+
+# ---------- 数据源适配器 ----------
+def rss_source(rss_url=RSS_URL):
+    """36氪 RSS (条件请求，未更新时不下载)；抓不到或熔断时退回 Mock 数据 (live=False)"""
+    return RssAdapter(rss_url, label="36Kr", fallback=MOCK_NEWS)
+
+
+def store_source(root=NEWS_STORE_PATH):
+    """feeder 的分区情报库 (带 LLM 打标字段)"""
+    return CallableAdapter(lambda: store_items(NewsStore(root)))
+
+
+class IngestWorker(threading.Thread):
+    """
+    周期性执行: 各数据源并发抓取 (SourceFetcher) -> news_ingest.ingest (去重 + 编码 + 写库 + 倒排索引)。
+    status() 返回状态快照供页面展示；trigger() 立即开始下一轮 (刷新按钮)。
+    """
+
+    def __init__(self, collection, model, sources, dedup_index=None, lexical=None, interval=INGEST_INTERVAL,
+                 lexical_save_interval=LEXICAL_SAVE_INTERVAL):
+        super().__init__(name="ingest-worker", daemon=True)
+        self.collection = collection
+        self.model = model
+        self.fetcher = SourceFetcher(sources)  # {名称: SourceAdapter}
+        self.dedup_index = dedup_index
+        self.lexical = lexical
+        self.interval = interval
+        self.lexical_save_interval = lexical_save_interval
+        self._lexical_dirty = False
+        self._lexical_saved_at = time.monotonic()
+
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()  # 不能叫 _stop: 会覆盖 Thread._stop()，join() 时报错
+        self._lock = threading.Lock()
+        self._status = {
+            "state": "starting",   # starting / running / idle
+            "runs": 0,
+            "last_run": None,
+            "last_duration_ms": None,
+            "last_added": 0,
+            "total_added": 0,
+            "sources": {},         # 名称 -> {"fetched": n, "live": bool, "status": str, "elapsed_ms": float}
+            "error": None,
+        }
+        if lexical is not None:
+            atexit.register(self.save_lexical)
+
+    def status(self):
+        with self._lock:
+            return {**self._status, "sources": {k: dict(v) for k, v in self._status["sources"].items()}}
+
+    def _update(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+
+    def trigger(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def save_lexical(self, force=True):
+        """有未落盘的新增时保存倒排索引；force=False 时还要等满 lexical_save_interval"""
+        with self._lock:
+            due = force or time.monotonic() - self._lexical_saved_at >= self.lexical_save_interval
+            if self.lexical is None or not self._lexical_dirty or not due:
+                return False
+            self._lexical_dirty = False
+            self._lexical_saved_at = time.monotonic()
+        try:
+            self.lexical.save()
+        except Exception:
+            with self._lock:
+                self._lexical_dirty = True
+            raise
+        return True
+
+    def run_once(self):
+        started = time.perf_counter()
+        self._update(state="running")
+        items, sources, error = [], {}, None
+        for name, result in self.fetcher.fetch_all().items():
+            if result["error"]:
+                print(f"Source Error ({name}, {result['status']}): {result['error']}")
+            items.extend(result["items"])
+            sources[name] = {"fetched": len(result["items"]), "live": result["live"],
+                             "status": result["status"], "elapsed_ms": result["elapsed_ms"]}
+
+        added = 0
+        try:
+            if items:
+                added = ingest(self.collection, self.model, items,
+                               dedup_index=self.dedup_index, lexical=self.lexical)
+        except Exception as e:
+            error = f"ingest: {e}"
+            inc("ingest_errors_total")
+        if added:
+            with self._lock:
+                self._lexical_dirty = True
+        try:
+            self.save_lexical(force=False)
+        except Exception as e:
+            error = error or f"lexical save: {e}"
+            inc("ingest_errors_total")
+        observe("ingest_cycle_seconds", time.perf_counter() - started)
+
+        with self._lock:
+            self._status.update(
+                state="idle", runs=self._status["runs"] + 1, last_run=datetime.now(),
+                last_duration_ms=(time.perf_counter() - started) * 1000, last_added=added,
+                total_added=self._status["total_added"] + added, sources=sources, error=error,
+            )
+        if error:
+            print(f"Ingest Error: {error}")
+        return added
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                # 抓取阶段的意外异常不能让唯一的入库线程退出，记下来等下一轮
+                inc("ingest_errors_total")
+                self._update(state="idle", error=f"worker: {e}")
+                print(f"Ingest Worker Error: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+        self.save_lexical()
@@ -0,0 +1,117 @@
+import json
+import os
+from collections import deque
+from functools import lru_cache
+
+# ================= 🔤 多模式关键词引擎 =================
+# feeder 噪音过滤与 app 情绪标签共用一份词表 (keywords.json):
+#   {"类别": {"关键词": 权重, ...}, ...}
+# 词表编译成 Aho-Corasick 自动机，一遍扫描文本拿到所有类别的全部命中，
+# 单条文本的成本只和文本长度有关，与词表大小无关。
+# 不用 pyahocorasick: 它的节点按线性数组找子边，中文词表首字分叉上千，根节点反而成了瓶颈；
+# 这里每个节点是 dict，查边 O(1)。
+
+KEYWORDS_PATH = os.getenv("KEYWORDS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "keywords.json"))
+
+
+class Automaton:
+    """Aho-Corasick: trie + BFS 构建失配指针，输出沿失配链合并"""
+
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for word in words:
+            node = 0
+            for ch in word:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                node = nxt
+            self.out[node] = (word,)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for word in out[node]:
+                    yield i, word
+
+
+class KeywordEngine:
+    def __init__(self, keywords):
+        """keywords: {类别: {关键词: 权重}}；同一个词可以出现在多个类别里"""
+        self.categories = list(keywords)
+        self._entries = {}  # 关键词 -> ((类别, 权重), ...)
+        for category, terms in keywords.items():
+            for term, weight in terms.items():
+                if term:
+                    self._entries.setdefault(term, ())
+                    self._entries[term] += ((category, float(weight)),)
+        self._automaton = Automaton(self._entries)
+
+    @classmethod
+    def from_json(cls, path=KEYWORDS_PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def matches(self, text):
+        """所有命中 [(起始位置, 关键词)]，重叠命中都会返回"""
+        if not text or not self._entries:
+            return []
+        return [(end - len(term) + 1, term) for end, term in self._automaton.iter(text)]
+
+    def scan(self, text):
+        """一遍扫描，返回 {类别: {'score': 权重和 (每个词只计一次), 'terms': [命中词]}}"""
+        result = {c: {'score': 0.0, 'terms': []} for c in self.categories}
+        for term in dict.fromkeys(term for _, term in self.matches(text)):
+            for category, weight in self._entries[term]:
+                result[category]['score'] += weight
+                result[category]['terms'].append(term)
+        return result
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@lru_cache(maxsize=None)
+def get_engine(path=KEYWORDS_PATH):
+    """进程内按路径只编译一次"""
+    return KeywordEngine.from_json(path)
+
+
+def sentiment_label(hits, positive='positive', negative='negative', weighted=False):
+    """
+    情绪标签: 'POSITIVE' / 'NEGATIVE' / 'NEUTRAL'。
+    默认沿用旧规则: 命中任一正面词即 POSITIVE，否则命中负面词为 NEGATIVE。
+    weighted=True 时改为比较正负面权重和 (持平时正面优先)，如 "涨跌风险" 会标成 NEGATIVE。
+    """
+    pos, neg = hits[positive], hits[negative]
+    if not weighted:
+        if pos['terms']:
+            return 'POSITIVE'
+        return 'NEGATIVE' if neg['terms'] else 'NEUTRAL'
+    if pos['score'] and pos['score'] >= neg['score']:
+        return 'POSITIVE'
+    if neg['score']:
+        return 'NEGATIVE'
+    return 'NEUTRAL'
@@ -0,0 +1,308 @@
+import math
+import os
+import pickle
+import re
+import threading
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from embedding_cache import normalize_text
+from news_ingest import filtered_query
+from vector_store import VECTOR_DB_MODE, VECTOR_DB_PATH
+
+# ================= 🔎 中文 n-gram 倒排索引 (BM25) =================
+# MiniLM 偏英文，股票简称 ("容百科技")、代码 ("688005") 这类精确实体经常被向量检索漏掉。
+# 这里对中文连续片段切 2-gram + 3-gram，字母/数字整段作为一个词，建倒排表用 BM25 打分，
+# 与向量检索结果做 RRF (倒数排名融合)。
+# 倒排表是 token -> (文档序号 array, 词频 array)，文档序号单调递增，查询时零拷贝转 numpy。
+# 与持久化向量库放在同一目录，随集合一起热启动；内存模式下不落盘
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(VECTOR_DB_PATH, "lexical_index.pkl"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+HYBRID_CANDIDATES = 20  # 两路各取多少候选参与融合
+REBUILD_PAGE_SIZE = 5000
+# 删除/更新只打墓碑；墓碑占比超过该比例时重排文档序号、压缩倒排表
+COMPACT_DEAD_FRACTION = 0.2
+
+_CJK_RUN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]+")
+_WORD = re.compile(r"[a-z]+|\d+")
+
+
+def tokenize(text):
+    """中文片段 -> 2/3-gram (单字片段保留单字)；英文单词、数字串整体保留"""
+    text = normalize_text(text).lower()
+    tokens = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+            continue
+        tokens.extend(run[i: i + 2] for i in range(len(run) - 1))
+        tokens.extend(run[i: i + 3] for i in range(len(run) - 2))
+    return tokens
+
+
+class LexicalIndex:
+    def __init__(self, path=None):
+        self.path = path
+        self.ids = []            # 文档序号 -> 文档 ID (与向量库一致)
+        self.id_to_idx = {}
+        self.lengths = array('I')
+        self.total_length = 0
+        self.postings = {}       # token -> (array('I') 文档序号, array('H') 词频)
+        self.alive = bytearray()  # 文档序号 -> 是否有效 (删除/更新先打墓碑，超过 COMPACT_DEAD_FRACTION 再压缩)
+        self.removed = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path=None):
+        """从磁盘加载，文件不存在时返回空索引；不传 path 时按 VECTOR_DB_MODE 取默认位置"""
+        if path is None and VECTOR_DB_MODE != "memory":
+            path = LEXICAL_INDEX_PATH
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                index = pickle.load(f)
+            index.path = path
+            return index
+        return cls(path)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        del state['path']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # 兼容没有墓碑字段的旧索引文件
+        if 'alive' not in state:
+            self.alive = bytearray(b'\x01' * len(self.ids))
+            self.removed = 0
+        self._lock = threading.Lock()
+        self.path = None
+
+    def __len__(self):
+        return len(self.ids) - self.removed
+
+    def __contains__(self, doc_id):
+        return doc_id in self.id_to_idx
+
+    # ---------- 写入 ----------
+    def add(self, ids, documents):
+        """追加文档 (已存在的 ID 跳过)，返回新增条数"""
+        added = 0
+        with self._lock:
+            for doc_id, text in zip(ids, documents):
+                if doc_id in self.id_to_idx or not text:
+                    continue
+                idx = len(self.ids)
+                self.ids.append(doc_id)
+                self.id_to_idx[doc_id] = idx
+                self.alive.append(1)
+                tokens = tokenize(text)
+                self.lengths.append(len(tokens))
+                self.total_length += len(tokens)
+                for token, tf in Counter(tokens).items():
+                    posting = self.postings.get(token)
+                    if posting is None:
+                        posting = self.postings[token] = (array('I'), array('H'))
+                    posting[0].append(idx)
+                    posting[1].append(min(tf, 65535))
+                added += 1
+        return added
+
+    def remove(self, ids):
+        """删除文档 (打墓碑)，返回实际删除条数；内容有更新时先 remove 再 add"""
+        removed = 0
+        with self._lock:
+            for doc_id in ids:
+                idx = self.id_to_idx.pop(doc_id, None)
+                if idx is None:
+                    continue
+                self.alive[idx] = 0
+                self.total_length -= self.lengths[idx]
+                removed += 1
+            self.removed += removed
+            if self.removed > COMPACT_DEAD_FRACTION * len(self.ids):
+                self._compact()
+        return removed
+
+    def _compact(self):
+        """去掉墓碑: 存活文档按原顺序重新编号，倒排表只保留存活文档 (调用方持锁)"""
+        alive = np.frombuffer(self.alive, dtype=np.uint8).astype(bool)
+        remap = np.cumsum(alive, dtype=np.int64) - 1  # 旧序号 -> 新序号
+        postings = {}
+        for token, (docs, tfs) in self.postings.items():
+            docs = np.frombuffer(docs, dtype=np.uint32)
+            keep = alive[docs]
+            if keep.any():
+                postings[token] = (array('I', remap[docs[keep]].astype(np.uint32).tobytes()),
+                                   array('H', np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes()))
+        self.postings = postings
+        self.ids = [doc_id for doc_id, ok in zip(self.ids, alive) if ok]
+        self.id_to_idx = {doc_id: idx for idx, doc_id in enumerate(self.ids)}
+        self.lengths = array('I', np.frombuffer(self.lengths, dtype=np.uint32)[alive].tobytes())
+        self.alive = bytearray(b'\x01' * len(self.ids))
+        self.removed = 0
+
+    def sync(self, collection):
+        """
+        与向量库按 ID 集合对齐: 分页只取 ID，补入缺失文档、删除库里已没有的文档，
+        条数碰巧相等也不会漏掉其他进程 (backfill / news_sync) 的写入。返回变动条数。
+        """
+        stored, offset = set(), 0
+        while True:
+            page = collection.get(include=[], limit=REBUILD_PAGE_SIZE, offset=offset)
+            if not page['ids']:
+                break
+            stored.update(page['ids'])
+            offset += len(page['ids'])
+
+        with self._lock:
+            missing = [doc_id for doc_id in stored if doc_id not in self.id_to_idx]
+            gone = [doc_id for doc_id in self.id_to_idx if doc_id not in stored]
+        changed = self.remove(gone)
+        for i in range(0, len(missing), REBUILD_PAGE_SIZE):
+            page = collection.get(ids=missing[i: i + REBUILD_PAGE_SIZE], include=['documents'])
+            changed += self.add(page['ids'], page['documents'])
+        if changed:
+            self.save()
+        return changed
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with self._lock, open(tmp, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    # ---------- 查询 ----------
+    def _bm25(self, query, require_all=False):
+        """
+        只触碰查询词的倒排表，返回 (文档序号, BM25 分)；require_all 时只保留命中全部查询词的文档。
+        墓碑文档在这里就剔除，不参与打分，也不计入文档频率 (idf)。
+        """
+        empty = (np.empty(0, dtype=np.int64), np.empty(0))
+        tokens = list(dict.fromkeys(tokenize(query)))
+        n_docs = len(self)
+        if not tokens or not n_docs:
+            return empty
+        postings = [self.postings.get(t) for t in tokens]
+        if require_all and any(p is None for p in postings):
+            return empty
+        postings = [p for p in postings if p is not None]
+        if not postings:
+            return empty
+
+        # frombuffer 是零拷贝视图，持有期间 array 不能扩容，所以整个计算都在锁内
+        lengths = np.frombuffer(self.lengths, dtype=np.uint32)
+        alive = np.frombuffer(self.alive, dtype=np.uint8).astype(bool) if self.removed else None
+        avgdl = self.total_length / n_docs
+        doc_parts, score_parts = [], []
+        for docs, tfs in postings:
+            docs = np.frombuffer(docs, dtype=np.uint32)
+            tf = np.frombuffer(tfs, dtype=np.uint16).astype(np.float64)
+            if alive is not None:
+                keep = alive[docs]
+                docs, tf = docs[keep], tf[keep]
+            if not len(docs):
+                if require_all:
+                    return empty
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            doc_parts.append(docs.astype(np.int64))
+            score_parts.append(idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / avgdl)))
+        if not doc_parts:
+            return empty
+        docs, inverse, counts = np.unique(np.concatenate(doc_parts), return_inverse=True, return_counts=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        if require_all:
+            # 每个 token 的倒排表里同一文档只出现一次，命中次数 == 查询词数即全部命中
+            keep = counts == len(postings)
+            docs, scores = docs[keep], scores[keep]
+        return docs, scores
+
+    def _top(self, docs, scores, k, allowed=None):
+        if allowed is not None:
+            # 过滤条件下推: 只在满足 metadata 过滤的文档里排序
+            allowed_idx = np.fromiter((self.id_to_idx[i] for i in allowed if i in self.id_to_idx), dtype=np.int64)
+            keep = np.isin(docs, allowed_idx)
+            docs, scores = docs[keep], scores[keep]
+        top = np.argsort(-scores, kind='stable')[:k]
+        return [(self.ids[docs[i]], float(scores[i])) for i in top]
+
+    def search(self, query, k=10, allowed=None):
+        """BM25 Top-K: [(文档 ID, 分数)]；allowed 为可选的 ID 白名单"""
+        with self._lock:
+            return self._top(*self._bm25(query), k, allowed)
+
+    def exact_matches(self, query, k=10, allowed=None):
+        """所有查询词都命中的文档 (近似"原文包含查询串")，按 BM25 排序"""
+        with self._lock:
+            return self._top(*self._bm25(query, require_all=True), k, allowed)
+
+
+# ================= 🔀 混合检索 =================
+def rrf_fuse(rankings, k=RRF_K):
+    """倒数排名融合: rankings 是若干个按相关度排好序的 ID 列表，返回 [(ID, 融合分)] 降序"""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda x: -x[1])
+
+
+def is_entity_query(query):
+    """短查询 (股票代码 / 简称 / 英文名) 视为精确实体查询"""
+    query = normalize_text(query)
+    return bool(query) and " " not in query and (len(query) <= 6 or query.isascii())
+
+
+def hybrid_search(collection, lexical, query, n_results=3, embed=None, candidates=HYBRID_CANDIDATES, where=None):
+    """
+    向量 + BM25 融合检索，返回与 collection.query 相同结构的结果 (额外带 fusion_scores / sources)。
+    精确实体查询且倒排索引已命中足够条数时，直接返回，不做向量检索。
+    embed: query -> 向量 (list)，传 None 则只走倒排索引
+    where: chroma metadata 过滤条件，两路检索都只在满足条件的子集里进行
+    """
+    allowed = collection.get(where=where, include=[])['ids'] if where else None
+    exact = lexical.exact_matches(query, k=n_results, allowed=allowed) if is_entity_query(query) else []
+    if len(exact) >= n_results or embed is None:
+        ranked = [(doc_id, score) for doc_id, score in (exact or lexical.search(query, k=n_results, allowed=allowed))]
+        return _assemble(collection, ranked[:n_results], {}, {doc_id: "lexical" for doc_id, _ in ranked})
+
+    vector, _ = filtered_query(collection, embed(query), n_results=max(n_results, candidates),
+                               where=where, allowed=allowed)
+    vector_ids = vector['ids'][0]
+    lexical_ids = [doc_id for doc_id, _ in lexical.search(query, k=candidates, allowed=allowed)]
+    fused = rrf_fuse([vector_ids, lexical_ids])[:n_results]
+
+    vector_set, lexical_set = set(vector_ids), set(lexical_ids)
+    sources = {doc_id: "+".join(s for s, hit in (("vector", doc_id in vector_set),
+                                                   ("lexical", doc_id in lexical_set)) if hit)
+               for doc_id, _ in fused}
+    known = {doc_id: (doc, meta, dist) for doc_id, doc, meta, dist in zip(
+        vector_ids, vector['documents'][0], vector['metadatas'][0], vector['distances'][0])}
+    return _assemble(collection, fused, known, sources)
+
+
+def _assemble(collection, ranked, known, sources):
+    """按融合顺序拼结果；只在倒排索引里命中的文档用一次批量 get 取正文"""
+    missing = [doc_id for doc_id, _ in ranked if doc_id not in known]
+    if missing:
+        fetched = collection.get(ids=missing, include=['documents', 'metadatas'])
+        for doc_id, doc, meta in zip(fetched['ids'], fetched['documents'], fetched['metadatas']):
+            known[doc_id] = (doc, meta, None)
+    ranked = [(doc_id, score) for doc_id, score in ranked if doc_id in known]
+    return {
+        'ids': [[doc_id for doc_id, _ in ranked]],
+        'documents': [[known[doc_id][0] for doc_id, _ in ranked]],
+        'metadatas': [[known[doc_id][1] for doc_id, _ in ranked]],
+        'distances': [[known[doc_id][2] for doc_id, _ in ranked]],
+        'fusion_scores': [[score for _, score in ranked]],
+        'sources': [[sources.get(doc_id, "vector") for doc_id, _ in ranked]],
+    }
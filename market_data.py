@@ -1,34 +1,219 @@
-import akshare as ak
-import pandas as pd
+import glob
+import os
+import threading
+import time
 from datetime import datetime
 
-# ================= 🚀 独立行情服务 =================
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from news_store import write_part
+
+# ================= ⚙️ 配置区 =================
+QUOTE_TTL = 60  # 秒: 同一分钟内的调用共用一份行情，不重复请求东方财富
+QUOTE_FAILURE_TTL = 15  # 秒: 拉取失败后的退避期，期间直接返回上一份，不反复打挂掉的接口
+QUOTE_HISTORY_PATH = os.getenv(
+    "QUOTE_HISTORY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "quote_history"))
+NAME_COLUMN = "板块名称"
+CHANGE_COLUMN = "涨跌幅"
+
+HISTORY_SCHEMA = pa.schema([
+    ("ts", pa.timestamp("ms")),
+    ("board", pa.string()),
+    ("change", pa.float32()),
+])
+
+
+# ================= 🔌 上游数据源 =================
+def akshare_fetcher():
+    """东方财富行业板块实时行情 (接口文档: https://akshare.akfamily.xyz/data/stock/stock.html#id5)"""
+    import akshare as ak  # 延迟导入: 离线回放 / 测试时不需要 akshare
+    return ak.stock_board_industry_name_em()
+
+
+def frame_to_map(df):
+    """行情表 -> {板块名称: 涨跌幅}，整列转换，不逐行 iterrows"""
+    if df is None or df.empty:
+        return {}
+    change = pd.to_numeric(df[CHANGE_COLUMN], errors='coerce')
+    valid = df[NAME_COLUMN].notna() & change.notna()
+    return dict(zip(df.loc[valid, NAME_COLUMN].astype(str), change[valid].astype(float)))
+
+
+class RecordedFetcher:
+    """
+    离线回放录制好的行情快照 (CSV，列至少包含 板块名称 / 涨跌幅)，
+    每调用一次返回下一份，到末尾后停在最后一份。
+    """
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.calls = 0
+
+    @classmethod
+    def from_dir(cls, path):
+        files = sorted(glob.glob(os.path.join(path, "*.csv")))
+        return cls(pd.read_csv(f, encoding='utf-8-sig') for f in files)
+
+    @staticmethod
+    def record(path, fetcher=akshare_fetcher):
+        """拉一份真实行情存成回放用的 CSV，返回文件路径"""
+        os.makedirs(path, exist_ok=True)
+        target = os.path.join(path, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv")
+        fetcher().to_csv(target, index=False, encoding='utf-8-sig')
+        return target
+
+    def __call__(self):
+        frame = self.frames[min(self.calls, len(self.frames) - 1)]
+        self.calls += 1
+        return frame.copy()
+
+
+# ================= 🗄️ 板块行情时间序列 =================
+class QuoteHistory:
+    """
+    只追加的板块快照序列，按日期分区的 Parquet:
+      quote_history/date=2026-01-17/part-<纳秒时间戳>.parquet
+    """
+
+    def __init__(self, root=QUOTE_HISTORY_PATH):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def append(self, ts, quotes):
+        """写入一份快照 {板块: 涨跌幅}，返回写入行数"""
+        if not quotes:
+            return 0
+        ts = pd.Timestamp(ts).floor("ms")
+        table = pa.table({
+            "ts": pa.array([ts.to_pydatetime()] * len(quotes), pa.timestamp("ms")),
+            "board": pa.array(list(quotes), pa.string()),
+            "change": pa.array(list(quotes.values()), pa.float32()),
+        }, schema=HISTORY_SCHEMA)
+        write_part(os.path.join(self.root, f"date={ts.date().isoformat()}"), table)
+        return len(quotes)
+
+    def read(self, start=None, end=None, boards=None):
+        """按时间范围 (及板块) 查询，返回 ts / board / change 长表"""
+        start = pd.Timestamp(start).floor("ms") if start is not None else None
+        end = pd.Timestamp(end).floor("ms") if end is not None else None
+        files = []
+        for path in sorted(glob.glob(os.path.join(self.root, "date=*"))):
+            day = pd.Timestamp(os.path.basename(path)[5:])
+            if (start is not None and day < start.normalize()) or (end is not None and day > end.normalize()):
+                continue
+            files.extend(sorted(glob.glob(os.path.join(path, "part-*.parquet"))))
+        if not files:
+            return HISTORY_SCHEMA.empty_table().to_pandas()
+
+        predicate = None
+        for cond in (
+            ds.field("ts") >= pa.scalar(start.to_pydatetime(), pa.timestamp("ms")) if start is not None else None,
+            ds.field("ts") <= pa.scalar(end.to_pydatetime(), pa.timestamp("ms")) if end is not None else None,
+            ds.field("board").isin(list(boards)) if boards else None,
+        ):
+            if cond is not None:
+                predicate = cond if predicate is None else predicate & cond
+        table = ds.dataset(files, schema=HISTORY_SCHEMA, format="parquet").to_table(filter=predicate)
+        return table.to_pandas().sort_values(["ts", "board"], ignore_index=True)
+
+    def pivot(self, start=None, end=None, boards=None):
+        """宽表: 行是快照时间，列是板块，方便和新闻板块强度对齐比较"""
+        return self.read(start, end, boards).pivot_table(index="ts", columns="board", values="change")
+
+
+# ================= 🚀 行情服务 =================
+class SectorQuoteService:
+    """
+    板块行情服务:
+    - TTL 缓存: 有效期内直接返回上一份结果
+    - 请求合并: 缓存过期时并发调用者只有一个真正去拉，其余等它的结果
+    - 失败退避: 拉取失败后 failure_ttl 秒内不再请求，沿用上一份
+    - 每次成功拉取都追加进本地时间序列 (history=None 则不落盘)
+    """
+
+    def __init__(self, fetcher=akshare_fetcher, ttl=QUOTE_TTL, history=None, clock=time.time,
+                 failure_ttl=QUOTE_FAILURE_TTL):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.history = history
+        self.clock = clock
+        self.fetch_count = 0
+        self._quotes = {}
+        self._fetched_at = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+        self._inflight = None  # 正在进行的拉取: threading.Event
+
+    def _fresh(self):
+        now = self.clock()
+        if self._failed_at is not None and now - self._failed_at < self.failure_ttl:
+            return True
+        return self._fetched_at is not None and now - self._fetched_at < self.ttl
+
+    def get_quotes(self):
+        """返回 {板块名称: 涨跌幅} 的副本；拉取失败时沿用上一份 (没有则为空 dict)"""
+        with self._lock:
+            if self._fresh():
+                return dict(self._quotes)
+            event = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
+
+        if not leader:
+            event.wait()
+            with self._lock:
+                return dict(self._quotes)
+
+        try:
+            print(f"[{datetime.now().strftime('%H:%M')}] 正在拉取 Akshare 行情...")
+            quotes = frame_to_map(self.fetcher())
+            fetched_at = self.clock()
+            self.fetch_count += 1
+            print(f"✅ 行情获取成功: 覆盖 {len(quotes)} 个板块")
+            if self.history is not None:
+                try:
+                    self.history.append(datetime.fromtimestamp(fetched_at), quotes)
+                except Exception as e:
+                    print(f"⚠️ 行情快照写入失败: {e}")
+            with self._lock:
+                self._quotes, self._fetched_at, self._failed_at = quotes, fetched_at, None
+        except Exception as e:
+            print(f"❌ 行情获取失败: {e}")
+            with self._lock:
+                self._failed_at = self.clock()
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+        with self._lock:
+            return dict(self._quotes)
+
+
+_DEFAULT_SERVICE = None
+_DEFAULT_SERVICE_LOCK = threading.Lock()
+
+
+def get_quote_service():
+    global _DEFAULT_SERVICE
+    with _DEFAULT_SERVICE_LOCK:
+        if _DEFAULT_SERVICE is None:
+            _DEFAULT_SERVICE = SectorQuoteService(history=QuoteHistory())
+        return _DEFAULT_SERVICE
+
+
 def get_sector_performance():
     """
     获取 A 股行业板块实时涨跌幅
     返回: { '半导体': 2.5, '房地产': -1.2, ... }
     """
-    print(f"[{datetime.now().strftime('%H:%M')}] 正在拉取 Akshare 行情...")
-    try:
-        # 获取东方财富行业板块实时行情
-        # 接口文档: https://akshare.akfamily.xyz/data/stock/stock.html#id5
-        df = ak.stock_board_industry_name_em()
-        
-        # 清洗数据：只留 板块名称 和 涨跌幅
-        # 注意：不同版本的 akshare 列名可能不同，通常是 "板块名称", "涨跌幅"
-        market_map = {}
-        for _, row in df.iterrows():
-            name = row['板块名称']
-            change = row['涨跌幅']
-            market_map[name] = change
-            
-        print(f"✅ 行情获取成功: 覆盖 {len(market_map)} 个板块")
-        return market_map
-    except Exception as e:
-        print(f"❌ 行情获取失败: {e}")
-        return {}
+    return get_quote_service().get_quotes()
+
 
 if __name__ == "__main__":
     # 测试一下
     data = get_sector_performance()
-    print("半导体涨幅:", data.get('半导体', '未找到'))
\ No newline at end of file
+    print("半导体涨幅:", data.get('半导体', '未找到'))
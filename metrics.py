@@ -0,0 +1,243 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# ================= 📈 性能埋点 =================
+# 进程内的计数器 + 延迟直方图，feeder 与 app 共用:
+#   with timer("pipeline_stage_seconds", stage="fetch"): ...
+#   inc("llm_tokens_total", used, kind="used")
+# 直方图保留最近 METRICS_RESERVOIR 个样本算 p50/p95/p99 (反映当前负载，而不是启动以来的平均)，
+# count / sum 为累计值。导出方式 (环境变量开启，互不冲突):
+#   METRICS_PORT       > 0 时在该端口提供 /metrics (Prometheus 文本格式) 与 /metrics.json
+#   METRICS_JSONL_PATH 每 METRICS_JSONL_INTERVAL 秒追加一行快照
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH", "")
+METRICS_JSONL_INTERVAL = 60
+METRICS_PREFIX = "deepquant_"
+METRICS_RESERVOIR = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    def __init__(self, reservoir=METRICS_RESERVOIR):
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=reservoir)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def quantiles(self, qs=QUANTILES):
+        if not self.samples:
+            return {q: 0.0 for q in qs}
+        values = np.percentile(np.fromiter(self.samples, dtype=np.float64), [q * 100 for q in qs])
+        return dict(zip(qs, values.tolist()))
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self, reservoir=METRICS_RESERVOIR):
+        self.reservoir = reservoir
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(self.reservoir)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """记录 with 块耗时 (秒)，块内抛异常也照样计时"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name, **labels):
+        """函数装饰器版 timer"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._counters.items()]
+            histograms = [
+                {"name": n, "labels": dict(l), "count": h.count, "sum": h.sum,
+                 **{f"p{int(q * 100)}": v for q, v in h.quantiles().items()}}
+                for (n, l), h in self._histograms.items()
+            ]
+        return {"ts": time.time(), "counters": counters, "histograms": histograms}
+
+    def to_prometheus(self, prefix=METRICS_PREFIX):
+        """Prometheus 文本格式: 计数器为 counter，直方图按 summary 输出 (quantile + _sum + _count)"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, h.count, h.sum, h.quantiles()) for k, h in self._histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}{name} counter")
+                typed.add(name)
+            lines.append(f"{prefix}{name}{_label_text(labels)} {value}")
+        for (name, labels), count, total, quantiles in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}{name} summary")
+                typed.add(name)
+            for q, value in quantiles.items():
+                lines.append(f"{prefix}{name}{_label_text(labels, [('quantile', q)])} {value:.6g}")
+            lines.append(f"{prefix}{name}_sum{_label_text(labels)} {total:.6g}")
+            lines.append(f"{prefix}{name}_count{_label_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_jsonl(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.snapshot(), ensure_ascii=False) + "\n")
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+REGISTRY = MetricsRegistry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+
+
+# ---------- 导出 ----------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, content_type = self.registry.to_prometheus().encode(), "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body, content_type = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT, registry=REGISTRY):
+    """后台线程提供 /metrics，返回 (server, base_url)；port=0 时随机分配端口"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def start_jsonl_writer(path=METRICS_JSONL_PATH, interval=METRICS_JSONL_INTERVAL, registry=REGISTRY):
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                registry.write_jsonl(path)
+            except OSError as e:
+                print(f"⚠️ 指标写入失败: {e}")
+
+    threading.Thread(target=loop, name="metrics-jsonl", daemon=True).start()
+
+
+def start_exporters():
+    """按环境变量启动导出 (进程内调用一次)，返回已启动的说明列表"""
+    started = []
+    if METRICS_PORT:
+        _, url = start_metrics_server()
+        started.append(f"{url}/metrics")
+    if METRICS_JSONL_PATH:
+        start_jsonl_writer()
+        started.append(METRICS_JSONL_PATH)
+    return started
+
+
+# ---------- 单轮剖析 ----------
+@contextmanager
+def profiled(engine="cprofile", path=None, top=25):
+    """
+    剖析 with 块 (一轮流水线): engine = cprofile / pyinstrument。
+    cprofile 把原始数据写到 path (.prof，可用 snakeviz 查看) 并打印累计耗时前 top 项；
+    pyinstrument 未安装时退回 cProfile。
+    """
+    path = path or f"profile_{time.strftime('%Y%m%d_%H%M%S')}"
+    if engine == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("⚠️ 未安装 pyinstrument，改用 cProfile")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{path}.html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+                print(profiler.output_text(unicode=True, color=False))
+                print(f"🔬 剖析结果已写入 {path}.html")
+            return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{path}.prof")
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        print(out.getvalue())
+        print(f"🔬 剖析结果已写入 {path}.prof")
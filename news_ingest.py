@@ -0,0 +1,189 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from dedup_index import content_hash
+from metrics import inc, timer
+from vector_store import add_documents
+
+# ================= 📥 结构化情报入库 + 过滤下推 =================
+# feeder 的 LLM 打标字段 (score / sentiment / sector ...) 作为带类型的 metadata 写进向量库，
+# 查询时按板块 / 时间 / 分数 / 情绪先过滤、再在子集上做向量检索，而不是对 Top-K 事后筛选。
+# - 子集不大时直接取子集向量暴力算距离，耗时只与子集大小有关
+# - 子集很大时把 where 交给 chroma 的带过滤 HNSW 检索
+BRUTE_FORCE_LIMIT = int(os.getenv("FILTER_BRUTE_FORCE_LIMIT", "20000"))
+# app 启动/刷新时从情报库补入最近多少小时的结构化新闻
+INGEST_LOOKBACK_HOURS = int(os.getenv("INGEST_LOOKBACK_HOURS", "72"))
+
+# metadata 字段 -> 类型 (chroma 只接受 str/int/float/bool，缺失字段直接不写)
+METADATA_FIELDS = {
+    "score": int,
+    "sentiment": lambda v: round(float(v), 4),  # 存储里是 float32，去掉精度噪声
+    "summary": str,
+    "sector": str,
+    "sub_sector": str,
+    "type": str,
+    "impact_horizon": str,
+    "key_trigger": str,
+    "related_stocks": str,
+    "logic": str,
+}
+
+
+def _present(value):
+    return value is not None and not (isinstance(value, float) and np.isnan(value)) and value != ""
+
+
+def item_timestamp(item):
+    """条目的发布时间 (pd.Timestamp)；日期缺失或无法解析时返回 None"""
+    ts = pd.to_datetime(item.get("date"), errors="coerce")
+    return None if pd.isna(ts) else ts
+
+
+def to_metadata(item):
+    """一条新闻 (RSS 或 feeder 结构化结果) -> 带类型的 metadata；日期无效时抛 ValueError (调用方应先用 item_timestamp 筛掉)"""
+    ts = item_timestamp(item)
+    if ts is None:
+        raise ValueError(f"日期缺失或无法解析: {item.get('date')!r}")
+    meta = {
+        "date": ts.strftime("%Y-%m-%d %H:%M") if ts.hour or ts.minute else ts.strftime("%Y-%m-%d"),
+        "ts": int(ts.timestamp()),  # 时间过滤用数值比较
+        "link": item.get("link") or "",
+    }
+    if _present(item.get("id")):
+        meta["news_id"] = str(item["id"])
+    for field, cast in METADATA_FIELDS.items():
+        value = item.get(field)
+        if field == "related_stocks" and isinstance(value, (list, tuple)):
+            value = json.dumps(list(value), ensure_ascii=False)
+        if _present(value):
+            meta[field] = cast(value)
+    return meta
+
+
+def ingest(collection, model, items, dedup_index=None, lexical=None):
+    """
+    统一入库: 内容指纹作 ID，同批及已入库的内容跳过，只编码新增部分；日期无效的条目跳过并计数。
+    同步维护去重索引与倒排索引 (只改内存，倒排索引由调用方择机 save)，返回新增条数。
+    """
+    items_by_id = {}
+    for item in items:
+        if not item.get("content"):
+            continue
+        if item_timestamp(item) is None:
+            inc("ingest_skipped_total", reason="bad_date")
+            continue
+        items_by_id.setdefault(content_hash(item["content"]), item)
+
+    ids = list(items_by_id)
+    if dedup_index is not None:
+        ids = dedup_index.filter_new(ids)
+    if not ids:
+        return 0
+
+    documents = [items_by_id[doc_id]["content"] for doc_id in ids]
+    metadatas = [to_metadata(items_by_id[doc_id]) for doc_id in ids]
+    with timer("ingest_stage_seconds", stage="encode"):
+        embeddings = model.encode(documents).tolist()
+    with timer("ingest_stage_seconds", stage="write"):
+        add_documents(collection, ids, documents, embeddings, metadatas)
+
+    with timer("ingest_stage_seconds", stage="index"):
+        if dedup_index is not None:
+            dedup_index.add(ids)
+        if lexical is not None:
+            lexical.add(ids, documents)
+    inc("ingest_items_total", len(ids))
+    return len(ids)
+
+
+def store_items(store, hours=INGEST_LOOKBACK_HOURS, now=None):
+    """从 feeder 的分区情报库读出最近 hours 小时的结构化新闻 (list[dict])"""
+    if store.is_empty():
+        return []
+    start = pd.Timestamp(now or pd.Timestamp.now()) - pd.Timedelta(hours=hours)
+    df = store.read(start=start)
+    for col in df.select_dtypes("category").columns:
+        df[col] = df[col].astype(object)
+    return df.to_dict("records")
+
+
+# ================= 🔎 过滤条件 =================
+def build_where(sectors=None, sub_sectors=None, since=None, until=None, min_score=None, sentiment=None):
+    """
+    组装 chroma where 条件，未指定的维度不参与过滤。
+    sentiment: "positive" / "negative"，按 LLM 情绪分的正负号过滤。
+    """
+    clauses = []
+    if sectors:
+        clauses.append({"sector": {"$in": list(sectors)}})
+    if sub_sectors:
+        clauses.append({"sub_sector": {"$in": list(sub_sectors)}})
+    if since is not None:
+        clauses.append({"ts": {"$gte": int(pd.Timestamp(since).timestamp())}})
+    if until is not None:
+        clauses.append({"ts": {"$lte": int(pd.Timestamp(until).timestamp())}})
+    if min_score is not None:
+        clauses.append({"score": {"$gte": int(min_score)}})
+    if sentiment == "positive":
+        clauses.append({"sentiment": {"$gt": 0.0}})
+    elif sentiment == "negative":
+        clauses.append({"sentiment": {"$lt": 0.0}})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _distances(space, matrix, query):
+    """与 chroma 同口径的距离: l2 为平方欧氏距离，cosine / ip 为 1 - 相似度"""
+    if space == "cosine":
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        return 1.0 - matrix @ query / np.maximum(norms, 1e-12)
+    if space == "ip":
+        return 1.0 - matrix @ query
+    diff = matrix - query
+    return np.einsum("ij,ij->i", diff, diff)
+
+
+def filtered_query(collection, query_embedding, n_results=3, where=None, allowed=None,
+                   brute_force_limit=BRUTE_FORCE_LIMIT):
+    """
+    先过滤后检索，返回 (与 collection.query 同结构的结果, 满足过滤条件的 ID 列表或 None)。
+    过滤只走 metadata 索引 (只取 ID)；子集不超过 brute_force_limit 时在子集向量上直接算距离。
+    allowed: 调用方已按 where 取过的 ID 列表，传入后不再重复过滤
+    """
+    if not where:
+        return collection.query(query_embeddings=[query_embedding], n_results=n_results), None
+
+    if allowed is None:
+        allowed = collection.get(where=where, include=[])["ids"]
+    if not allowed:
+        return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}, allowed
+    if len(allowed) > brute_force_limit:
+        results = collection.query(query_embeddings=[query_embedding], n_results=min(n_results, len(allowed)),
+                                   where=where)
+        return results, allowed
+
+    subset = collection.get(ids=allowed, include=["embeddings"])
+    matrix = np.asarray(subset["embeddings"], dtype=np.float32)
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
+    dist = _distances(space, matrix, np.asarray(query_embedding, dtype=np.float32))
+
+    k = min(n_results, len(dist))
+    top = np.argpartition(dist, k - 1)[:k]
+    top = top[np.argsort(dist[top], kind="stable")]
+    top_ids = [subset["ids"][i] for i in top]
+
+    fetched = collection.get(ids=top_ids, include=["documents", "metadatas"])
+    rows = {doc_id: (doc, meta) for doc_id, doc, meta in
+            zip(fetched["ids"], fetched["documents"], fetched["metadatas"])}
+    results = {
+        "ids": [top_ids],
+        "documents": [[rows[doc_id][0] for doc_id in top_ids]],
+        "metadatas": [[rows[doc_id][1] for doc_id in top_ids]],
+        "distances": [[float(dist[i]) for i in top]],
+    }
+    return results, allowed
@@ -0,0 +1,235 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from dedup_index import content_hash
+from metrics import inc, observe
+
+# ================= 🔌 数据源适配器 =================
+# 各数据源 (财联社、RSS、本地情报库 ...) 实现 SourceAdapter.fetch(client)，登记到 ADAPTERS:
+# - SourceFetcher 并发跑所有适配器，一轮总耗时取决于最慢的源而不是各源之和
+# - 所有 HTTP 请求共用一个 HttpClient: 连接池 + keep-alive，不再每轮新建连接
+# - 支持条件请求的源自动带 If-None-Match / If-Modified-Since，304 时不下载也不解析
+# - 每个源单独的超时与熔断: 连续失败 BREAKER_FAILURES 次后暂停 BREAKER_RESET 秒，期间直接用 fallback
+# 适配器统一输出 {id, date, content, link?, source} 条目，下游 (feeder / news_ingest) 不关心来源
+HTTP_POOL_SIZE = 16
+SOURCE_TIMEOUT = 10      # 秒，单个源的默认超时
+BREAKER_FAILURES = 3
+BREAKER_RESET = 120      # 秒，熔断后多久放一个试探请求
+BROWSER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                 "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+
+class HttpClient:
+    """线程安全的共享 HTTP 客户端: 连接池 + 条件请求校验值缓存 (按 URL 记 ETag / Last-Modified)"""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, user_agent=BROWSER_AGENT):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = user_agent
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, timeout=SOURCE_TIMEOUT, conditional=False):
+        """conditional=True 时带上次的校验值，返回 None 表示 304 未修改；非 2xx 抛异常"""
+        headers = dict(headers or {})
+        if conditional:
+            with self._lock:
+                etag, last_modified = self._validators.get(url, (None, None))
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        resp = self.session.get(url, params=params, headers=headers, timeout=timeout)
+        if conditional and resp.status_code == 304:
+            return None
+        resp.raise_for_status()
+        if conditional:
+            validators = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+            if any(validators):
+                with self._lock:
+                    self._validators[url] = validators
+        return resp
+
+
+class CircuitBreaker:
+    """closed -> (连续失败 failures 次) open -> (reset 秒后) half_open 放一次试探 -> 成功 closed / 失败 open"""
+
+    def __init__(self, failures=BREAKER_FAILURES, reset=BREAKER_RESET):
+        self.failures = failures
+        self.reset = reset
+        self.consecutive = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset else "open"
+
+    def allow(self):
+        with self._lock:
+            if self.state == "half_open":
+                self.opened_at = time.monotonic()  # 试探期间其他调用仍视为 open
+                return True
+            return self.opened_at is None
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.consecutive, self.opened_at = 0, None
+            else:
+                self.consecutive += 1
+                if self.consecutive >= self.failures:
+                    self.opened_at = time.monotonic()
+
+
+class SourceAdapter:
+    """
+    数据源适配器基类。子类实现 fetch(client)，返回条目列表；返回 None 表示源未更新 (304)。
+    抓取失败直接抛异常，由 SourceFetcher 计入熔断并改用 fallback。
+    """
+    timeout = SOURCE_TIMEOUT
+    conditional = False  # 源是否支持 ETag / Last-Modified
+    fallback = ()        # 抓取失败或熔断时使用的条目 (如 Mock 数据)
+
+    def fetch(self, client):
+        raise NotImplementedError
+
+
+ADAPTERS = {}
+
+
+def register_adapter(name):
+    """类装饰器: 按名称登记适配器，配置里用名称选源"""
+    def decorator(cls):
+        ADAPTERS[name] = cls
+        return cls
+    return decorator
+
+
+@register_adapter("rss")
+class RssAdapter(SourceAdapter):
+    conditional = True
+
+    def __init__(self, url, label=None, limit=10, timeout=SOURCE_TIMEOUT, fallback=()):
+        self.url = url
+        self.label = label
+        self.limit = limit
+        self.timeout = timeout
+        self.fallback = list(fallback)
+
+    def fetch(self, client):
+        import feedparser
+
+        resp = client.get(self.url, timeout=self.timeout, conditional=self.conditional)
+        if resp is None:
+            return None
+        feed = feedparser.parse(resp.content)
+        if not feed.entries:
+            raise ValueError("源返回为空 (可能是格式解析问题或反爬)")
+
+        items = []
+        for entry in feed.entries[:self.limit]:
+            dt = entry.get('published_parsed')
+            pub_date = f"{dt.tm_year}-{dt.tm_mon:02d}-{dt.tm_mday:02d}" if dt else datetime.now().strftime('%Y-%m-%d')
+            # 有的 RSS summary 是空的，退回标题
+            text = entry.get('summary') or entry.get('title', '')
+            title = entry.get('title', '')
+            content = f"【{self.label}】{title} - {text[:60]}..." if self.label else f"{title} - {text[:60]}..."
+            items.append({
+                "id": content_hash(content),
+                "date": pub_date,
+                "content": content,
+                "link": entry.get('link'),
+            })
+        return items
+
+
+@register_adapter("callable")
+class CallableAdapter(SourceAdapter):
+    """包装不走 HTTP 的本地源 (如分区情报库)：fn() -> 条目列表"""
+
+    def __init__(self, fn, timeout=SOURCE_TIMEOUT):
+        self.fn = fn
+        self.timeout = timeout
+
+    def fetch(self, client):
+        return self.fn()
+
+
+class SourceFetcher:
+    """
+    fetch_all() 并发抓取所有源，返回 {名称: 结果}，结果字段:
+      items / live (是否来自真实数据源) / status (ok / not_modified / error / timeout / open / busy) /
+      elapsed_ms / error
+    上一轮超时的请求还没结束时不重复提交，本轮直接记 busy (用 fallback，不计入熔断)；
+    所以每个源同时最多占一个线程，线程池按源数开就够。
+    """
+
+    def __init__(self, adapters, client=None, breakers=None):
+        self.adapters = dict(adapters)
+        self.client = client or HttpClient()
+        self.breakers = breakers or {name: CircuitBreaker() for name in self.adapters}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.adapters)), thread_name_prefix="source")
+        self._pending = {}  # 名称 -> 上一轮超时、仍在后台跑的 future
+
+    def _run(self, name, adapter):
+        started = time.perf_counter()
+        try:
+            items = adapter.fetch(self.client)
+        except Exception as e:
+            return {"status": "error", "error": str(e), "elapsed_ms": (time.perf_counter() - started) * 1000}
+        status = "not_modified" if items is None else "ok"
+        items = [dict(item, source=item.get("source", name)) for item in items or []]
+        return {"status": status, "items": items, "error": None,
+                "elapsed_ms": (time.perf_counter() - started) * 1000}
+
+    def _fallback(self, name, status, error=None, elapsed_ms=None):
+        adapter = self.adapters[name]
+        return {"items": [dict(item, source=name) for item in adapter.fallback], "live": False,
+                "status": status, "error": error, "elapsed_ms": elapsed_ms}
+
+    def fetch_all(self):
+        results, futures = {}, {}
+        for name, adapter in self.adapters.items():
+            pending = self._pending.get(name)
+            if pending is not None and not pending.done():
+                results[name] = self._fallback(name, "busy", "上一轮请求仍未结束")
+                continue
+            self._pending.pop(name, None)
+            if self.breakers[name].allow():
+                futures[self._pool.submit(self._run, name, adapter)] = name
+            else:
+                results[name] = self._fallback(name, "open", "熔断中")
+
+        # 整轮最多等最慢那个源的超时；超时的请求留在后台线程里自行结束
+        deadline = max((self.adapters[n].timeout for n in futures.values()), default=0)
+        done, _ = wait(futures, timeout=deadline + 1)
+        for future, name in futures.items():
+            if future not in done:
+                self._pending[name] = future
+                self.breakers[name].record(False)
+                results[name] = self._fallback(name, "timeout", f"超过 {self.adapters[name].timeout}s")
+                continue
+            result = future.result()
+            self.breakers[name].record(result["status"] != "error")
+            if result["status"] == "error":
+                results[name] = self._fallback(name, "error", result["error"], result["elapsed_ms"])
+            else:
+                results[name] = dict(result, live=True)
+        for name, result in results.items():
+            inc("source_fetch_total", source=name, status=result["status"])
+            if result["elapsed_ms"] is not None:
+                observe("source_fetch_seconds", result["elapsed_ms"] / 1000, source=name)
+        return results
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,216 @@
+import os
+import json
+import glob
+import time
+import uuid
+from datetime import datetime, date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# ================= 🗄️ 新闻情报列式存储 =================
+# 按日期分区的 Parquet 目录，替代不断追加的 news_data.csv:
+#   news_store/date=2026-01-17/part-<纳秒时间戳>-<随机>.parquet
+# - 写入: 每轮只新增一个小文件，不重写历史
+# - 读取: 按日期范围只打开相关分区 + 列裁剪，内参窗口 (24~72h) 只读最近几个分区
+NEWS_STORE_PATH = os.getenv("NEWS_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_store"))
+
+# 固定 schema: 所有分区文件类型一致，跨文件读取不会因为某列全空而类型漂移
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("date", pa.timestamp("ms")),
+    ("content", pa.string()),
+    ("score", pa.int16()),
+    ("sentiment", pa.float32()),
+    ("summary", pa.string()),
+    ("sector", pa.string()),
+    ("sub_sector", pa.string()),
+    ("type", pa.string()),
+    ("impact_horizon", pa.string()),
+    ("key_trigger", pa.string()),
+    ("related_stocks", pa.string()),
+    ("logic", pa.string()),
+])
+COLUMNS = SCHEMA.names
+# 低基数列读出后转 category，内存占用只有 object 的零头
+CATEGORICAL_COLUMNS = ["sector", "sub_sector", "type", "impact_horizon", "key_trigger"]
+
+
+def normalize_frame(df):
+    """把 LLM 结果 / 旧 CSV 统一成固定 schema 的 DataFrame"""
+    df = df.copy()
+    for col in COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df = df[COLUMNS]
+
+    df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.floor('ms')  # 存储精度为毫秒
+    df = df.dropna(subset=['date', 'content'])
+    df['score'] = pd.to_numeric(df['score'], errors='coerce').fillna(0).clip(-32768, 32767).astype('int16')
+    df['sentiment'] = pd.to_numeric(df['sentiment'], errors='coerce').fillna(0).astype('float32')
+    # related_stocks 在 LLM 结果里是 list，统一存成 JSON 文本
+    df['related_stocks'] = df['related_stocks'].map(
+        lambda v: json.dumps(v, ensure_ascii=False) if isinstance(v, (list, tuple)) else v)
+    for col in ["id", "content", "summary", "logic", "related_stocks"] + CATEGORICAL_COLUMNS:
+        df[col] = df[col].map(lambda v: None if v is None or (isinstance(v, float) and pd.isna(v)) else str(v))
+    return df
+
+
+def _to_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _ms_scalar(value):
+    """存储精度是毫秒，比较值先截到毫秒，否则 pyarrow 会拒绝有损转换"""
+    return pa.scalar(pd.Timestamp(value).floor("ms").to_pydatetime(), pa.timestamp("ms"))
+
+
+def write_part(part_dir, table):
+    """把一张表写成分区目录下的一个新 part 文件，返回文件路径"""
+    os.makedirs(part_dir, exist_ok=True)
+    name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:6]}.parquet"
+    # 先写临时文件再改名，读者永远看不到写了一半的文件
+    tmp = os.path.join(part_dir, f".{name}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    path = os.path.join(part_dir, name)
+    os.replace(tmp, path)
+    return path
+
+
+class NewsStore:
+    def __init__(self, root=NEWS_STORE_PATH):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    # ---------- 写入 ----------
+    def append(self, df):
+        """追加一批情报，按日期拆到各自分区；返回写入行数"""
+        df = normalize_frame(df)
+        if df.empty:
+            return 0
+        for day, part in df.groupby(df['date'].dt.date):
+            table = pa.Table.from_pandas(part, schema=SCHEMA, preserve_index=False)
+            write_part(os.path.join(self.root, f"date={day.isoformat()}"), table)
+        return len(df)
+
+    # ---------- 分区 ----------
+    def partitions(self, start=None, end=None):
+        """[(日期, 目录)]，只看目录名过滤，不打开任何文件"""
+        start_day, end_day = _to_date(start), _to_date(end)
+        result = []
+        for path in glob.glob(os.path.join(self.root, "date=*")):
+            try:
+                day = date.fromisoformat(os.path.basename(path)[5:])
+            except ValueError:
+                continue
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            result.append((day, path))
+        return sorted(result)
+
+    def files(self, start=None, end=None):
+        return [f for _, path in self.partitions(start, end)
+                for f in sorted(glob.glob(os.path.join(path, "part-*.parquet")))]
+
+    # ---------- 读取 ----------
+    def read(self, start=None, end=None, columns=None):
+        """
+        读取 [start, end] 时间范围内的情报。
+        分区级裁剪 (目录名) + 行级谓词下推 (date 列) + 列裁剪。
+        """
+        columns = list(columns) if columns else COLUMNS
+        files = self.files(start, end)
+        if not files:
+            return self._empty(columns)
+
+        predicate = None
+        if start is not None:
+            predicate = ds.field("date") >= _ms_scalar(start)
+        if end is not None:
+            cond = ds.field("date") <= _ms_scalar(end)
+            predicate = cond if predicate is None else predicate & cond
+
+        table = ds.dataset(files, schema=SCHEMA, format="parquet").to_table(columns=columns, filter=predicate)
+        df = table.to_pandas()[columns]
+        return self._apply_dtypes(df)
+
+    def iter_partitions(self, start=None, end=None, columns=None):
+        """逐个分区读取 (日期, DataFrame)，内存只与单日数据量有关"""
+        for day, _ in self.partitions(start, end):
+            yield day, self.read(start=day, end=datetime.combine(day, datetime.max.time()), columns=columns)
+
+    def count(self, start=None, end=None):
+        """总行数，只读 Parquet footer，不读数据"""
+        return sum(pq.ParquetFile(f).metadata.num_rows for f in self.files(start, end))
+
+    @staticmethod
+    def _apply_dtypes(df):
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        return df
+
+    def _empty(self, columns):
+        return self._apply_dtypes(SCHEMA.empty_table().to_pandas()[columns])
+
+    # ---------- 维护 ----------
+    def compact(self, keep_today=True):
+        """把每个分区的小文件合并成一个 (默认跳过当天仍在写入的分区)"""
+        today = datetime.now().date()
+        merged = 0
+        for day, path in self.partitions():
+            if keep_today and day >= today:
+                continue
+            files = sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+            if len(files) <= 1:
+                continue
+            table = ds.dataset(files, schema=SCHEMA, format="parquet").to_table().sort_by("date")
+            write_part(path, table)
+            for f in files:
+                os.remove(f)
+            merged += 1
+        return merged
+
+    def is_empty(self):
+        return not self.files()
+
+
+def migrate_csv(csv_path, store, chunksize=100_000):
+    """一次性把旧的 news_data.csv 迁移进分区存储，返回迁移行数"""
+    total = 0
+    for chunk in pd.read_csv(csv_path, encoding='utf-8-sig', chunksize=chunksize, dtype=str):
+        total += store.append(chunk)
+    store.compact(keep_today=False)
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="新闻情报分区存储工具")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_migrate = sub.add_parser("migrate", help="把旧的 CSV 迁移到分区存储")
+    p_migrate.add_argument("csv_path")
+    sub.add_parser("compact", help="合并历史分区里的小文件")
+    sub.add_parser("stats", help="查看分区与行数")
+    parser.add_argument("--root", default=NEWS_STORE_PATH)
+    args = parser.parse_args()
+
+    news_store = NewsStore(args.root)
+    if args.cmd == "migrate":
+        print(f"✅ 迁移完成: {migrate_csv(args.csv_path, news_store)} 行 -> {args.root}")
+    elif args.cmd == "compact":
+        print(f"✅ 合并分区: {news_store.compact()} 个")
+    else:
+        parts = news_store.partitions()
+        print(f"📦 {len(parts)} 个分区，共 {news_store.count()} 行")
+        for day, path in parts[-10:]:
+            print(f"   {day}: {news_store.count(day, day)} 行")
@@ -0,0 +1,201 @@
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+
+from dedup_index import content_hash
+from news_ingest import to_metadata
+from vector_store import upsert_documents, delete_documents, VECTOR_DB_PATH
+
+# ================= 🔁 CSV -> 向量库增量同步 =================
+# 以 CSV 的 id 为主键、内容指纹 (metadata.hash) 判断是否变化:
+# - 新增 / 内容变化的行 upsert (只编码这些行)，CSV 里消失的行从集合删除
+# - 记录高水位 (已同步到的字节偏移 + 行数 + 最后一条 id/date)，
+#   文件只追加时只解析偏移之后的尾部，不再扫全量
+# - 文件变短，或开头 / 高水位前各 FINGERPRINT_BYTES 字节的摘要对不上时，自动退回全量比对
+#   (只抽查这两段: 中间部分被等长改写检测不到，这种情况需要 full=True 手动全量同步)
+SYNC_CHUNK_ROWS = 20_000
+FINGERPRINT_BYTES = 4096
+PAGE_SIZE = 5000
+
+
+def default_state_path(collection):
+    return os.path.join(VECTOR_DB_PATH, f"sync_{collection.name}.json")
+
+
+def _fingerprint(path, offset):
+    """文件开头 + 高水位之前各 FINGERPRINT_BYTES 字节的摘要"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    return digest.hexdigest()
+
+
+def _load_state(path):
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def _save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _is_appended(path, state):
+    """上次同步之后文件只在末尾追加过"""
+    if not state or state.get("source") != os.path.abspath(path):
+        return False
+    offset = state["offset"]
+    return os.path.getsize(path) >= offset and _fingerprint(path, offset) == state["fingerprint"]
+
+
+def _complete_length(data):
+    """只处理到最后一个换行符为止，写了一半的末行留给下次同步"""
+    end = data.rfind(b"\n")
+    return end + 1 if end >= 0 else 0
+
+
+def _synced_offset(path, window=1 << 16):
+    """全量同步后的高水位: 文件末尾最后一个换行符之后的位置 (只读末尾一小段)"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(max(0, size - window))
+        data = f.read()
+    return size - len(data) + _complete_length(data)
+
+
+def _read_tail(path, offset):
+    """从字节偏移处读出新追加的完整行 (列名取文件首行)，返回 (DataFrame, 新偏移)"""
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(offset)
+        data = f.read()
+    data = data[:_complete_length(data)]
+    if not data.strip():
+        return pd.DataFrame(columns=pd.read_csv(io.BytesIO(header), encoding="utf-8-sig").columns), offset
+    df = pd.read_csv(io.BytesIO(header + data), encoding="utf-8-sig", dtype=str)
+    return df, offset + len(data)
+
+
+def _existing_hashes(collection, ids=None):
+    """集合里 id -> 内容指纹；不传 ids 时分页拉全量 (只取 metadata)"""
+    if ids is not None:
+        if not ids:
+            return {}
+        page = collection.get(ids=list(ids), include=["metadatas"])
+        return {i: (m or {}).get("hash") for i, m in zip(page["ids"], page["metadatas"])}
+    hashes, offset = {}, 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            return hashes
+        hashes.update((i, (m or {}).get("hash")) for i, m in zip(page["ids"], page["metadatas"]))
+        offset += len(page["ids"])
+
+
+def _rows(df):
+    """DataFrame -> {id: 行}，同一 id 出现多次时以最后一次为准；缺 id / 内容或日期无法解析的行跳过"""
+    df = df.dropna(subset=["id", "content"])
+    df = df[pd.to_datetime(df["date"], errors="coerce", format="mixed").notna()] if "date" in df else df.iloc[0:0]
+    return {str(row["id"]): row for row in df.to_dict("records")}
+
+
+def _text(value):
+    """CSV 单元格 -> 字符串；空单元格 (NaN) 记为空串，不会写成字面量 nan"""
+    return "" if value is None or pd.isna(value) else str(value)
+
+
+def _metadata(row, digest):
+    meta = to_metadata(row)
+    meta["title"] = _text(row.get("title")) or _text(row.get("summary"))
+    meta["hash"] = digest
+    return meta
+
+
+def _apply(collection, model, rows, existing, lexical, stats):
+    """只对 rows 中新增或内容变化的部分编码并 upsert，结果计入 stats；写入后同步更新 existing"""
+    changed = []
+    for doc_id, row in rows.items():
+        digest = content_hash(row["content"])
+        old = existing.get(doc_id)
+        if old == digest:
+            continue
+        stats["updated" if old is not None else "added"] += 1
+        changed.append((doc_id, row, digest))
+    if not changed:
+        return
+    ids = [doc_id for doc_id, _, _ in changed]
+    documents = [row["content"] for _, row, _ in changed]
+    metadatas = [_metadata(row, digest) for _, row, digest in changed]
+    embeddings = model.encode(documents).tolist()
+    upsert_documents(collection, ids, documents, embeddings, metadatas)
+    stats["encoded"] += len(ids)
+    # 全量模式跨块共用 existing: 后面的块再出现同一 id + 同一内容时直接跳过，不重复编码
+    existing.update((doc_id, digest) for doc_id, _, digest in changed)
+    if lexical is not None:
+        lexical.remove(ids)
+        lexical.add(ids, documents)
+
+
+def sync_csv(collection, path, model, lexical=None, state_path=None, full=False, chunk_rows=SYNC_CHUNK_ROWS):
+    """
+    把 CSV 增量同步进集合，返回统计 {mode, scanned, added, updated, deleted, encoded}。
+    full=True 时忽略高水位做全量比对 (含删除)。
+    """
+    state_path = state_path or default_state_path(collection)
+    state = _load_state(state_path)
+    stats = {"mode": "tail", "scanned": 0, "added": 0, "updated": 0, "deleted": 0, "encoded": 0}
+    last = {}
+
+    if not full and _is_appended(path, state) and state.get("collection") == collection.name:
+        df, offset = _read_tail(path, state["offset"])
+        rows = _rows(df)
+        stats["scanned"] = len(df)
+        _apply(collection, model, rows, _existing_hashes(collection, rows), lexical, stats)
+        total_rows = state["rows"] + len(df)
+        last = {"last_id": state.get("last_id"), "last_date": state.get("last_date")}
+    else:
+        stats["mode"] = "full"
+        offset = _synced_offset(path)
+        existing = _existing_hashes(collection)
+        seen = set()
+        total_rows, df = 0, None
+        reader = pd.read_csv(path, encoding="utf-8-sig", dtype=str, chunksize=chunk_rows)
+        for chunk in reader:
+            rows = _rows(chunk)
+            seen.update(rows)
+            total_rows += len(chunk)
+            _apply(collection, model, rows, existing, lexical, stats)
+            df = chunk
+        stats["scanned"] = total_rows
+        gone = [doc_id for doc_id in existing if doc_id not in seen]
+        if gone:
+            delete_documents(collection, gone)
+            if lexical is not None:
+                lexical.remove(gone)
+            stats["deleted"] = len(gone)
+
+    if df is not None and len(df):
+        tail = df.iloc[-1]
+        last = {"last_id": str(tail.get("id")), "last_date": str(tail.get("date"))}
+    if lexical is not None and (stats["encoded"] or stats["deleted"]):
+        lexical.save()
+
+    _save_state(state_path, {
+        "source": os.path.abspath(path),
+        "collection": collection.name,
+        "offset": offset,
+        "fingerprint": _fingerprint(path, offset),
+        "rows": total_rows,
+        **last,
+    })
+    return stats
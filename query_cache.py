@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from embedding_cache import normalize_text
+from lexical_index import hybrid_search
+from metrics import observe, timer
+from news_ingest import filtered_query
+from vector_store import collection_generation, local_generation
+
+# ================= ⚡ 查询缓存 =================
+# 1. 查询向量 LRU: 同一句查询只编码一次
+# 2. Top-K 结果缓存: 以集合代际 (generation) 为版本，某个集合有新文档入库时只作废该集合的结果
+#    代际里的跨进程部分 (stat 标记文件 + count) 每个集合最多每 GENERATION_CHECK_INTERVAL 秒查一次，
+#    本进程自己的写入立即可见
+# 传入 lexical (倒排索引) 时走向量 + BM25 混合检索，实体查询可能完全不触发编码
+# 传入 where (metadata 过滤) 时先过滤后检索，过滤条件也是缓存键的一部分
+QUERY_CACHE_SIZE = 256
+RESULT_CACHE_SIZE = 1024
+GENERATION_CHECK_INTERVAL = 1.0  # 秒
+
+
+class QueryCache:
+    def __init__(self, model, max_queries=QUERY_CACHE_SIZE, max_results=RESULT_CACHE_SIZE,
+                 check_interval=GENERATION_CHECK_INTERVAL):
+        self.model = model
+        self.max_queries = max_queries
+        self.max_results = max_results
+        self.check_interval = check_interval
+        self._vectors = OrderedDict()
+        self._results = OrderedDict()
+        self._generations = {}  # collection.id -> (代际, 本进程计数, 检查时刻)
+        # Streamlit 多会话共用同一实例 (cache_resource)，需要加锁
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _lru_get(cache, key):
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _lru_put(cache, key, value, limit):
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > limit:
+            cache.popitem(last=False)
+
+    def embed(self, query):
+        """查询向量 (list)，可直接传给 collection.query(query_embeddings=[...])"""
+        key = normalize_text(query)
+        with self._lock:
+            vec = self._lru_get(self._vectors, key)
+        if vec is None:
+            with timer("query_stage_seconds", stage="embed"):
+                vec = self.model.encode([key])[0].tolist()
+            with self._lock:
+                self._lru_put(self._vectors, key, vec, self.max_queries)
+        return vec
+
+    def _generation(self, collection):
+        """集合当前代际；距上次检查不足 check_interval 且本进程没写过时沿用上次的结果"""
+        cid, local, now = collection.id, local_generation(collection), time.monotonic()
+        with self._lock:
+            cached = self._generations.get(cid)
+        if cached is not None and cached[1] == local and now - cached[2] < self.check_interval:
+            return cached[0]
+        generation = collection_generation(collection)
+        with self._lock:
+            previous = self._generations.get(cid)
+            if previous is not None and previous[0] != generation:
+                # 该集合有新写入，只作废它自己的 Top-K
+                for stale in [k for k in self._results if k[0] == cid]:
+                    del self._results[stale]
+            self._generations[cid] = (generation, local, now)
+        return generation
+
+    def search(self, collection, query, n_results=3, lexical=None, where=None):
+        """返回 (结果, 是否命中结果缓存)；命中标记随返回值走，多会话并发时互不串"""
+        started = time.perf_counter()
+        generation = self._generation(collection)
+        key = (collection.id, normalize_text(query), n_results, lexical is not None,
+               json.dumps(where, sort_keys=True, ensure_ascii=False))
+
+        with self._lock:
+            results = self._lru_get(self._results, key)
+
+            if results is not None:
+                self.hits += 1
+
+        if results is not None:
+            observe("query_seconds", time.perf_counter() - started, cache="hit")
+            return results, True
+
+        if lexical is not None:
+            results = hybrid_search(collection, lexical, query, n_results=n_results, embed=self.embed, where=where)
+        else:
+            vec = self.embed(query)
+            with timer("query_stage_seconds", stage="vector_query"):
+                results, _ = filtered_query(collection, vec, n_results=n_results, where=where)
+        with self._lock:
+            if self._generations.get(collection.id, (None,))[0] == generation:
+                self._lru_put(self._results, key, results, self.max_results)
+            self.misses += 1
+        observe("query_seconds", time.perf_counter() - started, cache="miss", mode="hybrid" if lexical else "vector")
+        return results, False
@@ -1,59 +1,58 @@
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-import chromadb
+import os
+import sys
+from embedding_cache import EmbeddingCache
+from embedding_service import get_encoder
+from lexical_index import LexicalIndex, hybrid_search
+from news_sync import sync_csv
+from vector_store import get_collection, VECTOR_DB_MODE, VECTOR_DB_PATH
 
 # ========== 配置 ==========
 CSV_PATH = "news_data.csv"
-EMBED_MODEL = "all-MiniLM-L6-v2"   # 轻量模型，Docker里跑得动
 TOP_K = 3
+COLLECTION = "news_rag"
+LEXICAL_PATH = os.path.join(VECTOR_DB_PATH, f"{COLLECTION}_lexical.pkl") if VECTOR_DB_MODE != "memory" else None
 
-# ========== 1. 读取CSV ==========
-df = pd.read_csv(CSV_PATH)
-
-documents = df["content"].tolist()
-metadatas = [{"title": t} for t in df["title"].tolist()]
-ids = [str(i) for i in df["id"].tolist()]
-
-# ========== 2. 加载Embedding模型 ==========
+# ========== 1. 加载Embedding模型 ==========
 print(">> Loading embedding model...")
-model = SentenceTransformer(EMBED_MODEL)
-
-embeddings = model.encode(documents).tolist()
+# 本地 ./local_model (all-MiniLM-L6-v2，轻量，Docker里跑得动)；设置 EMBED_SERVICE_URL 时复用共享 embedding 服务
+# 带磁盘缓存：重复运行时已编码过的新闻直接命中，不再走模型
+encoder, model_id = get_encoder()
+model = EmbeddingCache(encoder, model_id=model_id)
 
-# ========== 3. 初始化 ChromaDB ==========
+# ========== 2. 打开 ChromaDB (持久化，集合跨次运行保留) ==========
 print(">> Initializing ChromaDB...")
-client = chromadb.Client()
-collection = client.get_or_create_collection("news_rag")
+collection = get_collection(COLLECTION)
 
-# 防止重复插入
-collection.delete(where={})
+# 倒排索引 (中文 n-gram + BM25)，与集合一起落盘；索引文件缺失时从集合补齐
+lexical = LexicalIndex.open(LEXICAL_PATH)
+lexical.sync(collection)
 
-collection.add(
-    documents=documents,
-    metadatas=metadatas,
-    ids=ids,
-    embeddings=embeddings
-)
-
-print(">> Vector DB loaded successfully!")
+# ========== 3. CSV 增量同步 ==========
+# 按 id + 内容指纹比对，只编码新增/变化的行；文件只追加时只读高水位之后的尾部
+# 传 --full 强制全量比对 (会删除 CSV 里已不存在的行)
+stats = sync_csv(collection, CSV_PATH, model, lexical=lexical, full="--full" in sys.argv)
+print(f">> Sync ({stats['mode']}): 扫描 {stats['scanned']} 行 | 新增 {stats['added']} | "
+      f"更新 {stats['updated']} | 删除 {stats['deleted']} | 编码 {stats['encoded']}")
+print(f">> Embedding cache: {model.stats}")
+print(f">> Vector DB ready: {collection.count()} docs")
 
 # ========== 4. 查询 ==========
 query = "最近有什么利好？"
 print(f"\n>> Query: {query}")
 
-query_embedding = model.encode([query]).tolist()
-
-results = collection.query(
-    query_embeddings=query_embedding,
-    n_results=TOP_K
+# 向量 + BM25 混合检索 (RRF 融合)
+results = hybrid_search(
+    collection, lexical, query,
+    n_results=TOP_K,
+    embed=lambda q: model.encode([q])[0].tolist()
 )
 
 # ========== 5. 输出结果 ==========
 print("\n>> Top Results:")
-for i in range(TOP_K):
+for i in range(len(results["ids"][0])):
     doc = results["documents"][0][i]
     meta = results["metadatas"][0][i]
-    score = results["distances"][0][i]
+    score = results["fusion_scores"][0][i]
     print(f"\n[{i+1}] 标题: {meta['title']}")
     print(f"内容: {doc}")
-    print(f"距离分数: {score:.4f}")
+    print(f"融合分数: {score:.4f} ({results['sources'][0][i]})")
@@ -0,0 +1,30 @@
+"""
+测试公共配置: 把仓库根目录与 data_pipline 加进 sys.path，
+并在任何测试模块 import feeder 之前把它的落盘路径全部指到临时目录 (与 benchmarks.run_suite 一致)。
+各测试对接 benchmarks 里的本地桩服务 (mock_llm / mock_cls / mock_feeds)，不访问外网。
+
+运行: python -m pytest -q tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "data_pipline")]
+
+STATE_DIR = tempfile.mkdtemp(prefix="deepquant_tests_")
+os.environ.update({
+    "NEWS_STORE_PATH": os.path.join(STATE_DIR, "news_store"),
+    "CLS_CURSOR_PATH": os.path.join(STATE_DIR, "cls_cursor.json"),
+    "ANALYSIS_CACHE_PATH": os.path.join(STATE_DIR, "analysis_cache.sqlite"),
+    "RESONANCE_STATE_PATH": os.path.join(STATE_DIR, "resonance_state.jsonl"),
+    "SEEN_STORE_PATH": os.path.join(STATE_DIR, "seen_store.bin"),
+    "VECTOR_DB_MODE": "memory",
+    "METRICS_PORT": "0",
+    "METRICS_JSONL_PATH": "",
+})
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
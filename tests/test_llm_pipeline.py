@@ -0,0 +1,147 @@
+"""feeder 并发 LLM 分析: 令牌桶限流、抖动退避重试、analyze_chunks 按输入顺序合并 (对接 benchmarks.mock_llm)"""
+import functools
+import time
+
+import pytest
+
+import feeder
+from benchmarks.mock_llm import fake_analysis, start_mock_llm
+from rate_limiter import RateLimiter, TokenBucket, retry_with_backoff
+
+
+def make_items(n, start=0):
+    return [{"id": str(4_000_000 + i), "date": "2026-01-14 10:00", "content": f"测试电报 {i}: 某公司签订重大合同"}
+            for i in range(start, start + n)]
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    """启动桩服务并把 feeder 指过去；返回 start(**桩参数) -> server"""
+    servers = []
+
+    def start(**kwargs):
+        server, base_url = start_mock_llm(**kwargs)
+        servers.append(server)
+        monkeypatch.setattr(feeder, "BASE_URL", base_url)
+        monkeypatch.setattr(feeder, "DEEPSEEK_API_KEY", "sk-mock")
+        monkeypatch.setattr(feeder, "_LLM_CLIENT", None)
+        monkeypatch.setattr(feeder, "LLM_LIMITER", RateLimiter(qps=100, tokens_per_minute=10_000_000))
+        # 退避基数压到毫秒级，重试路径照走但不拖慢测试
+        monkeypatch.setattr(feeder, "retry_with_backoff", functools.partial(retry_with_backoff, base_delay=0.01))
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+# ---------- 令牌桶 ----------
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # 第一个令牌现成，其余 5 个按 20/s 补充
+    assert time.monotonic() - started >= 5 / 20 * 0.9
+
+
+def test_token_bucket_debit_delays_next_acquire():
+    bucket = TokenBucket(rate=100, capacity=100)
+    bucket.acquire(100)
+    bucket.debit(10)  # 实际用量比预估多 10，先欠着
+    started = time.monotonic()
+    bucket.acquire(10)
+    assert time.monotonic() - started >= 0.15
+
+
+# ---------- 重试 ----------
+def test_retry_with_backoff_retries_then_succeeds():
+    calls, retries = [], []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("boom")
+        return "ok"
+
+    result = retry_with_backoff(flaky, retries=3, base_delay=0.001,
+                                on_retry=lambda n, delay, e: retries.append((n, delay)))
+    assert result == "ok"
+    assert len(calls) == 3
+    assert [n for n, _ in retries] == [1, 2]
+    assert all(0 <= delay <= 0.001 * 2 ** (n - 1) for n, delay in retries)
+
+
+def test_retry_with_backoff_gives_up():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        retry_with_backoff(broken, retries=2, base_delay=0.001)
+    assert len(calls) == 3
+
+
+def test_retry_with_backoff_only_retries_listed_errors():
+    calls = []
+
+    def bad_input():
+        calls.append(1)
+        raise ValueError("not retryable")
+
+    with pytest.raises(ValueError):
+        retry_with_backoff(bad_input, retries=3, base_delay=0.001, retry_on=(ConnectionError,))
+    assert len(calls) == 1
+
+
+# ---------- 对接桩服务 ----------
+def test_analyze_batch_parses_stub_response(mock_llm):
+    mock_llm()
+    items = make_items(5)
+    results = feeder.analyze_batch(items)
+    assert [r["id"] for r in results] == [item["id"] for item in items]
+    assert results[0] == fake_analysis(items[0]["id"])
+
+
+def test_analyze_batch_retries_rate_limited_requests(mock_llm, monkeypatch):
+    monkeypatch.setattr(feeder, "LLM_MAX_RETRIES", 3)
+    server = mock_llm(fail_first=2)
+    results = feeder.analyze_batch(make_items(3))
+    assert len(results) == 3
+    assert server.handler.requests_served == 3  # 两次 429 + 一次成功
+
+
+def test_analyze_batch_returns_empty_after_exhausting_retries(mock_llm, monkeypatch):
+    monkeypatch.setattr(feeder, "LLM_MAX_RETRIES", 1)
+    server = mock_llm(fail_rate=1.0)
+    assert feeder.analyze_batch(make_items(3)) == []
+    assert server.handler.requests_served == 2
+
+
+def test_analyze_chunks_keeps_input_order(mock_llm):
+    mock_llm(latency=0.05)
+    chunks = [make_items(3, start=i * 3) for i in range(8)]
+    results = feeder.analyze_chunks(chunks, max_workers=4)
+    assert [[r["id"] for r in chunk_result] for chunk_result in results] == \
+        [[item["id"] for item in chunk] for chunk in chunks]
+
+
+def test_analyze_chunks_runs_concurrently(mock_llm):
+    mock_llm(latency=0.2)
+    chunks = [make_items(2, start=i * 2) for i in range(8)]
+    started = time.perf_counter()
+    feeder.analyze_chunks(chunks, max_workers=8)
+    # 串行至少 8 x 0.2s；并发时接近单次延迟
+    assert time.perf_counter() - started < 8 * 0.2 / 2
+
+
+def test_analyze_chunks_respects_qps_limit(mock_llm, monkeypatch):
+    mock_llm()
+    monkeypatch.setattr(feeder, "LLM_LIMITER", RateLimiter(qps=10, tokens_per_minute=10_000_000))
+    chunks = [make_items(1, start=i) for i in range(15)]
+    started = time.perf_counter()
+    feeder.analyze_chunks(chunks, max_workers=8)
+    # 桶里初始 10 个令牌，其余 5 个按 10/s 补充
+    assert time.perf_counter() - started >= 5 / 10 * 0.9
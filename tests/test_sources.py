@@ -0,0 +1,144 @@
+"""多源并发抓取: 条件请求 (ETag / Last-Modified)、连接复用、超时、熔断 (对接 benchmarks.mock_feeds)"""
+import threading
+import time
+
+import pytest
+
+from benchmarks.mock_feeds import start_mock_feed
+from news_sources import CallableAdapter, CircuitBreaker, HttpClient, RssAdapter, SourceFetcher
+
+FALLBACK = [{"id": "mock-1", "date": "2026-01-14", "content": "【Mock】兜底条目"}]
+
+
+@pytest.fixture
+def feeds():
+    """start(name, **桩参数) -> (server, feed_url)"""
+    servers = []
+
+    def start(name="feed", **kwargs):
+        server, base_url = start_mock_feed(name=name, **kwargs)
+        servers.append(server)
+        return server, f"{base_url}/feed"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_conditional_get_skips_unchanged_feed(feeds):
+    server, url = feeds("36kr", items=5)
+    fetcher = SourceFetcher({"36kr": RssAdapter(url, label="36Kr")})
+
+    first = fetcher.fetch_all()["36kr"]
+    assert first["status"] == "ok" and first["live"]
+    assert len(first["items"]) == 5
+    assert all(item["source"] == "36kr" and item["content"].startswith("【36Kr】") for item in first["items"])
+
+    second = fetcher.fetch_all()["36kr"]
+    assert second["status"] == "not_modified" and second["items"] == []
+    assert server.handler.not_modified == 1
+
+    server.handler.version += 1  # 源更新，ETag 变化
+    third = fetcher.fetch_all()["36kr"]
+    assert third["status"] == "ok"
+    assert {i["id"] for i in third["items"]}.isdisjoint(i["id"] for i in first["items"])
+
+
+def test_last_modified_used_without_etag(feeds):
+    server, url = feeds()
+    client = HttpClient()
+    assert client.get(url, conditional=True) is not None
+    with client._lock:
+        etag, last_modified = client._validators[url]
+    client._validators[url] = (None, last_modified)  # 只剩 Last-Modified
+    assert client.get(url, conditional=True) is None
+    assert server.handler.not_modified == 1
+
+
+def test_pooled_client_reuses_connection(feeds):
+    server, url = feeds()
+    fetcher = SourceFetcher({"feed": RssAdapter(url)})
+    for _ in range(4):
+        fetcher.fetch_all()
+    assert server.handler.requests_served == 4
+    assert server.handler.connections == 1
+
+
+def test_sources_fetched_concurrently(feeds):
+    adapters = {}
+    for i in range(4):
+        _, url = feeds(f"f{i}", latency=0.3)
+        adapters[f"f{i}"] = RssAdapter(url)
+    fetcher = SourceFetcher(adapters)
+    started = time.perf_counter()
+    results = fetcher.fetch_all()
+    # 总耗时取决于最慢的源，而不是 4 x 0.3s
+    assert time.perf_counter() - started < 0.3 * 2
+    assert all(r["status"] == "ok" for r in results.values())
+
+
+def test_breaker_opens_after_failures_and_recovers(feeds):
+    server, url = feeds(fail=True)
+    breaker = CircuitBreaker(failures=2, reset=0.3)
+    fetcher = SourceFetcher({"feed": RssAdapter(url, fallback=FALLBACK)}, breakers={"feed": breaker})
+
+    for _ in range(2):
+        result = fetcher.fetch_all()["feed"]
+        assert result["status"] == "error" and not result["live"]
+        assert [i["content"] for i in result["items"]] == [FALLBACK[0]["content"]]
+    assert breaker.state == "open"
+
+    # 熔断期间不发请求，直接用 fallback
+    served = server.handler.requests_served
+    result = fetcher.fetch_all()["feed"]
+    assert result["status"] == "open" and result["items"][0]["source"] == "feed"
+    assert server.handler.requests_served == served
+
+    # reset 之后放一个试探请求，成功即恢复
+    server.handler.fail = False
+    time.sleep(0.35)
+    assert breaker.state == "half_open"
+    result = fetcher.fetch_all()["feed"]
+    assert result["status"] == "ok" and result["live"]
+    assert breaker.state == "closed"
+
+
+def test_http_timeout_falls_back(feeds):
+    _, slow_url = feeds("slow", latency=1.0)
+    _, fast_url = feeds("fast")
+    fetcher = SourceFetcher({"slow": RssAdapter(slow_url, timeout=0.1, fallback=FALLBACK),
+                             "fast": RssAdapter(fast_url)})
+    started = time.perf_counter()
+    results = fetcher.fetch_all()
+    assert time.perf_counter() - started < 1.0  # 不等慢源跑完
+    assert results["slow"]["status"] == "error" and not results["slow"]["live"]
+    assert results["slow"]["items"][0]["content"] == FALLBACK[0]["content"]
+    assert results["fast"]["status"] == "ok"
+
+
+def test_hung_source_times_out_then_reports_busy():
+    release = threading.Event()
+    calls = []
+
+    def hung():
+        calls.append(1)
+        release.wait()
+        return [{"id": "late", "date": "2026-01-14", "content": "迟到的条目"}]
+
+    fetcher = SourceFetcher({"hung": CallableAdapter(hung, timeout=0.1)})
+    started = time.perf_counter()
+    assert fetcher.fetch_all()["hung"]["status"] == "timeout"
+    assert time.perf_counter() - started < 2.0
+    assert fetcher.breakers["hung"].consecutive == 1
+
+    # 上一轮的调用还占着线程: 不重复提交，记 busy，也不计入熔断
+    assert fetcher.fetch_all()["hung"]["status"] == "busy"
+    assert fetcher.breakers["hung"].consecutive == 1
+    assert len(calls) == 1
+
+    release.set()
+    time.sleep(0.05)
+    result = fetcher.fetch_all()["hung"]
+    assert result["status"] == "ok" and len(calls) == 2
+    assert fetcher.breakers["hung"].consecutive == 0
+    fetcher.close()
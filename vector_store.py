@@ -0,0 +1,106 @@
+import os
+import time
+from collections import defaultdict
+
+import chromadb
+
+# ================= ⚙️ 向量库配置 =================
+# persistent: 索引落盘到 VECTOR_DB_PATH，容器重启后直接热加载，无需重新抓取/编码
+# memory:     纯内存模式，重启后清空 (仅适合开发调试)
+VECTOR_DB_MODE = os.getenv("VECTOR_DB_MODE", "persistent")
+VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "./chroma_db")
+COLLECTION_NAME = "financial_news"
+
+# chroma 单次 add 的上限约 5461 条，超出时切片写入
+MAX_ADD_BATCH = 5000
+
+# 集合代际: 查询结果缓存据此判断是否失效。进程内计数之外，持久化模式下每次写入还会改写
+# <集合所在目录>/generation_<集合名> 标记文件，其他进程 (如 backfill.py) 的写入也能被看到；
+# 再叠加 collection.count()，绕过本模块直接写库的情况至少能发现条数变化。
+# 按 collection.id 记账: 标记目录取 get_collection 打开时的 mode / path，内存模式不写标记
+_GENERATIONS = defaultdict(int)
+_MARKER_DIRS = {}  # collection.id -> 持久化目录 (内存模式为 None)
+
+
+def get_client(mode=None, path=None):
+    mode = mode or VECTOR_DB_MODE
+    if mode == "memory":
+        return chromadb.Client()
+
+    path = path or VECTOR_DB_PATH
+    os.makedirs(path, exist_ok=True)
+    # PersistentClient 打开时只读元信息，HNSW 段在首次查询时按需加载，
+    # 启动耗时与历史数据量无关
+    return chromadb.PersistentClient(path=path)
+
+
+def get_collection(name=COLLECTION_NAME, mode=None, path=None):
+    """获取 (或创建) 集合；持久化模式下直接复用磁盘上已有的索引"""
+    client = get_client(mode, path)
+    collection = client.get_or_create_collection(name)
+    _MARKER_DIRS[collection.id] = None if (mode or VECTOR_DB_MODE) == "memory" else (path or VECTOR_DB_PATH)
+    return collection
+
+
+def add_documents(collection, ids, documents, embeddings, metadatas=None):
+    """批量写入，超过 chroma 单批上限时自动切片"""
+    for i in range(0, len(ids), MAX_ADD_BATCH):
+        collection.add(
+            ids=ids[i: i + MAX_ADD_BATCH],
+            documents=documents[i: i + MAX_ADD_BATCH],
+            embeddings=embeddings[i: i + MAX_ADD_BATCH],
+            metadatas=metadatas[i: i + MAX_ADD_BATCH] if metadatas else None
+        )
+    _bump_generation(collection)
+
+
+def upsert_documents(collection, ids, documents, embeddings, metadatas=None):
+    """批量插入或覆盖 (ID 已存在时替换正文/向量/metadata)，切片规则同 add_documents"""
+    for i in range(0, len(ids), MAX_ADD_BATCH):
+        collection.upsert(
+            ids=ids[i: i + MAX_ADD_BATCH],
+            documents=documents[i: i + MAX_ADD_BATCH],
+            embeddings=embeddings[i: i + MAX_ADD_BATCH],
+            metadatas=metadatas[i: i + MAX_ADD_BATCH] if metadatas else None
+        )
+    _bump_generation(collection)
+
+
+def delete_documents(collection, ids):
+    for i in range(0, len(ids), MAX_ADD_BATCH):
+        collection.delete(ids=ids[i: i + MAX_ADD_BATCH])
+    _bump_generation(collection)
+
+
+def _generation_path(collection):
+    """标记文件路径；内存模式或不是经 get_collection 打开的集合返回 None"""
+    root = _MARKER_DIRS.get(collection.id)
+    return os.path.join(root, f"generation_{collection.name}") if root else None
+
+
+def _bump_generation(collection):
+    _GENERATIONS[collection.id] += 1
+    path = _generation_path(collection)
+    if path is None:
+        return
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{os.getpid()} {time.time_ns()}")
+    os.replace(tmp, path)  # 改名会更新 inode / mtime，读者只需 stat
+
+
+def local_generation(collection):
+    """只看本进程写入计数 (无 IO)，供调用方决定要不要做完整的 collection_generation 检查"""
+    return _GENERATIONS[collection.id]
+
+
+def collection_generation(collection):
+    """该集合的写入代际: (进程内计数, 跨进程标记文件, 条数)，任何一项变化都说明有新写入"""
+    marker, path = None, _generation_path(collection)
+    if path is not None:
+        try:
+            st = os.stat(path)
+            marker = (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            pass
+    return _GENERATIONS[collection.id], marker, collection.count()